@@ -49,6 +49,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'core.middleware.MetricsMiddleware',
+    'core.middleware.CompressionMiddleware',
     'core.middleware.SitePasswordMiddleware',
     'corsheaders.middleware.CorsMiddleware',
     'django.middleware.security.SecurityMiddleware',
@@ -56,6 +58,7 @@ MIDDLEWARE = [
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'core.middleware.ProfilingMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -97,6 +100,24 @@ DATABASES = {
     }
 }
 
+# pool spojení (psycopg3) — jeden na worker proces, takže Postgres drží najviac
+# WEB_CONCURRENCY × DB_POOL_MAX spojení (+ LISTEN spojenie na worker pri EVENTS_PG_NOTIFY).
+# Všetky SQL workera (sync view aj async ORM) idú cez jedno vlákno (gunicorn.conf.py);
+# ďalšie spojenia drží len súbežne rozbehnuté požiadavky medzi dotazmi, preto stačí malý pool.
+DB_POOL = os.getenv("DB_POOL", "true").lower() == "true"
+if DB_POOL:
+    DATABASES["default"]["CONN_MAX_AGE"] = 0  # spojenia vracia do poolu, nie zatvára
+    # pool pred vydaním overí spojenie (ConnectionPool.check_connection) — po reštarte DB nevydá mŕtve
+    DATABASES["default"]["CONN_HEALTH_CHECKS"] = True
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN", "1")),
+            "max_size": int(os.getenv("DB_POOL_MAX", "4")),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", "10")),  # s čakania na voľné spojenie
+            "max_idle": float(os.getenv("DB_POOL_MAX_IDLE", "300")),
+        },
+    }
+
 
 # Password validation
 # https://docs.djangoproject.com/en/5.2/ref/settings/#auth-password-validators
@@ -137,11 +158,29 @@ STATIC_URL = 'static/'
 # Media files (Uploads)
 MEDIA_URL = '/media/'
 MEDIA_ROOT = BASE_DIR / 'media'
+# core.media: interná location reverse proxy (nginx), ktorá posiela súbory z MEDIA_ROOT;
+# prázdne = súbory posiela Django
+MEDIA_ACCEL_REDIRECT = os.getenv("MEDIA_ACCEL_REDIRECT", "")
+
+# Cache
+# "versions" drží stamp-y tabuliek (core.versioning), podľa ktorých sa zneplatňujú
+# procesné cache — musí byť zdieľaná všetkými worker procesmi.
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    },
+    "versions": {
+        "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+        "LOCATION": os.environ.get("VERSION_CACHE_DIR", "/tmp/drinkcounter-versions"),
+    },
+}
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+# štvorcové náhľady avatarov (core.avatars) v px — karta osoby má 150 px, zoznam 100 px
+AVATAR_THUMB_SIZES = [int(s) for s in os.getenv("AVATAR_THUMB_SIZES", "96,160,320").split(",")]
 DATA_UPLOAD_MAX_MEMORY_SIZE = 15 * 1024 * 1024  # 15 MB
 FILE_UPLOAD_MAX_MEMORY_SIZE = 15 * 1024 * 1024  # 15 MB
 CORS_ALLOW_ALL_ORIGINS = False
@@ -183,4 +222,18 @@ SPECTACULAR_SETTINGS = {
 ADMIN_PIN = os.getenv("ADMIN_PIN", "1234")
 PAYMENT_IBAN = os.getenv("PAYMENT_IBAN", "SK9365000000003650622489")
 PUBLIC_HOST = os.getenv("PUBLIC_HOST", "drinkcounter.bytboyzserver.xyz")
-SITE_PASSWORD = os.getenv("SITE_PASSWORD", "")
\ No newline at end of file
+SITE_PASSWORD = os.getenv("SITE_PASSWORD", "")
+# viac worker procesov → SSE udalosti (core.events) cez Postgres LISTEN/NOTIFY
+EVENTS_PG_NOTIFY = os.getenv("EVENTS_PG_NOTIFY", "false").lower() == "true"
+# metriky (core.metrics): zdieľaný adresár pre súčty worker procesov; pri štarte ho vyprázdni
+METRICS_DIR = os.getenv("METRICS_DIR", "/tmp/drinkcounter-metrics")
+# Bearer token pre Prometheus scrape /api/metrics (inak len admin session)
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+# profily požiadaviek (core.profiling, X-Profile: 1 od admina): zdieľaný adresár, drží sa N najnovších
+PROFILES_DIR = os.getenv("PROFILES_DIR", "/tmp/drinkcounter-profiles")
+PROFILES_KEEP = int(os.getenv("PROFILES_KEEP", "20"))
+# kompresia odpovedí (core.compression): menšie telá sa neoplatí komprimovať
+COMPRESSION_MIN_BYTES = int(os.getenv("COMPRESSION_MIN_BYTES", "1024"))
+COMPRESSION_GZIP_LEVEL = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+COMPRESSION_BROTLI_QUALITY = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "5"))
+COMPRESSION_BROTLI = os.getenv("COMPRESSION_BROTLI", "true").lower() == "true"
\ No newline at end of file
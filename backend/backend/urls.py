@@ -15,9 +15,10 @@ if settings.DEBUG:
         path("api/docs/", SpectacularSwaggerView.as_view(url_name="schema"), name="swagger-ui"),
     ]
 
-# Serve media files regardless of DEBUG (no CDN in this homelab setup)
-from django.views.static import serve
+# Serve media files regardless of DEBUG (no CDN in this homelab setup);
+# core.media adds ETag/Range/immutable caching and optional X-Accel-Redirect
 from django.urls import re_path
+from core import media
 urlpatterns += [
-    re_path(r'^media/(?P<path>.*)$', serve, {'document_root': settings.MEDIA_ROOT}),
+    re_path(r'^media/(?P<path>.*)$', media.serve, name="media"),
 ]
\ No newline at end of file
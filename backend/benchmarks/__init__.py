@@ -0,0 +1,13 @@
+"""
+Reprodukovateľný benchmark horúcich API endpointov.
+
+    python -m benchmarks run [--transactions 20000] [--requests 300] [--client wsgi|asgi] [--out bench.json]
+    python -m benchmarks compare baseline.json current.json [--threshold 0.2] [--metric p95]
+    python -m benchmarks serializers [--rows 500] [--repeat 30]
+
+`run` vytvorí dočasnú DB <db>_bench, naplní ju deterministickým datasetom
+(benchmarks.dataset), endpointy volá v procese cez Django test client
+(WSGI) alebo AsyncClient (ASGI) a zapíše priepustnosť a p50/p95/p99 do JSON.
+`compare` skončí s kódom 1, ak niektorý endpoint zhoršil metriku o viac ako prah.
+`serializers` porovná DRF serializéry s core.fast_serializers na strane s --rows riadkami.
+"""
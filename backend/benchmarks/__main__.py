@@ -0,0 +1,102 @@
+import argparse
+import os
+import sys
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m benchmarks", description=__doc__)
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_p = sub.add_parser("run", help="Naplň dočasnú DB a zmeraj endpointy.")
+    run_p.add_argument("--requests", type=int, default=300, help="Meraných požiadaviek na endpoint.")
+    run_p.add_argument("--client", choices=("wsgi", "asgi"), default="wsgi")
+    run_p.add_argument("--persons", type=int)
+    run_p.add_argument("--items", type=int)
+    run_p.add_argument("--transactions", type=int)
+    run_p.add_argument("--days", type=int, help="Rozpätie created_at transakcií.")
+    run_p.add_argument("--endpoint", action="append", dest="only", help="Len daný endpoint (dá sa zopakovať).")
+    run_p.add_argument("--keepdb", action="store_true", help="Nezmaž bench DB po behu.")
+    run_p.add_argument("--out", help="Cesta k JSON výsledku.")
+
+    ser_p = sub.add_parser("serializers", help="DRF serializéry vs core.fast_serializers (dotaz + serializácia).")
+    ser_p.add_argument("--rows", type=int, default=500, help="Riadkov na stranu.")
+    ser_p.add_argument("--repeat", type=int, default=30)
+    ser_p.add_argument("--keepdb", action="store_true", help="Nezmaž bench DB po behu.")
+    ser_p.add_argument("--out", help="Cesta k JSON výsledku.")
+
+    cmp_p = sub.add_parser("compare", help="Porovnaj dva JSON výsledky; exit 1 pri regresii.")
+    cmp_p.add_argument("baseline")
+    cmp_p.add_argument("current")
+    cmp_p.add_argument("--metric", default="p95")
+    cmp_p.add_argument("--threshold", type=float, default=0.2, help="Povolený relatívny nárast (0.2 = 20 %%).")
+    cmp_p.add_argument("--min-delta-ms", type=float, default=0.5, help="Menší absolútny nárast nie je regresia.")
+
+    args = parser.parse_args(argv)
+    if args.command == "compare":
+        return _compare(args)
+    _setup()
+    if args.command == "serializers":
+        return _serializers(args)
+    return _run(args)
+
+
+def _setup():
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    import django
+
+    django.setup()
+
+
+def _run(args):
+    from . import runner
+
+    result = runner.run(
+        requests=args.requests, client=args.client, keepdb=args.keepdb, only=args.only,
+        persons=args.persons, items=args.items, transactions=args.transactions, days=args.days,
+    )
+    print(f"{result['meta']['client']} · {result['meta']['dataset']} · git {result['meta']['git']}")
+    for name, r in result["endpoints"].items():
+        errors = f"  {r['errors']} chýb" if r["errors"] else ""
+        print(f"  {name:<20} {r['rps']:>8.1f} req/s  p50 {r['p50']:7.2f}  p95 {r['p95']:7.2f}  "
+              f"p99 {r['p99']:7.2f} ms{errors}")
+    if args.out:
+        runner.write(result, args.out)
+        print(f"→ {args.out}")
+    return 0
+
+
+def _serializers(args):
+    from . import runner, serializers
+
+    result = serializers.run(rows=args.rows, repeat=args.repeat, keepdb=args.keepdb)
+    print(f"{result['meta']['rows']} riadkov · medián z {result['meta']['repeat']} · git {result['meta']['git']}")
+    for name, r in result["serializers"].items():
+        print(f"  {name:<14} DRF {r['drf_ms']:8.2f} ms  fast {r['fast_ms']:8.2f} ms  {r['speedup']:5.1f}×")
+    if args.out:
+        runner.write(result, args.out)
+        print(f"→ {args.out}")
+    return 0
+
+
+def _compare(args):
+    from . import compare
+
+    baseline, current = compare.load(args.baseline), compare.load(args.current)
+    for key in ("client", "dataset", "requests"):
+        if baseline["meta"].get(key) != current["meta"].get(key):
+            print(f"Pozor: {key} sa líši ({baseline['meta'].get(key)} vs {current['meta'].get(key)})")
+    rows = compare.compare(
+        baseline, current, metric=args.metric, threshold=args.threshold, min_delta_ms=args.min_delta_ms,
+    )
+    for name, before, after, change, regressed in rows:
+        flag = "  REGRESIA" if regressed else ""
+        print(f"  {name:<20} {args.metric} {before:8.2f} → {after:8.2f} ms  {change:+7.1%}{flag}")
+    regressions = [r for r in rows if r[4]]
+    if regressions:
+        print(f"{len(regressions)} endpointov horších o viac ako {args.threshold:.0%}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
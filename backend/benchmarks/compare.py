@@ -0,0 +1,24 @@
+"""Porovnanie dvoch JSON výsledkov; regresia = metrika narástla o viac ako prah (relatívne aj absolútne)."""
+import json
+
+METRICS = ("p50", "p95", "p99", "mean")
+
+
+def load(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def compare(baseline, current, metric="p95", threshold=0.2, min_delta_ms=0.5):
+    """
+    Vráti riadky (endpoint, pred, po, zmena, regresia) pre endpointy v oboch behoch.
+    min_delta_ms tlmí šum pri endpointoch, ktoré trvajú zlomok milisekundy.
+    """
+    rows = []
+    for name in sorted(set(baseline["endpoints"]) & set(current["endpoints"])):
+        before = baseline["endpoints"][name][metric]
+        after = current["endpoints"][name][metric]
+        change = (after - before) / before if before else 0.0
+        regressed = change > threshold and after - before > min_delta_ms
+        rows.append((name, before, after, change, regressed))
+    return rows
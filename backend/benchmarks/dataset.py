@@ -0,0 +1,65 @@
+"""Deterministický dataset pre benchmark: osoby, položky, predvoľby a transakcie v otvorenej session."""
+from decimal import Decimal
+
+from django.db import connection
+
+from core import ledger, stock
+from core.models import Category, CoffeePreset, Item, Person, Session, Transaction
+
+DEFAULTS = {"persons": 40, "items": 12, "transactions": 20000, "days": 30}
+
+
+def seed(persons=DEFAULTS["persons"], items=DEFAULTS["items"], transactions=DEFAULTS["transactions"],
+         days=DEFAULTS["days"]):
+    """
+    Naplní prázdnu DB; transakcie sa generujú v SQL (generate_series) a sú pri rovnakých
+    parametroch vždy rovnaké. Vráti fixture {persons, beer, coffee, session}.
+    """
+    beer_cat = Category.objects.create(name="Beer")
+    coffee_cat = Category.objects.create(name="Coffee")
+    CoffeePreset.objects.create(label="Espresso", g_min=Decimal("7"), g_max=Decimal("12"), extra_eur=Decimal("0.2"))
+    CoffeePreset.objects.create(label="Doppio", g_min=Decimal("12.001"), g_max=Decimal("20"), extra_eur=Decimal("0.3"))
+    session = Session.objects.create()
+
+    person_ids = [p.pk for p in Person.objects.bulk_create(
+        [Person(name=f"Bench {i}") for i in range(persons)]
+    )]
+    beers = Item.objects.bulk_create([
+        Item(name=f"Pivo {i}", category=beer_cat, price=Decimal("1.5") + Decimal(i) / 10,
+             stock_quantity=Decimal("1000000"))
+        for i in range(max(1, items // 2))
+    ])
+    coffees = Item.objects.bulk_create([
+        Item(name=f"Zrno {i}", category=coffee_cat, pricing_mode="per_gram",
+             price=Decimal("0.05"), stock_quantity=Decimal("1000000"))
+        for i in range(max(1, items - items // 2))
+    ])
+    item_ids = [i.pk for i in beers + coffees]
+    stock.baseline()
+
+    # osoba/položka/čas z id riadku — deterministické bez random seed-u
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {Transaction._meta.db_table}
+                (session_id, person_id, item_id, quantity, price_at_time, created_at)
+            WITH src AS (
+                SELECT g, (%s::bigint[])[1 + (g * 7919) %% %s] AS person_id,
+                       (%s::bigint[])[1 + (g * 104729) %% %s] AS item_id
+                FROM generate_series(1, %s::bigint) AS g
+            )
+            SELECT %s, src.person_id, src.item_id, q.quantity, i.price * q.quantity,
+                   now() - ((src.g * 2654435761) %% (%s * 86400)) * interval '1 second'
+            FROM src
+            JOIN {Item._meta.db_table} i ON i.id = src.item_id
+            CROSS JOIN LATERAL (
+                SELECT CASE WHEN i.pricing_mode = 'per_gram' THEN 15 ELSE 1 END AS quantity
+            ) q
+            """,
+            [person_ids, len(person_ids), item_ids, len(item_ids), transactions, session.pk, days],
+        )
+    ledger.rebuild_balances()
+    ledger.rebuild_rollups()
+    with connection.cursor() as cur:
+        cur.execute("ANALYZE")
+    return {"persons": person_ids, "beer": beers[0].pk, "coffee": coffees[0].pk, "session": session.pk}
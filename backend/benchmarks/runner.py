@@ -0,0 +1,154 @@
+"""Beh benchmarku: dočasná DB, dataset, sekvenčné požiadavky cez test client, percentily do JSON."""
+import asyncio
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import django
+from django.conf import settings
+from django.db import connection, connections
+
+from . import dataset
+
+WARMUP = 20
+
+
+def _endpoints(fixture):
+    """(meno, metóda, cesta, telo) — telo môže byť funkcia poradového čísla požiadavky."""
+    persons = fixture["persons"]
+    return [
+        ("transactions_create", "post", "/api/transactions",
+         lambda i: {"person_id": persons[i % len(persons)], "item_id": fixture["beer"], "quantity": "1"}),
+        ("session_active", "get", "/api/session/active", None),
+        ("transactions_list", "get", "/api/transactions/list", None),
+        ("stats", "get", "/api/stats", None),
+        ("pay_by_square", "get", f"/api/persons/{persons[0]}/pay-by-square/", None),
+    ]
+
+
+def isolate_settings():
+    # vlastná cache stamp-ov a metrík (nemieša sa s bežiacim serverom), bez throttlingu
+    settings.CACHES["versions"]["LOCATION"] = tempfile.mkdtemp(prefix="drinkcounter-bench-")
+    settings.METRICS_DIR = tempfile.mkdtemp(prefix="drinkcounter-bench-metrics-")
+    settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["transactions"] = None
+    settings.EVENTS_PG_NOTIFY = False
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+
+
+@contextmanager
+def bench_database(keepdb=False):
+    """Dočasná DB <db>_bench (ako testovacia) po dobu bloku."""
+    isolate_settings()
+    db_settings = settings.DATABASES["default"]
+    db_settings.setdefault("TEST", {})["NAME"] = f"{db_settings['NAME']}_bench"
+    old_name = db_settings["NAME"]
+    connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+    try:
+        yield
+    finally:
+        connections.close_all()
+        if not keepdb:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+
+
+def run(requests=300, client="wsgi", keepdb=False, only=None, **dataset_options):
+    options = {**dataset.DEFAULTS, **{k: v for k, v in dataset_options.items() if v is not None}}
+    with bench_database(keepdb):
+        fixture = dataset.seed(**options)
+        endpoints = [e for e in _endpoints(fixture) if not only or e[0] in only]
+        drive = _drive_asgi if client == "asgi" else _drive_wsgi
+        results = {name: _summarize(*drive(method, path, body, requests)) for name, method, path, body in endpoints}
+    return {
+        "meta": {**meta(), "client": client, "requests": requests, "dataset": options},
+        "endpoints": results,
+    }
+
+
+def meta():
+    return {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "git": _git_revision(),
+        "python": platform.python_version(),
+        "django": django.get_version(),
+    }
+
+
+def _call(client, method, path, body, i):
+    if body is None:
+        return getattr(client, method)(path)
+    return getattr(client, method)(path, body(i), content_type="application/json")
+
+
+def _drive_wsgi(method, path, body, requests):
+    from django.test import Client
+
+    client = Client()
+    for i in range(WARMUP):
+        _call(client, method, path, body, i)
+    latencies, statuses = [], []
+    t0 = time.perf_counter()
+    for i in range(requests):
+        start = time.perf_counter()
+        response = _call(client, method, path, body, i)
+        latencies.append(time.perf_counter() - start)
+        statuses.append(response.status_code)
+    return latencies, statuses, time.perf_counter() - t0
+
+
+def _drive_asgi(method, path, body, requests):
+    from asgiref.sync import sync_to_async
+    from django.test import AsyncClient
+
+    async def drive():
+        client = AsyncClient()
+        for i in range(WARMUP):
+            await _call(client, method, path, body, i)
+        latencies, statuses = [], []
+        t0 = time.perf_counter()
+        for i in range(requests):
+            start = time.perf_counter()
+            response = await _call(client, method, path, body, i)
+            latencies.append(time.perf_counter() - start)
+            statuses.append(response.status_code)
+        wall = time.perf_counter() - t0
+        # sync view bežia vo vlákne executora — jeho spojenie inak drží bench DB otvorenú
+        await sync_to_async(connections.close_all)()
+        return latencies, statuses, wall
+
+    return asyncio.run(drive())
+
+
+def quantile(sorted_values, p):
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * p / 100))]
+
+
+def _summarize(latencies, statuses, wall):
+    ms = sorted(v * 1000 for v in latencies)
+    return {
+        "count": len(ms),
+        "errors": sum(1 for s in statuses if s >= 400),
+        "rps": round(len(ms) / wall, 1) if wall else None,
+        "mean": round(sum(ms) / len(ms), 3),
+        "p50": round(quantile(ms, 50), 3),
+        "p95": round(quantile(ms, 95), 3),
+        "p99": round(quantile(ms, 99), 3),
+    }
+
+
+def _git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def write(result, path):
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+        f.write("\n")
@@ -0,0 +1,74 @@
+"""
+DRF serializéry vs core.fast_serializers na rovnakých dátach: dotaz + serializácia
+jednej strany (predvolene 500 riadkov), medián z opakovaní. Výstup musí byť zhodný.
+"""
+import statistics
+import time
+from decimal import Decimal
+
+from rest_framework.renderers import JSONRenderer
+
+from core import fast_serializers
+from core.models import BrewBatch, BrewBatchIngredient, Item, Person, Transaction
+from core.serializers import BrewBatchSerializer, ItemSerializer, PersonSerializer, TransactionSerializer
+
+from . import dataset, runner
+
+
+def _cases(rows):
+    persons = Person.objects.order_by("id")[:rows]
+    items = Item.objects.order_by("id")[:rows]
+    transactions = Transaction.objects.order_by("-created_at", "-id")[:rows]
+    batches = BrewBatch.objects.order_by("-created_at")[:rows]
+    return [
+        ("persons", lambda: PersonSerializer(persons, many=True).data,
+         lambda: fast_serializers.PERSON.many(persons)),
+        ("items", lambda: ItemSerializer(items.select_related("category"), many=True).data,
+         lambda: fast_serializers.ITEM.many(items)),
+        ("transactions",
+         lambda: TransactionSerializer(transactions.select_related("person", "item__category"), many=True).data,
+         lambda: fast_serializers.TRANSACTION.many(transactions)),
+        ("brew_batches",
+         lambda: BrewBatchSerializer(
+             batches.select_related("output_item").prefetch_related("ingredients__coffee"), many=True,
+         ).data,
+         lambda: fast_serializers.brew_batches(batches)),
+    ]
+
+
+def _seed_brew_batches(rows):
+    coffees = list(Item.objects.filter(pricing_mode="per_gram").order_by("id")[:2])
+    output = Item.objects.create(name="Cold brew", category=coffees[0].category, pricing_mode="per_ml",
+                                 price=Decimal("0.01"))
+    batches = BrewBatch.objects.bulk_create(
+        BrewBatch(output_item=output, output_ml=Decimal("1000"), note=f"Várka {i}") for i in range(rows)
+    )
+    BrewBatchIngredient.objects.bulk_create(
+        BrewBatchIngredient(batch=b, coffee=c, grams=Decimal("60"), sort_order=n)
+        for b in batches for n, c in enumerate(coffees)
+    )
+
+
+def _median_ms(fn, repeat):
+    fn()  # zahriatie
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - t0)
+    return round(statistics.median(times) * 1000, 3)
+
+
+def run(rows=500, repeat=30, keepdb=False):
+    options = {**dataset.DEFAULTS, "persons": rows, "items": rows, "transactions": rows * 4}
+    with runner.bench_database(keepdb):
+        dataset.seed(**options)
+        _seed_brew_batches(rows)
+        results = {}
+        for name, drf, fast in _cases(rows):
+            renderer = JSONRenderer()
+            if renderer.render(drf()) != renderer.render(fast()):
+                raise AssertionError(f"{name}: fast_serializers dáva iný JSON ako DRF serializér")
+            drf_ms, fast_ms = _median_ms(drf, repeat), _median_ms(fast, repeat)
+            results[name] = {"drf_ms": drf_ms, "fast_ms": fast_ms, "speedup": round(drf_ms / fast_ms, 2)}
+    return {"meta": {**runner.meta(), "rows": rows, "repeat": repeat}, "serializers": results}
@@ -0,0 +1,72 @@
+"""
+Aktívna (otvorená) session s procesnou cache.
+
+Id aktívnej session si proces pamätá spolu so stamp-om "active_session"
+(core.versioning); SessionResetView, admin akcia close_sessions aj SessionAdmin
+ho po commite zvýšia a ostatné procesy si session pri ďalšom čítaní načítajú znova.
+Bežné rozlíšenie session tak nejde do DB.
+
+Vytvorenie je bez súbehu: najviac jednu otvorenú session drží constraint
+single_open_session; kto pri vytváraní prehrá, dostane IntegrityError a vezme
+session víťaza.
+"""
+import threading
+
+from django.db import IntegrityError, transaction
+
+from . import versioning
+from .models import Session
+
+ACTIVE_SESSION_VERSION = "active_session"
+CREATE_ATTEMPTS = 3
+
+_cached = None  # (stamp, id, started_at) alebo (stamp, None, None)
+_lock = threading.Lock()
+
+
+def get_active_session(create=True):
+    version = versioning.get_version(ACTIVE_SESSION_VERSION)
+    cached = _cached
+    if cached is not None and cached[0] == version and (cached[1] is not None or not create):
+        _, pk, started_at = cached
+        return Session(id=pk, started_at=started_at, ended_at=None) if pk is not None else None
+
+    # stamp sa číta pred dotazom — ak sa medzitým zmení, ďalšie volanie načíta znova
+    s = Session.objects.filter(ended_at__isnull=True).first()
+    if s is None and create:
+        return _create()
+    entry = (version, s.pk, s.started_at) if s is not None else (version, None, None)
+    # do cache až po commite — pri rollbacku by ostalo id, ktoré nikto nevidí
+    transaction.on_commit(lambda: _remember(entry))
+    return s
+
+
+def _remember(entry):
+    global _cached
+    with _lock:
+        _cached = entry
+
+
+def _create():
+    for _ in range(CREATE_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                s = Session.objects.create()
+            invalidate()
+            return s
+        except IntegrityError:
+            # súbežný request ju práve vytvoril — použi jeho
+            s = Session.objects.filter(ended_at__isnull=True).first()
+            if s is not None:
+                return s
+    raise RuntimeError("Nepodarilo sa získať otvorenú session")
+
+
+def invalidate():
+    """Po commite zneplatní cache aktívnej session vo všetkých procesoch."""
+    versioning.bump_version(ACTIVE_SESSION_VERSION)
+
+
+def clear_local_cache():
+    """Zahodí cache len v tomto procese (testy, ktoré menia Session mimo view)."""
+    _remember(None)
@@ -1,44 +1,120 @@
 from django.contrib import admin
 from django.utils import timezone
+from django.db import transaction
 from django.db.models import Sum
-from .models import Person, Category, Item, Session, Transaction, CoffeePreset
+from . import active_session, ledger, stock, summaries
+from .pricing import PRESETS_VERSION
+from .versioning import bump_version
+from .models import (
+    Person, Category, Item, Session, Transaction, CoffeePreset, SessionPersonBalance, SessionSummary, StatsRollup,
+    StockMovement,
+)
+
+class VersionBumpAdmin(admin.ModelAdmin):
+    """Zmeny cez admin zneplatnia ETagy / procesné cache tabuliek v `bumps` (core.versioning)."""
+    bumps = ()
+
+    def bump(self):
+        for name in self.bumps:
+            bump_version(name)
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self.bump()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self.bump()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        self.bump()
 
 @admin.action(description="Aktivovať označené osoby")
 def activate_people(modeladmin, request, queryset):
     queryset.update(active=True)
+    modeladmin.bump()
 
 @admin.action(description="Deaktivovať označené osoby")
 def deactivate_people(modeladmin, request, queryset):
     queryset.update(active=False)
+    modeladmin.bump()
 
 @admin.register(Person)
-class PersonAdmin(admin.ModelAdmin):
+class PersonAdmin(VersionBumpAdmin):
+    bumps = ("persons",)
     list_display = ("name", "is_guest", "active", "created_at")
     list_filter = ("is_guest", "active")
     search_fields = ("name",)
     actions = (activate_people, deactivate_people)
 
 @admin.register(Category)
-class CategoryAdmin(admin.ModelAdmin):
+class CategoryAdmin(VersionBumpAdmin):
+    bumps = ("categories", "items")
     list_display = ("name",)
     search_fields = ("name",)
 
+    # kaskáda: kategória → položky → transakcie
+    def delete_model(self, request, obj):
+        txs = Transaction.objects.filter(item__category=obj)
+        with summaries.refreezing(txs):
+            ledger.unrecord_queryset(txs)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        txs = Transaction.objects.filter(item__category__in=queryset)
+        with summaries.refreezing(txs):
+            ledger.unrecord_queryset(txs)
+            super().delete_queryset(request, queryset)
+
 @admin.action(description="Aktivovať položky")
 def activate_items(modeladmin, request, queryset):
     queryset.update(active=True)
+    modeladmin.bump()
 
 @admin.action(description="Deaktivovať položky")
 def deactivate_items(modeladmin, request, queryset):
     queryset.update(active=False)
+    modeladmin.bump()
 
 @admin.register(Item)
-class ItemAdmin(admin.ModelAdmin):
+class ItemAdmin(VersionBumpAdmin):
+    bumps = ("items",)
     list_display = ("name", "category", "pricing_mode", "price", "active", "created_at")
     list_filter = ("category", "pricing_mode", "active")
     search_fields = ("name",)
     list_editable = ("pricing_mode", "price", "active")
     actions = (activate_items, deactivate_items)
 
+    # zásoba sa mení ako pohyb (core.stock); ostatné polia sa ukladajú bez nej,
+    # aby save() neprepísal súbežné predaje hodnotou z formulára
+    def save_model(self, request, obj, form, change):
+        if not change:
+            with transaction.atomic():
+                super().save_model(request, obj, form, change)
+                stock.record_initial(obj, ref="admin")
+            return
+        fields = [f for f in form.changed_data if f != "stock_quantity"]
+        with transaction.atomic():
+            if fields:
+                obj.save(update_fields=fields)
+            if "stock_quantity" in form.changed_data:
+                stock.set_level(obj, obj.stock_quantity, stock.REASON_EDIT, ref="admin")
+        self.bump()
+
+    # zmazanie položky kaskádovo zmaže jej transakcie → odpočítaj ich zo zostatkov
+    def delete_model(self, request, obj):
+        txs = Transaction.objects.filter(item=obj)
+        with summaries.refreezing(txs):
+            ledger.unrecord_queryset(txs)
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        txs = Transaction.objects.filter(item__in=queryset)
+        with summaries.refreezing(txs):
+            ledger.unrecord_queryset(txs)
+            super().delete_queryset(request, queryset)
+
 class TransactionInline(admin.TabularInline):
     model = Transaction
     fields = ("person", "item", "price_at_time", "created_at")
@@ -49,7 +125,16 @@ class TransactionInline(admin.TabularInline):
 
 @admin.action(description="Ukončiť označené session teraz")
 def close_sessions(modeladmin, request, queryset):
-    queryset.filter(ended_at__isnull=True).update(ended_at=timezone.now())
+    with transaction.atomic():
+        # of=self: changelist queryset má select_related("summary") (outer join)
+        to_close = list(queryset.filter(ended_at__isnull=True).select_for_update(of=("self",)))
+        now = timezone.now()
+        for s in to_close:
+            s.ended_at = now
+            s.save(update_fields=["ended_at"])
+            summaries.freeze(s)
+        if to_close:
+            active_session.invalidate()
 
 @admin.register(Session)
 class SessionAdmin(admin.ModelAdmin):
@@ -57,21 +142,98 @@ class SessionAdmin(admin.ModelAdmin):
     inlines = (TransactionInline,)
     actions = (close_sessions,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).select_related("summary")
+
+    # uzavretá session → zmrazený súhrn, otvorená (alebo ešte bez snapshotu) → zostatky z ledgera;
+    # zoznam len číta, snapshoty dopĺňa manage.py freeze_summaries
     def total_eur(self, obj):
-        agg = obj.transactions.aggregate(s=Sum("price_at_time"))
+        if obj.ended_at is not None:
+            try:
+                return obj.summary.total_eur
+            except SessionSummary.DoesNotExist:
+                pass
+        agg = obj.balances.aggregate(s=Sum("total_eur"))
         return agg["s"] or 0
     total_eur.short_description = "Súčet €"
 
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        if obj.ended_at is not None:
+            summaries.freeze(obj)
+        else:
+            summaries.invalidate([obj.pk])
+        active_session.invalidate()
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        active_session.invalidate()
+
+    def delete_queryset(self, request, queryset):
+        super().delete_queryset(request, queryset)
+        active_session.invalidate()
+
 @admin.register(Transaction)
 class TransactionAdmin(admin.ModelAdmin):
     list_display = ("created_at", "person", "item", "session", "price_at_time")
     list_filter = ("item__category", "person__is_guest")
     search_fields = ("person__name", "item__name")
 
+    # admin môže zmeniť session/osobu/cenu → starý stav odpočítaj, nový pripočítaj;
+    # snapshot sa obnoví starej aj novej session (ak sú uzavreté)
+    def save_model(self, request, obj, form, change):
+        sessions = {obj.session_id}
+        if change:
+            old = Transaction.objects.get(pk=obj.pk)
+            sessions.add(old.session_id)
+            ledger.unrecord([old])
+        super().save_model(request, obj, form, change)
+        ledger.record([obj])
+        summaries.refreeze(sessions)
+
+    def delete_model(self, request, obj):
+        ledger.unrecord([obj])
+        super().delete_model(request, obj)
+        summaries.refreeze([obj.session_id])
+
+    def delete_queryset(self, request, queryset):
+        with summaries.refreezing(queryset):
+            ledger.unrecord_queryset(queryset)
+            super().delete_queryset(request, queryset)
+
+
+@admin.register(SessionPersonBalance)
+class SessionPersonBalanceAdmin(admin.ModelAdmin):
+    list_display = ("session", "person", "total_eur", "count_items")
+    list_filter = ("session",)
+    search_fields = ("person__name",)
+
 
 @admin.register(CoffeePreset)
-class CoffeePresetAdmin(admin.ModelAdmin):
+class CoffeePresetAdmin(VersionBumpAdmin):
+    bumps = (PRESETS_VERSION,)
     list_display = ("label", "g_min", "g_max", "extra_eur", "created_at")
     search_fields = ("label", "note")
     list_editable = ("g_min", "g_max", "extra_eur")
-    ordering = ("g_min", "id")
\ No newline at end of file
+    ordering = ("g_min", "id")
+
+@admin.register(StatsRollup)
+class StatsRollupAdmin(admin.ModelAdmin):
+    list_display = ("hour", "session", "person", "item", "tx_count", "qty", "eur")
+    list_filter = ("session",)
+    search_fields = ("person__name", "item__name")
+    date_hierarchy = "hour"
+
+
+@admin.register(SessionSummary)
+class SessionSummaryAdmin(admin.ModelAdmin):
+    list_display = ("session", "total_eur", "tx_count", "frozen_at")
+    readonly_fields = ("session", "total_eur", "tx_count", "data", "frozen_at")
+
+
+@admin.register(StockMovement)
+class StockMovementAdmin(admin.ModelAdmin):
+    list_display = ("created_at", "item", "reason", "delta", "balance", "ref")
+    list_filter = ("reason", "item")
+    search_fields = ("item__name", "ref")
+    readonly_fields = ("item", "delta", "balance", "reason", "ref", "created_at")
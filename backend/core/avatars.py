@@ -0,0 +1,195 @@
+"""
+Náhľady avatarov: štvorcové WebP a JPEG v pevných veľkostiach (AVATAR_THUMB_SIZES).
+
+Originál sa dekóduje raz (JPEG rovno v zmenšenom drafte), otočí podľa EXIF, oreže na
+štvorec v najväčšej veľkosti a z neho sa zmenšia ostatné. Súbory sú adresované obsahom
+originálu (avatars/thumbs/ab/<sha256>-<veľkosť>.<ext>), takže rovnaká fotka u viacerých
+osôb zdieľa náhľady a URL sa pri zmene obsahu nikdy nepoužije znova — core.media ich preto
+servíruje s Cache-Control: immutable.
+Person.avatar_hash drží digest; PersonSerializer z neho skladá avatar_srcset.
+"""
+import hashlib
+import io
+import logging
+import os
+import re
+import uuid
+from functools import lru_cache
+from urllib.parse import urlparse
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from . import versioning
+from .models import Person
+
+log = logging.getLogger(__name__)
+
+THUMB_DIR = "avatars/thumbs"
+DIGEST_LENGTH = 32
+FORMATS = (("webp", "webp", {"quality": 80, "method": 4}),
+           ("jpeg", "jpg", {"quality": 82, "optimize": True, "progressive": True}))
+_VARIANT = re.compile(
+    rf"{re.escape(THUMB_DIR)}/[0-9a-f]{{2}}/[0-9a-f]{{{DIGEST_LENGTH}}}-\d+\.(?:{'|'.join(e for _, e, _ in FORMATS)})"
+)
+
+
+def sizes():
+    return sorted(getattr(settings, "AVATAR_THUMB_SIZES", (96, 160, 320)))
+
+
+def _storage():
+    return Person._meta.get_field("avatar").storage
+
+
+def content_digest(data):
+    return hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]
+
+
+def variant_name(digest, size, ext):
+    return f"{THUMB_DIR}/{digest[:2]}/{digest}-{size}.{ext}"
+
+
+def is_variant(name):
+    """Je name (relatívne k MEDIA_ROOT) náhľad adresovaný obsahom? Jeho bajty sa nikdy nezmenia."""
+    return _VARIANT.fullmatch(name) is not None
+
+
+def variant_names(digest):
+    return [variant_name(digest, size, ext) for size in sizes() for _, ext, _ in FORMATS]
+
+
+def complete(digest):
+    """Existujú všetky náhľady pre digest (pri aktuálnych veľkostiach)?"""
+    storage = _storage()
+    return all(storage.exists(name) for name in variant_names(digest))
+
+
+def generate(data, force=False):
+    """
+    Vyrobí chýbajúce náhľady pre bajty originálu a vráti digest. Ak už existujú
+    (tá istá fotka inde), nič nedekóduje. Nečitateľný obrázok → ValueError.
+    """
+    digest = content_digest(data)
+    if not force and complete(digest):
+        return digest
+    largest = sizes()[-1]
+    try:
+        with Image.open(io.BytesIO(data)) as img:
+            img.draft("RGB", (largest, largest))  # JPEG sa dekóduje rovno zmenšený (min. na largest)
+            img = ImageOps.exif_transpose(img)
+            square = ImageOps.fit(_normalize_mode(img), (largest, largest), Image.Resampling.LANCZOS)
+    except (OSError, Image.DecompressionBombError) as e:
+        raise ValueError(f"nečitateľný obrázok: {e}") from e
+
+    storage = _storage()
+    for size in reversed(sizes()):
+        thumb = square if size == largest else square.resize((size, size), Image.Resampling.LANCZOS)
+        for fmt, ext, options in FORMATS:
+            name = variant_name(digest, size, ext)
+            if not force and storage.exists(name):
+                continue
+            buf = io.BytesIO()
+            image = _flatten(thumb) if fmt == "jpeg" else thumb
+            image.save(buf, fmt, **options)
+            write_variant(storage, name, buf.getvalue())
+    return digest
+
+
+def write_variant(storage, name, data):
+    """
+    Zapíše náhľad presne pod name — meno adresované obsahom nesmie skončiť ako
+    "<digest>-96_AbC12.webp" (Storage.save pri existujúcom súbore pridá príponu).
+    Na disku cez dočasný súbor a os.replace: dva súbežné uploady tej istej fotky len prepíšu
+    rovnaké bajty a čitateľ nikdy nevidí rozpísaný súbor. Iný storage: zmazať a uložiť.
+    """
+    if not isinstance(storage, FileSystemStorage):
+        if storage.exists(name):
+            storage.delete(name)
+        storage.save(name, ContentFile(data))
+        return
+    path = storage.path(name)
+    directory = os.path.dirname(path)
+    if storage.directory_permissions_mode is not None:
+        os.makedirs(directory, storage.directory_permissions_mode, exist_ok=True)
+    else:
+        os.makedirs(directory, exist_ok=True)
+    tmp = f"{path}.{uuid.uuid4().hex}.tmp"
+    fd = os.open(tmp, os.O_WRONLY | os.O_CREAT | os.O_EXCL | getattr(os, "O_BINARY", 0), 0o666)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        if storage.file_permissions_mode is not None:
+            os.chmod(tmp, storage.file_permissions_mode)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def _normalize_mode(img):
+    if img.mode in ("RGB", "RGBA"):
+        return img
+    has_alpha = img.mode in ("LA", "PA") or (img.mode == "P" and "transparency" in img.info)
+    return img.convert("RGBA" if has_alpha else "RGB")
+
+
+def _flatten(img):
+    """JPEG nemá alfu — priehľadnosť na bielom pozadí."""
+    if img.mode != "RGBA":
+        return img
+    background = Image.new("RGB", img.size, (255, 255, 255))
+    background.paste(img, mask=img.getchannel("A"))
+    return background
+
+
+def generate_for_file(name, force=False):
+    """Pre process pool (backfill_avatars): (name, digest alebo None, chyba alebo None)."""
+    try:
+        with _storage().open(name, "rb") as f:
+            return name, generate(f.read(), force=force), None
+    except (OSError, ValueError) as e:
+        return name, None, str(e)
+
+
+def attach(person, validated_data):
+    """
+    Po uložení cez PersonSerializer (v jeho transakcii): nový avatar → náhľady a avatar_hash,
+    zmazaný → prázdny avatar_hash. Súbory sa zapíšu až po commite, takže rollback po sebe
+    nenechá náhľady bez osoby. Pri chybe ostane osoba bez náhľadov (klient použije originál).
+    """
+    if "avatar" in validated_data:
+        transaction.on_commit(lambda: _attach(person))
+
+
+def _attach(person):
+    value = ""
+    if person.avatar:
+        try:
+            with person.avatar.open("rb") as f:
+                value = generate(f.read())
+        except (OSError, ValueError) as e:
+            log.warning("Náhľady avatara osoby %s sa nepodarilo vyrobiť: %s", person.pk, e)
+    if value != person.avatar_hash:
+        person.avatar_hash = value
+        person.save(update_fields=["avatar_hash"])
+        versioning.bump_version("persons")  # ETag zoznamu osôb už videl osobu bez avatar_srcset
+
+
+@lru_cache(maxsize=1024)
+def srcset(digest):
+    """{"webp": "url 96w, url 160w, …", "jpeg": …} pre <source>/<img srcset>, alebo None."""
+    if not digest:
+        return None
+    storage = _storage()
+    return {
+        fmt: ", ".join(f"{urlparse(storage.url(variant_name(digest, size, ext))).path} {size}w"
+                       for size in sizes())
+        for fmt, ext, _ in FORMATS
+    }
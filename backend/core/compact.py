@@ -0,0 +1,63 @@
+"""
+Kompaktný formát zoznamu transakcií (GET /api/transactions/list?format=compact).
+
+Riadok je len id a čísla v poradí COLUMNS; osoby, položky a kategórie idú každá raz
+v bočných tabuľkách persons/items/categories — v rovnakom tvare ako v plnom formáte,
+len item.category je id kategórie. Skladá sa priamo z values_list() jedného dotazu,
+bez DRF serializérov (avatar sa prekladá na URL raz na osobu, nie na riadok).
+"""
+from django.utils import timezone
+
+from .fast_serializers import PERSON, datetime_str, decimal_str
+
+COLUMNS = ["id", "session", "person", "item", "quantity", "price_at_time", "created_at"]
+ITEM_FIELDS = [
+    "id", "name", "category", "price", "pricing_mode", "note", "color", "active", "stock_quantity", "created_at",
+]
+CATEGORY_FIELDS = ["id", "name"]
+
+# values_list: stĺpce riadku, potom osoba (tvar PersonSerializer), položka a názov kategórie
+# (id osoby/položky už sú v riadku)
+VALUES = [
+    "id", "session_id", "person_id", "item_id", "quantity", "price_at_time", "created_at",
+    *(f"person__{p}" for p in PERSON.paths[1:]),
+    *(f"item__{f}" for f in ITEM_FIELDS[1:]),
+    "item__category__name",
+]
+_ROW = len(COLUMNS)
+_PERSON = _ROW + len(PERSON.paths) - 1
+_ITEM = _PERSON + len(ITEM_FIELDS) - 1
+
+
+def transactions(rows):
+    """Tuples z qs.values_list(*VALUES) → kompaktná odpoveď (bez stránkovacích kľúčov)."""
+    tz = timezone.get_current_timezone()
+    persons, items, categories = {}, {}, {}
+    out = []
+    for r in rows:
+        tx_id, session_id, person_id, item_id, quantity, price, created_at = r[:_ROW]
+        # čísla ako JSON čísla (JSONRenderer Decimal → float), nie reťazce ako v plnom formáte
+        out.append([tx_id, session_id, person_id, item_id, quantity, price, datetime_str(created_at, tz)])
+        if person_id not in persons:
+            persons[person_id] = (person_id, *r[_ROW:_PERSON])
+        if item_id not in items:
+            item = _item(item_id, r[_PERSON:_ITEM], tz)
+            items[item_id] = item
+            categories.setdefault(item["category"], {"id": item["category"], "name": r[_ITEM]})
+    return {
+        "format": "compact",
+        "columns": COLUMNS,
+        "rows": out,
+        "persons": PERSON.build(persons.values()),
+        "items": list(items.values()),
+        "categories": list(categories.values()),
+    }
+
+
+def _item(item_id, values, tz):
+    name, category_id, price, pricing_mode, note, color, active, stock_quantity, created_at = values
+    return {
+        "id": item_id, "name": name, "category": category_id, "price": decimal_str(price),
+        "pricing_mode": pricing_mode, "note": note, "color": color, "active": active,
+        "stock_quantity": decimal_str(stock_quantity), "created_at": datetime_str(created_at, tz),
+    }
@@ -0,0 +1,180 @@
+"""
+Kompresia odpovedí (CompressionMiddleware): brotli alebo gzip podľa Accept-Encoding.
+
+Komprimujú sa len textové typy (JSON, HTML, text, JS/CSS, SVG) od COMPRESSION_MIN_BYTES;
+obrázky a iné už komprimované médiá, SSE (text/event-stream — kompresor by držal udalosti
+v buffri), odpovede s Content-Encoding a čiastočné 206 ostávajú tak, ako sú. Streaming odpoveď sa
+komprimuje po kusoch (sync aj async iterátor); kompresor kusy nezhadzuje hneď, ale
+posiela celé bloky — malé kusy by sa inak s flushom každého z nich zväčšili.
+
+Na každú skomprimovanú odpoveď sa do core.metrics zapíšu bajty pred/po a CPU čas vlákna,
+vynechané odpovede sa počítajú podľa dôvodu — podľa toho sa ladí prah a úroveň.
+Brotli je voliteľné (balík Brotli); bez neho sa ponúka len gzip.
+"""
+import re
+import time
+import zlib
+
+from django.conf import settings
+from django.utils.cache import patch_vary_headers
+
+from . import metrics
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - voliteľná závislosť
+    brotli = None
+
+COMPRESSIBLE_TYPES = {
+    "application/json", "application/javascript", "application/xml", "application/problem+json",
+    "application/vnd.oai.openapi", "application/vnd.oai.openapi+json", "image/svg+xml",
+}
+UNCOMPRESSED_TEXT_TYPES = {"text/event-stream"}
+_ACCEPT = re.compile(r"\s*([\w*-]+)\s*(?:;\s*q\s*=\s*([0-9.]+))?\s*")
+
+
+def _setting(name, default):
+    return getattr(settings, name, default)
+
+
+def negotiate(accept_encoding):
+    """Najlepšie kódovanie, ktoré klient prijme ("br", "gzip") alebo None. Pri zhode q vyhrá br."""
+    q = {}
+    for part in accept_encoding.split(","):
+        m = _ACCEPT.fullmatch(part)
+        if not m:
+            continue
+        try:
+            q[m.group(1).lower()] = float(m.group(2)) if m.group(2) is not None else 1.0
+        except ValueError:
+            continue
+    wildcard = q.get("*", 0.0)
+    offered = ("br", "gzip") if brotli is not None and _setting("COMPRESSION_BROTLI", True) else ("gzip",)
+    best, best_q = None, 0.0
+    for encoding in offered:
+        value = q.get(encoding, wildcard)
+        if value > best_q:
+            best, best_q = encoding, value
+    return best
+
+
+def compressible_type(content_type):
+    media = content_type.split(";", 1)[0].strip().lower()
+    if media in UNCOMPRESSED_TEXT_TYPES:
+        return False
+    return media.startswith("text/") or media in COMPRESSIBLE_TYPES or media.endswith("+json")
+
+
+class Encoder:
+    """Inkrementálny kompresor s jednotným rozhraním pre gzip aj brotli."""
+
+    def __init__(self, encoding):
+        self.encoding = encoding
+        if encoding == "br":
+            self._c = brotli.Compressor(quality=_setting("COMPRESSION_BROTLI_QUALITY", 5))
+        else:
+            # wbits 31 = gzip hlavička a pätička
+            self._c = zlib.compressobj(_setting("COMPRESSION_GZIP_LEVEL", 6), zlib.DEFLATED, 31)
+
+    def chunk(self, data):
+        """Pridá kus; vráti to, čo má kompresor hotové (môže byť aj prázdne)."""
+        if self.encoding == "br":
+            return self._c.process(data)
+        return self._c.compress(data)
+
+    def finish(self, data=b""):
+        if self.encoding == "br":
+            return self._c.process(data) + self._c.finish()
+        return self._c.compress(data) + self._c.flush(zlib.Z_FINISH)
+
+
+def compress_response(request, response):
+    """Skomprimuje response na mieste (ak sa dá a oplatí); vždy ho vráti."""
+    view = metrics.view_label(request)
+    if response.has_header("Content-Encoding"):
+        return _skip(view, "encoded", response)
+    if response.status_code == 206:
+        # Content-Range počíta bajty nekomprimovaného súboru (core.media)
+        return _skip(view, "range", response)
+    if not compressible_type(response.get("Content-Type", "")):
+        return _skip(view, "type", response)
+    if "no-transform" in response.get("Cache-Control", ""):
+        return _skip(view, "no-transform", response)
+    if not response.streaming and len(response.content) < _setting("COMPRESSION_MIN_BYTES", 1024):
+        return _skip(view, "small", response)
+
+    # odpoveď sa môže líšiť podľa Accept-Encoding, aj keď tento klient dostane nekomprimovanú
+    patch_vary_headers(response, ("Accept-Encoding",))
+    encoding = negotiate(request.META.get("HTTP_ACCEPT_ENCODING", ""))
+    if encoding is None:
+        return _skip(view, "not-accepted", response)
+
+    if response.streaming:
+        if response.is_async:
+            response.streaming_content = _compress_async(response.streaming_content, encoding, view)
+        else:
+            response.streaming_content = _compress_sync(response.streaming_content, encoding, view)
+        response.headers.pop("Content-Length", None)
+    else:
+        body = response.content
+        t0 = time.thread_time()
+        compressed = Encoder(encoding).finish(body)
+        cpu = time.thread_time() - t0
+        if len(compressed) >= len(body):
+            return _skip(view, "larger", response)
+        metrics.registry.observe_compression(view, encoding, len(body), len(compressed), cpu)
+        response.content = compressed
+        response["Content-Length"] = str(len(compressed))
+
+    # silný ETag sa viaže na bajty tela — po kompresii platí už len ako slabý
+    etag = response.get("ETag")
+    if etag and etag.startswith('"'):
+        response["ETag"] = "W/" + etag
+    response["Content-Encoding"] = encoding
+    return response
+
+
+def _skip(view, reason, response):
+    metrics.registry.skip_compression(view, reason)
+    return response
+
+
+class _StreamStats:
+    def __init__(self, encoding, view):
+        self.encoder = Encoder(encoding)
+        self.view = view
+        self.bytes_in = self.bytes_out = 0
+        self.cpu = 0.0
+
+    def chunk(self, data, last=False):
+        t0 = time.thread_time()
+        out = self.encoder.finish(data) if last else self.encoder.chunk(data)
+        self.cpu += time.thread_time() - t0
+        self.bytes_in += len(data)
+        self.bytes_out += len(out)
+        return out
+
+    def record(self):
+        metrics.registry.observe_compression(
+            self.view, self.encoder.encoding, self.bytes_in, self.bytes_out, self.cpu,
+        )
+
+
+def _compress_sync(chunks, encoding, view):
+    stream = _StreamStats(encoding, view)
+    for data in chunks:
+        out = stream.chunk(data)
+        if out:
+            yield out
+    yield stream.chunk(b"", last=True)
+    stream.record()
+
+
+async def _compress_async(chunks, encoding, view):
+    stream = _StreamStats(encoding, view)
+    async for data in chunks:
+        out = stream.chunk(data)
+        if out:
+            yield out
+    yield stream.chunk(b"", last=True)
+    stream.record()
@@ -0,0 +1,37 @@
+"""
+execute_wrapper-y nainštalované na všetkých DB spojeniach procesu.
+
+connection.execute_wrapper() ako context manager platí len pre spojenie aktuálneho
+vlákna; async ORM a sync_to_async však dotazy púšťajú vo vláknach executora.
+Registrovaný wrapper sa preto pridá každému novému spojeniu (signál connection_created)
+a pri install() aj už otvoreným spojeniam volajúceho vlákna. Wrapper sám rozhodne
+(typicky podľa ContextVar), či dotaz meria — ContextVar sa do sync_to_async prenáša.
+"""
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+_wrappers = []
+
+
+def register(wrapper):
+    if wrapper not in _wrappers:
+        _wrappers.append(wrapper)
+
+
+def _install(connection):
+    for wrapper in _wrappers:
+        if wrapper not in connection.execute_wrappers:
+            connection.execute_wrappers.append(wrapper)
+
+
+def install():
+    """Doplní wrappery spojeniam aktuálneho vlákna (otvoreným ešte pred registráciou)."""
+    for alias in connections:
+        _install(connections[alias])
+
+
+def _on_connection_created(sender, connection, **kwargs):
+    _install(connection)
+
+
+connection_created.connect(_on_connection_created)
@@ -0,0 +1,134 @@
+"""
+Stream zmien ledgera pre klientov (Server-Sent Events, GET /api/events).
+
+View po zápise zavolá publish(); udalosť sa po commite rozošle odberateľom
+cez lokálny hub (ring buffer + asyncio fronty). Ak beží viac worker procesov
+(settings.EVENTS_PG_NOTIFY), udalosť ide cez Postgres NOTIFY — doručí sa až
+po commite — a každý worker ju prijme vlastným LISTEN vláknom.
+
+Klient pri reconnecte pošle Last-Event-ID a dostane, čo zmeškal; ak to už
+nie je v buffri, príde udalosť "reset" (načítaj si všetko znova).
+
+Id udalosti je len jedinečný token (vzniká pred commitom, takže poradie nesie).
+Poradie určuje pozícia v histórii hubu = poradie doručenia do dispatch(), teda
+poradie commitov (on_commit v procese, NOTIFY medzi workermi) — backlog je
+všetko za pozíciou udalosti s id Last-Event-ID.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, connections, transaction
+
+log = logging.getLogger(__name__)
+
+CHANNEL = "drinkcounter_events"
+HISTORY_SIZE = 500
+QUEUE_SIZE = 1000
+
+
+class EventHub:
+    def __init__(self, history_size=HISTORY_SIZE):
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history_size)  # v poradí doručenia (commitov)
+        self._subscribers = {}  # queue -> loop
+
+    def dispatch(self, event):
+        """event = {"id": str, "type": str, "data": dict}; volateľné z ľubovoľného vlákna."""
+        with self._lock:
+            self._history.append(event)
+            subscribers = list(self._subscribers.items())
+        for queue, loop in subscribers:
+            loop.call_soon_threadsafe(_offer, queue, event)
+
+    def subscribe(self, last_event_id=None):
+        """
+        Zaregistruje frontu v bežiacom event loope. Vráti (queue, backlog, reset):
+        backlog sú udalosti doručené po last_event_id, reset=True ak ho história už
+        (alebo ešte) nepozná — medzera sa nedá doplniť.
+        """
+        queue = asyncio.Queue(maxsize=QUEUE_SIZE)
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._subscribers[queue] = loop
+            history = list(self._history)
+        if last_event_id is None:
+            return queue, [], False
+        for position in range(len(history) - 1, -1, -1):
+            if history[position]["id"] == last_event_id:
+                return queue, history[position + 1:], False
+        return queue, [], True
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self._subscribers.pop(queue, None)
+
+
+def _offer(queue, event):
+    try:
+        queue.put_nowait(event)
+    except asyncio.QueueFull:
+        # pomalý klient — odpoj ho (None), po reconnecte dostane backlog alebo reset
+        while not queue.empty():
+            queue.get_nowait()
+        queue.put_nowait(None)
+
+
+hub = EventHub()
+
+
+def publish(event_type, data):
+    """Oznámi zmenu; odberatelia ju dostanú až po commite aktuálnej DB transakcie."""
+    event = {"id": uuid.uuid4().hex, "type": event_type, "data": data}
+    if settings.EVENTS_PG_NOTIFY:
+        # NOTIFY v rámci transakcie sa doručí len pri commite (pri rollbacku vôbec)
+        with connection.cursor() as cur:
+            cur.execute("SELECT pg_notify(%s, %s)", [CHANNEL, json.dumps(event, cls=DjangoJSONEncoder)])
+    else:
+        payload = json.loads(json.dumps(event, cls=DjangoJSONEncoder))
+        transaction.on_commit(lambda: hub.dispatch(payload))
+
+
+def format_sse(event):
+    return f"id: {event['id']}\ndata: {json.dumps({'type': event['type'], **event['data']})}\n\n"
+
+
+# ===== Postgres LISTEN (viac workerov) =====
+_listener = None
+_listener_lock = threading.Lock()
+
+
+def ensure_listener():
+    """Spustí (raz za proces) vlákno, ktoré LISTEN-uje na CHANNEL a plní lokálny hub."""
+    global _listener
+    if not settings.EVENTS_PG_NOTIFY:
+        return
+    with _listener_lock:
+        if _listener is None or not _listener.is_alive():
+            _listener = threading.Thread(target=_listen_forever, name="events-listener", daemon=True)
+            _listener.start()
+
+
+def _listen_forever():
+    wrapper = connections["default"]
+    while True:
+        conn = None
+        try:
+            # vlastné spojenie mimo poolu — LISTEN ho drží natrvalo
+            conn = wrapper.Database.connect(**wrapper.get_connection_params(), autocommit=True)
+            conn.execute(f"LISTEN {CHANNEL}")
+            while True:
+                for notify in conn.notifies(timeout=30):
+                    hub.dispatch(json.loads(notify.payload))
+        except Exception:
+            log.exception("events: LISTEN spojenie zlyhalo, skúšam znova")
+            time.sleep(5)
+        finally:
+            if conn is not None:
+                conn.close()
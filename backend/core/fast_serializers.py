@@ -0,0 +1,139 @@
+"""
+Rýchla serializácia pre čítacie endpointy (zoznam osôb, položiek, transakcií, várok).
+
+Tvar (Shape) opisuje rovnaký JSON ako DRF serializér v core.serializers, ale plní sa
+z values_list() tuple-ov: bez model inštancií a bez DRF fields po poliach, konverzie
+(Decimal, datetime, avatar, srcset) sú vopred zvolené pre každý stĺpec. DRF serializéry ostávajú
+na validáciu a zápisy; zhodu výstupu stráži FastSerializerParityTests.
+"""
+from urllib.parse import urlparse
+
+from django.utils import timezone
+
+from . import avatars
+from .models import BrewBatchIngredient, Person
+
+DATETIME = "datetime"
+DECIMAL = "decimal"
+AVATAR = "avatar"
+SRCSET = "srcset"
+
+
+def datetime_str(value, tz):
+    """Rovnaký reťazec ako DRF DateTimeField (ISO 8601 v aktuálnej zóne, UTC ako Z)."""
+    if value is None:
+        return None
+    value = value.astimezone(tz).isoformat()
+    return value[:-6] + "Z" if value.endswith("+00:00") else value
+
+
+def decimal_str(value):
+    """Rovnaký reťazec ako DRF DecimalField (hodnota z DB už má škálu stĺpca)."""
+    return None if value is None else format(value, "f")
+
+
+def avatar_url(name):
+    """Relatívna URL avataru ako v PersonSerializer (bez hostu)."""
+    if not name:
+        return None
+    return urlparse(Person._meta.get_field("avatar").storage.url(name)).path
+
+
+class Shape:
+    """
+    Polia objektu v poradí kľúčov: (kľúč, cesta, konverzia) alebo (kľúč, Shape) pre vnorený
+    objekt — jeho cesty dostanú prefix `kľúč__`. `paths` sú stĺpce pre values_list().
+    """
+
+    def __init__(self, *fields):
+        self.fields = fields
+        self.paths = self._paths("")
+
+    def _paths(self, prefix):
+        out = []
+        for key, *rest in self.fields:
+            if isinstance(rest[0], Shape):
+                out += rest[0]._paths(f"{prefix}{key}__")
+            else:
+                out.append(prefix + rest[0])
+        return out
+
+    def index(self, path):
+        return self.paths.index(path)
+
+    def many(self, queryset):
+        return self.build(queryset.values_list(*self.paths))
+
+    def build(self, rows):
+        """Tuples z values_list(*self.paths) → zoznam dictov."""
+        steps = self._compile(timezone.get_current_timezone())
+        return [_run(steps, row, 0)[0] for row in rows]
+
+    def _compile(self, tz):
+        converters = {
+            None: None,
+            DATETIME: lambda value: datetime_str(value, tz),
+            DECIMAL: decimal_str,
+            AVATAR: avatar_url,
+            SRCSET: avatars.srcset,
+        }
+        steps = []
+        for key, *rest in self.fields:
+            if isinstance(rest[0], Shape):
+                steps.append((key, None, rest[0]._compile(tz)))
+            else:
+                steps.append((key, converters[rest[1] if len(rest) > 1 else None], None))
+        return steps
+
+
+def _run(steps, row, pos):
+    out = {}
+    for key, convert, nested in steps:
+        if nested is not None:
+            out[key], pos = _run(nested, row, pos)
+            continue
+        value = row[pos]
+        pos += 1
+        out[key] = value if convert is None or value is None else convert(value)
+    return out, pos
+
+
+# ===== Tvary (zodpovedajú serializérom v core.serializers) =====
+PERSON = Shape(  # PersonSerializer
+    ("id", "id"), ("name", "name"), ("email", "email"), ("avatar", "avatar", AVATAR),
+    ("avatar_srcset", "avatar_hash", SRCSET), ("is_guest", "is_guest"), ("active", "active"), ("created_at", "created_at", DATETIME),
+    ("total_beers", "total_beers"), ("total_coffees", "total_coffees"),
+)
+CATEGORY = Shape(("id", "id"), ("name", "name"))  # CategorySerializer
+ITEM = Shape(  # ItemSerializer (čítanie)
+    ("id", "id"), ("name", "name"), ("category", CATEGORY),
+    ("price", "price", DECIMAL), ("pricing_mode", "pricing_mode"),
+    ("note", "note"), ("color", "color"), ("active", "active"),
+    ("stock_quantity", "stock_quantity", DECIMAL), ("created_at", "created_at", DATETIME),
+)
+TRANSACTION = Shape(  # TransactionSerializer
+    ("id", "id"), ("session", "session_id"), ("person", PERSON), ("item", ITEM),
+    ("quantity", "quantity", DECIMAL), ("price_at_time", "price_at_time", DECIMAL),
+    ("created_at", "created_at", DATETIME),
+)
+BREW_BATCH = Shape(  # BrewBatchSerializer bez ingrediencií (tie dopĺňa brew_batches)
+    ("id", "id"), ("output_item", ITEM), ("output_ml", "output_ml", DECIMAL),
+    ("note", "note"), ("created_at", "created_at", DATETIME),
+)
+BREW_INGREDIENT = Shape(  # BrewBatchIngredientSerializer
+    ("coffee", ITEM), ("grams", "grams", DECIMAL), ("sort_order", "sort_order"),
+)
+
+
+def brew_batches(queryset):
+    """BrewBatchSerializer(many=True) pre queryset várok: dva dotazy, ingrediencie v poradí modelu."""
+    rows = list(queryset.values_list(*BREW_BATCH.paths))
+    ingredients = {row[0]: [] for row in rows}
+    ing_rows = list(
+        BrewBatchIngredient.objects.filter(batch_id__in=list(ingredients))
+        .values_list("batch_id", *BREW_INGREDIENT.paths)
+    )
+    for (batch_id, *_), ingredient in zip(ing_rows, BREW_INGREDIENT.build(r[1:] for r in ing_rows)):
+        ingredients[batch_id].append(ingredient)
+    # poradie kľúčov ako v BrewBatchSerializer.Meta.fields
+    return [{"id": b["id"], "ingredients": ingredients[b["id"]], **b} for b in BREW_BATCH.build(rows)]
@@ -0,0 +1,254 @@
+"""
+Inkrementálne udržiavané agregáty nad Transaction.
+
+Každé view, ktoré vytvára, mení alebo maže transakcie, zavolá príslušnú funkciu
+v tej istej DB transakcii — agregáty sa tak nikdy nerozídu s ledgerom.
+Pre istotu ich vie `manage.py rebuild_balances` / `rebuild_stats` prepočítať a overiť.
+
+Agregáty:
+  * SessionPersonBalance — (session, person) → €, počet (session/active, dlhy)
+  * StatsRollup — (hodina, session, person, item) → počet, množstvo, € (/api/stats)
+Zmrazené súhrny uzavretých session (core.summaries) tu nie sú — obnovujú ich len
+admin cesty (summaries.refreeze), kiosk mení iba otvorenú session.
+"""
+from collections import defaultdict
+from datetime import timezone as dt_timezone
+from decimal import Decimal
+
+from django.db import connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncHour
+
+from .models import SessionPersonBalance, StatsRollup, Transaction
+
+
+def record(txs):
+    """Nové transakcie (už uložené)."""
+    _apply_balance_deltas(_balance_deltas(txs, 1))
+    _apply_rollup_deltas(_rollup_deltas(txs, 1))
+
+
+def unrecord(txs):
+    """Transakcie, ktoré sa idú mazať."""
+    _apply_balance_deltas(_balance_deltas(txs, -1))
+    _apply_rollup_deltas(_rollup_deltas(txs, -1))
+
+
+def unrecord_queryset(qs):
+    """Ako unrecord(), ale agreguje priamo v DB (hromadné mazanie, kaskády)."""
+    rows = list(
+        qs.order_by()
+        .annotate(hour=TruncHour("created_at", tzinfo=dt_timezone.utc))
+        .values("hour", "session_id", "person_id", "item_id")
+        .annotate(eur=Sum("price_at_time"), qty=Sum("quantity"), n=Count("id"))
+    )
+    balances = defaultdict(lambda: [Decimal("0"), 0])
+    for r in rows:
+        d = balances[(r["session_id"], r["person_id"])]
+        d[0] -= r["eur"]
+        d[1] -= r["n"]
+    _apply_balance_deltas(balances)
+    _apply_rollup_deltas({
+        (r["hour"], r["session_id"], r["person_id"], r["item_id"]): (-r["n"], -r["qty"], -r["eur"])
+        for r in rows
+    })
+
+
+def adjust(tx, old_price, old_quantity):
+    """Zmena price_at_time / quantity existujúcej transakcie."""
+    if tx.price_at_time != old_price:
+        _apply_balance_deltas({(tx.session_id, tx.person_id): (tx.price_at_time - old_price, 0)})
+    if tx.price_at_time != old_price or tx.quantity != old_quantity:
+        _apply_rollup_deltas({
+            _rollup_key(tx): (0, tx.quantity - old_quantity, tx.price_at_time - old_price)
+        })
+
+
+def _balance_deltas(txs, sign):
+    deltas = defaultdict(lambda: [Decimal("0"), 0])
+    for t in txs:
+        d = deltas[(t.session_id, t.person_id)]
+        d[0] += sign * t.price_at_time
+        d[1] += sign
+    return deltas
+
+
+def _apply_balance_deltas(deltas):
+    """Jeden INSERT … ON CONFLICT pre všetky dotknuté (session, person)."""
+    if not deltas:
+        return
+    # zoradené kľúče → súbežné upserty zamykajú riadky v rovnakom poradí
+    keys = sorted(deltas)
+    params = []
+    for key in keys:
+        eur, n = deltas[key]
+        params.extend([key[0], key[1], eur, n])
+    values = ", ".join(["(%s, %s, %s, %s)"] * len(keys))
+    with connection.cursor() as cur:
+        cur.execute(_balance_upsert(f"VALUES {values}"), params)
+
+
+def _balance_upsert(rows):
+    """INSERT … ON CONFLICT do SessionPersonBalance; `rows` je VALUES alebo SELECT (session, person, €, počet)."""
+    table = SessionPersonBalance._meta.db_table
+    return f"""
+        INSERT INTO {table} (session_id, person_id, total_eur, count_items)
+        {rows}
+        ON CONFLICT (session_id, person_id) DO UPDATE SET
+            total_eur = {table}.total_eur + EXCLUDED.total_eur,
+            count_items = {table}.count_items + EXCLUDED.count_items
+    """
+
+
+def _rollup_key(t):
+    hour = t.created_at.astimezone(dt_timezone.utc).replace(minute=0, second=0, microsecond=0)
+    return (hour, t.session_id, t.person_id, t.item_id)
+
+
+def _rollup_deltas(txs, sign):
+    deltas = defaultdict(lambda: [0, Decimal("0"), Decimal("0")])
+    for t in txs:
+        d = deltas[_rollup_key(t)]
+        d[0] += sign
+        d[1] += sign * t.quantity
+        d[2] += sign * t.price_at_time
+    return deltas
+
+
+def _apply_rollup_deltas(deltas):
+    """Jeden INSERT … ON CONFLICT pre všetky dotknuté (hour, session, person, item)."""
+    if not deltas:
+        return
+    keys = sorted(deltas)
+    params = []
+    for key in keys:
+        params.extend([*key, *deltas[key]])
+    values = ", ".join(["(%s, %s, %s, %s, %s, %s, %s)"] * len(keys))
+    with connection.cursor() as cur:
+        cur.execute(_rollup_upsert(f"VALUES {values}"), params)
+
+
+def _rollup_upsert(rows):
+    """INSERT … ON CONFLICT do StatsRollup; `rows` je VALUES alebo SELECT (hour, session, person, item, počet, qty, €)."""
+    table = StatsRollup._meta.db_table
+    return f"""
+        INSERT INTO {table} (hour, session_id, person_id, item_id, tx_count, qty, eur)
+        {rows}
+        ON CONFLICT (hour, session_id, person_id, item_id) DO UPDATE SET
+            tx_count = {table}.tx_count + EXCLUDED.tx_count,
+            qty = {table}.qty + EXCLUDED.qty,
+            eur = {table}.eur + EXCLUDED.eur
+    """
+
+
+def record_ctes(source):
+    """
+    Ako record(), ale ako CTE klauzuly do jedného SQL príkazu: zaúčtujú riadky CTE `source`
+    (RETURNING z INSERT INTO Transaction). Použitie: "WITH src AS (INSERT … RETURNING *), " + record_ctes("src").
+    """
+    balances = _balance_upsert(
+        f"SELECT session_id, person_id, SUM(price_at_time), COUNT(*) FROM {source} GROUP BY 1, 2"
+    )
+    rollups = _rollup_upsert(
+        f"SELECT date_trunc('hour', created_at, 'UTC'), session_id, person_id, item_id, "
+        f"COUNT(*), SUM(quantity), SUM(price_at_time) FROM {source} GROUP BY 1, 2, 3, 4"
+    )
+    return f"ledger_balances AS ({balances}), ledger_rollups AS ({rollups})"
+
+
+# ===== Rebuild / verify =====
+def rebuild_balances(session_ids=None):
+    """Zahodí a znova napočíta SessionPersonBalance z Transaction (voliteľne len pre dané session)."""
+    table = SessionPersonBalance._meta.db_table
+    tx_table = Transaction._meta.db_table
+    where, params = "", []
+    if session_ids is not None:
+        where, params = "WHERE session_id = ANY(%s)", [list(session_ids)]
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {table} {where}", params)
+        cur.execute(
+            f"""
+            INSERT INTO {table} (session_id, person_id, total_eur, count_items)
+            SELECT session_id, person_id, SUM(price_at_time), COUNT(*)
+            FROM {tx_table} {where}
+            GROUP BY session_id, person_id
+            """,
+            params,
+        )
+
+
+def diff_balances(session_ids=None):
+    """
+    Porovná materializované zostatky so surovým ledgerom.
+    Vráti zoznam (session_id, person_id, (eur, count) v tabuľke, (eur, count) z ledgera).
+    """
+    expected_qs = Transaction.objects.order_by().values("session_id", "person_id").annotate(
+        eur=Sum("price_at_time"), n=Count("id")
+    )
+    actual_qs = SessionPersonBalance.objects.filter(count_items__gt=0)
+    if session_ids is not None:
+        expected_qs = expected_qs.filter(session_id__in=session_ids)
+        actual_qs = actual_qs.filter(session_id__in=session_ids)
+
+    expected = {(r["session_id"], r["person_id"]): (r["eur"], r["n"]) for r in expected_qs}
+    actual = {
+        (b.session_id, b.person_id): (b.total_eur, b.count_items) for b in actual_qs
+    }
+    missing = (None, 0)
+    return [
+        (key[0], key[1], actual.get(key, missing), expected.get(key, missing))
+        for key in sorted(set(expected) | set(actual))
+        if actual.get(key, missing) != expected.get(key, missing)
+    ]
+
+
+def rebuild_rollups(session_ids=None):
+    """Zahodí a znova napočíta StatsRollup z Transaction (voliteľne len pre dané session)."""
+    table = StatsRollup._meta.db_table
+    tx_table = Transaction._meta.db_table
+    where, params = "", []
+    if session_ids is not None:
+        where, params = "WHERE session_id = ANY(%s)", [list(session_ids)]
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(f"DELETE FROM {table} {where}", params)
+        cur.execute(
+            f"""
+            INSERT INTO {table} (hour, session_id, person_id, item_id, tx_count, qty, eur)
+            SELECT date_trunc('hour', created_at, 'UTC'), session_id, person_id, item_id,
+                   COUNT(*), SUM(quantity), SUM(price_at_time)
+            FROM {tx_table} {where}
+            GROUP BY 1, session_id, person_id, item_id
+            """,
+            params,
+        )
+
+
+def diff_rollups(session_ids=None):
+    """
+    Porovná StatsRollup so surovým ledgerom.
+    Vráti zoznam ((hour, session, person, item), (count, qty, eur) v tabuľke, (count, qty, eur) z ledgera).
+    """
+    expected_qs = (
+        Transaction.objects.order_by()
+        .annotate(hour=TruncHour("created_at", tzinfo=dt_timezone.utc))
+        .values("hour", "session_id", "person_id", "item_id")
+        .annotate(n=Count("id"), qty=Sum("quantity"), eur=Sum("price_at_time"))
+    )
+    actual_qs = StatsRollup.objects.exclude(tx_count=0, qty=0, eur=0)
+    if session_ids is not None:
+        expected_qs = expected_qs.filter(session_id__in=session_ids)
+        actual_qs = actual_qs.filter(session_id__in=session_ids)
+
+    expected = {
+        (r["hour"], r["session_id"], r["person_id"], r["item_id"]): (r["n"], r["qty"], r["eur"])
+        for r in expected_qs
+    }
+    actual = {
+        (r.hour, r.session_id, r.person_id, r.item_id): (r.tx_count, r.qty, r.eur) for r in actual_qs
+    }
+    missing = (0, None, None)
+    return [
+        (key, actual.get(key, missing), expected.get(key, missing))
+        for key in sorted(set(expected) | set(actual))
+        if actual.get(key, missing) != expected.get(key, missing)
+    ]
@@ -0,0 +1,60 @@
+"""
+Náhľady pre avatary nahraté pred core.avatars (alebo po zmene AVATAR_THUMB_SIZES):
+dekódovanie a kódovanie beží v process poole, DB zápisy robí hlavný proces.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections, transaction
+
+from core import avatars, versioning
+from core.models import Person
+
+
+class Command(BaseCommand):
+    help = (
+        "Vyrobí WebP/JPEG náhľady avatarov, ktoré ich ešte nemajú (alebo im chýba niektorá veľkosť), "
+        "a doplní Person.avatar_hash."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                            help="Počet procesov (predvolene počet CPU).")
+        parser.add_argument("--force", action="store_true",
+                            help="Prekóduj aj existujúce náhľady (napr. po zmene kvality).")
+
+    def handle(self, *args, workers=None, force=False, **options):
+        persons = list(Person.objects.exclude(avatar="").exclude(avatar__isnull=True)
+                       .values_list("pk", "avatar", "avatar_hash"))
+        todo = {}
+        for pk, name, digest in persons:
+            if force or not digest or not avatars.complete(digest):
+                todo.setdefault(name, []).append(pk)
+        if not todo:
+            self.stdout.write(self.style.SUCCESS(f"Všetkých {len(persons)} avatarov má náhľady."))
+            return
+
+        self.stdout.write(f"{len(todo)} súborov ({sum(map(len, todo.values()))} osôb), {workers} procesov…")
+        # deti DB nepoužívajú, ale nesmú zdediť otvorené spojenia ani pool
+        connections.close_all()
+        connection.close_pool()
+        ctx = multiprocessing.get_context("fork")
+        results = []
+        with ProcessPoolExecutor(max_workers=max(1, workers), mp_context=ctx) as pool:
+            for name, digest, error in pool.map(avatars.generate_for_file, todo, [force] * len(todo), chunksize=4):
+                if error:
+                    self.stdout.write(self.style.WARNING(f"  {name}: {error}"))
+                results.append((name, digest))
+
+        updated = 0
+        with transaction.atomic():
+            for name, digest in results:
+                if digest is not None:
+                    updated += Person.objects.filter(pk__in=todo[name]).update(avatar_hash=digest)
+            versioning.bump_version("persons")
+        failed = sum(1 for _, digest in results if digest is None)
+        self.stdout.write(f"Náhľady doplnené pre {updated} osôb.")
+        if failed:
+            raise CommandError(f"{failed} avatarov sa nepodarilo spracovať")
@@ -0,0 +1,31 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core import stock
+
+
+class Command(BaseCommand):
+    help = "Zlúči staré pohyby zásob (StockMovement) do checkpointov a overí, že súčet pohybov sedí so zásobou."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90,
+                            help="Zlúč pohyby staršie ako toľko dní (predvolene 90).")
+        parser.add_argument("--verify", action="store_true",
+                            help="Nič nemeň, len porovnaj súčty pohybov so zásobami.")
+
+    def handle(self, *args, days=90, verify=False, **options):
+        if not verify:
+            created = stock.baseline()
+            if created:
+                self.stdout.write(f"Počiatočný checkpoint pre {created} položiek.")
+            folded = stock.compact(timezone.now() - timedelta(days=days))
+            self.stdout.write(f"Zlúčených {folded} pohybov starších ako {days} dní.")
+
+        diff = stock.diff()
+        for item_id, quantity, total in diff:
+            self.stdout.write(f"item {item_id}: zásoba {quantity}, súčet pohybov {total}")
+        if diff:
+            raise CommandError(f"{len(diff)} položiek, kde pohyby nesedia so zásobou")
+        self.stdout.write(self.style.SUCCESS("Pohyby zásob sedia so zásobami."))
@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+
+from core import summaries
+from core.models import Session
+
+
+class Command(BaseCommand):
+    help = (
+        "Zapíše SessionSummary uzavretým session, ktoré ho nemajú (uzavreté pred zavedením "
+        "snapshotov alebo mimo aplikácie); čítania ho samy nedopĺňajú."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--session", type=int, action="append", dest="sessions",
+                            help="Len pre dané session id (dá sa zopakovať).")
+        parser.add_argument("--all", action="store_true", dest="refreeze",
+                            help="Prepíš aj existujúce snapshoty (napr. po rebuild_balances / rebuild_stats).")
+
+    def handle(self, *args, sessions=None, refreeze=False, **options):
+        qs = Session.objects.filter(ended_at__isnull=False).order_by("id")
+        if sessions:
+            qs = qs.filter(pk__in=sessions)
+        if not refreeze:
+            qs = qs.filter(summary__isnull=True)
+        count = 0
+        for session in qs.iterator():
+            summaries.freeze(session)
+            count += 1
+        self.stdout.write(self.style.SUCCESS(f"Zmrazené súhrny: {count}."))
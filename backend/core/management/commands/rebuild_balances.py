@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import ledger
+
+
+class Command(BaseCommand):
+    help = "Prepočíta SessionPersonBalance z Transaction a overí ho voči ledgeru."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--session", type=int, action="append", dest="sessions",
+                            help="Len pre dané session id (dá sa zopakovať).")
+        parser.add_argument("--verify", action="store_true",
+                            help="Nič neprepisuj, len porovnaj tabuľku s ledgerom.")
+
+    def handle(self, *args, sessions=None, verify=False, **options):
+        if not verify:
+            ledger.rebuild_balances(sessions)
+            self.stdout.write("Zostatky prepočítané.")
+
+        diff = ledger.diff_balances(sessions)
+        for session_id, person_id, actual, expected in diff:
+            self.stdout.write(
+                f"session {session_id} person {person_id}: "
+                f"tabuľka {actual[0]} € / {actual[1]}, ledger {expected[0]} € / {expected[1]}"
+            )
+        if diff:
+            raise CommandError(f"{len(diff)} nezhôd medzi SessionPersonBalance a Transaction")
+        self.stdout.write(self.style.SUCCESS("SessionPersonBalance sedí s Transaction."))
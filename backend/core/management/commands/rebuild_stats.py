@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core import ledger
+
+
+class Command(BaseCommand):
+    help = "Prepočíta (backfill) StatsRollup z Transaction a overí ho voči ledgeru."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--session", type=int, action="append", dest="sessions",
+                            help="Len pre dané session id (dá sa zopakovať).")
+        parser.add_argument("--verify", action="store_true",
+                            help="Nič neprepisuj, len porovnaj tabuľku s ledgerom.")
+
+    def handle(self, *args, sessions=None, verify=False, **options):
+        if not verify:
+            ledger.rebuild_rollups(sessions)
+            self.stdout.write("Rollupy prepočítané.")
+
+        diff = ledger.diff_rollups(sessions)
+        for (hour, session_id, person_id, item_id), actual, expected in diff:
+            self.stdout.write(
+                f"{hour:%Y-%m-%d %H}h session {session_id} person {person_id} item {item_id}: "
+                f"tabuľka {actual[0]}× {actual[1]} / {actual[2]} €, "
+                f"ledger {expected[0]}× {expected[1]} / {expected[2]} €"
+            )
+        if diff:
+            raise CommandError(f"{len(diff)} nezhôd medzi StatsRollup a Transaction")
+        self.stdout.write(self.style.SUCCESS("StatsRollup sedí s Transaction."))
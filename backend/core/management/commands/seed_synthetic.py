@@ -0,0 +1,323 @@
+"""
+Syntetický dataset v reálnej mierke: osoby s nerovnomernou aktivitou, pivá a kávy,
+predvoľby, týždenné session, várky cold brew a milióny transakcií s dennými
+špičkami (káva ráno a po obede, pivo večer a cez víkend).
+
+Transakcie idú do DB cez COPY po dávkach (bez indexov a FK, obnovia sa na konci); rovnaký --seed dá rovnaké dáta.
+Materializované tabuľky (zostatky, rollupy, súhrny, počítadlá osôb) sa na konci prepočítajú.
+"""
+import random
+import time
+from bisect import bisect_right
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from core import active_session, ledger, stock, summaries, versioning
+from core.models import (
+    BrewBatch, BrewBatchIngredient, Category, CoffeePreset, Item, Person, Session, Transaction,
+    CATEGORY_BEER, CATEGORY_COFFEE,
+)
+from core.pricing import PRESETS_VERSION
+
+CHUNK = 200_000
+
+# relatívna váha hodiny dňa (0–23)
+COFFEE_HOURS = [0, 0, 0, 0, 0, 0, 2, 6, 10, 9, 6, 4, 3, 7, 8, 5, 3, 2, 1, 1, 0, 0, 0, 0]
+BEER_HOURS = [2, 1, 0, 0, 0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 4, 7, 9, 10, 9, 7, 4]
+# pondelok … nedeľa
+BEER_WEEKDAYS = [3, 3, 4, 5, 9, 10, 6]
+COFFEE_WEEKDAYS = [10, 10, 10, 10, 9, 5, 4]
+
+BEERS = [("Zlatý Bažant", "1.500"), ("Pilsner Urquell", "1.900"), ("Kozel", "1.400"),
+         ("Corgoň", "1.600"), ("IPA", "2.500"), ("Radler", "1.300")]
+COFFEES = [("Etiópia Yirgacheffe", "0.060"), ("Kolumbia Huila", "0.050"), ("Brazília Santos", "0.040"),
+           ("Keňa AA", "0.070")]
+PRESETS = [("Ristretto", "7", "9.999", "0.100"), ("Espresso", "10", "14.999", "0.200"),
+           ("Doppio", "15", "22", "0.300")]
+COLD_BREW_ML_PRICE = "0.008"
+GUEST_SHARE = 0.15
+
+
+class Command(BaseCommand):
+    help = (
+        "Vygeneruje deterministický syntetický dataset (osoby, položky, predvoľby, session, "
+        "várky, milióny transakcií cez COPY) pre záťažové testy a EXPLAIN."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--transactions", type=int, default=1_000_000)
+        parser.add_argument("--persons", type=int, default=60)
+        parser.add_argument("--days", type=int, default=365, help="Rozpätie histórie končiace pred --end.")
+        parser.add_argument("--end", type=parse_date, help="Koniec histórie (YYYY-MM-DD, predvolene dnes).")
+        parser.add_argument("--session-days", type=int, default=7, help="Dĺžka jednej session.")
+        parser.add_argument("--brew-batches", type=int, default=40)
+        parser.add_argument("--seed", type=int, default=1)
+        parser.add_argument("--reset", action="store_true",
+                            help="Najprv vyprázdni tabuľky aplikácie core (ids začnú od 1).")
+        parser.add_argument("--noinput", "--no-input", action="store_false", dest="interactive")
+
+    def handle(self, *args, transactions=1_000_000, persons=60, days=365, session_days=7,
+               brew_batches=40, seed=1, end=None, reset=False, interactive=True, **options):
+        if reset:
+            if interactive and input(
+                f"Zmazať všetky dáta aplikácie core v DB {connection.settings_dict['NAME']}? [yes/no] "
+            ) != "yes":
+                raise CommandError("Zrušené.")
+            _truncate()
+        elif Transaction.objects.exists():
+            raise CommandError("DB už obsahuje transakcie — použi --reset (dataset by nebol reprodukovateľný).")
+
+        rng = random.Random(seed)
+        # polnoc v TIME_ZONE — váhy hodín sa vzťahujú na miestny čas
+        end = timezone.make_aware(datetime.combine(end or timezone.localdate(), datetime.min.time()))
+        start = end - timedelta(days=days)
+        t0 = time.perf_counter()
+
+        with transaction.atomic():
+            catalog = _catalog()
+            people = _persons(rng, persons)
+            sessions = _sessions(start, end, session_days)
+            _brew_batches(rng, catalog, brew_batches, start, end)
+        self.stdout.write(f"Katalóg, {len(people)} osôb, {len(sessions)} session ({time.perf_counter() - t0:.1f} s)")
+
+        # jedna transakcia: pri chybe sa vráti aj zhodenie indexov a FK
+        with transaction.atomic(), _without_indexes(Transaction._meta.db_table):
+            written = 0
+            for rows in _transactions(rng, catalog, people, sessions, start, days, transactions):
+                _copy(rows)
+                written += len(rows)
+                self.stdout.write(f"  {written:,} / {transactions:,} transakcií ({time.perf_counter() - t0:.0f} s)")
+            self.stdout.write("Obnova indexov a cudzích kľúčov…")
+
+        self.stdout.write("Prepočet zostatkov, rollupov, počítadiel a súhrnov…")
+        _finish(sessions)
+        self.stdout.write(self.style.SUCCESS(f"Hotovo za {time.perf_counter() - t0:.0f} s."))
+
+
+def _truncate():
+    from django.apps import apps
+
+    tables = [m._meta.db_table for m in apps.get_app_config("core").get_models()]
+    with connection.cursor() as cur:
+        cur.execute(f"TRUNCATE {', '.join(tables)} RESTART IDENTITY CASCADE")
+
+
+def _catalog():
+    """Vráti {"beer": [(id, cena_milli)], "coffee": [...], "cold_brew": (id, cena_milli), "presets": [...]}."""
+    beer_cat = Category.objects.create(name=CATEGORY_BEER.capitalize())
+    coffee_cat = Category.objects.create(name=CATEGORY_COFFEE.capitalize())
+    presets = [
+        CoffeePreset.objects.create(label=label, g_min=Decimal(lo), g_max=Decimal(hi), extra_eur=Decimal(extra))
+        for label, lo, hi, extra in PRESETS
+    ]
+    beers = [Item.objects.create(name=n, category=beer_cat, price=Decimal(p), stock_quantity=Decimal("500"))
+             for n, p in BEERS]
+    coffees = [Item.objects.create(name=n, category=coffee_cat, pricing_mode="per_gram", price=Decimal(p),
+                                   stock_quantity=Decimal("5000"))
+               for n, p in COFFEES]
+    cold_brew = Item.objects.create(name="Cold brew", category=coffee_cat, pricing_mode="per_ml",
+                                    price=Decimal(COLD_BREW_ML_PRICE), stock_quantity=Decimal("3000"))
+    stock.baseline()
+
+    def milli(value):
+        return int(value * 1000)
+
+    return {
+        "beer": [(i.pk, milli(i.price)) for i in beers],
+        "coffee": [(i.pk, milli(i.price)) for i in coffees],
+        "cold_brew": (cold_brew.pk, milli(cold_brew.price)),
+        "coffee_items": coffees,
+        "cold_brew_item": cold_brew,
+        "presets": [(milli(p.g_min), milli(p.g_max), milli(p.extra_eur)) for p in presets],
+    }
+
+
+def _persons(rng, count):
+    """[(id, váha)] — aktivita je lognormálna: pár štamgastov, veľa občasných."""
+    objs = [
+        Person(name=f"Synth {i:04d}", is_guest=rng.random() < GUEST_SHARE)
+        for i in range(count)
+    ]
+    created = Person.objects.bulk_create(objs)
+    return [(p.pk, rng.lognormvariate(0, 1.0) * (0.2 if p.is_guest else 1.0)) for p in created]
+
+
+def _sessions(start, end, session_days):
+    """[(id, od, do)] — súvislé session, posledná ostáva otvorená."""
+    bounds = []
+    t = start
+    while t < end:
+        bounds.append((t, min(t + timedelta(days=session_days), end)))
+        t += timedelta(days=session_days)
+    objs = Session.objects.bulk_create([Session(ended_at=hi) for _, hi in bounds[:-1]] + [Session()])
+    # started_at je auto_now_add → prepíše sa na začiatok intervalu
+    Session.objects.bulk_update(
+        [Session(pk=s.pk, started_at=lo) for s, (lo, _) in zip(objs, bounds)], ["started_at"], batch_size=1000,
+    )
+    return [(s.pk, lo, hi) for s, (lo, hi) in zip(objs, bounds)]
+
+
+def _brew_batches(rng, catalog, count, start, end):
+    coffees = catalog["coffee_items"]
+    span = (end - start).total_seconds()
+    for _ in range(count):
+        batch = BrewBatch.objects.create(
+            output_item=catalog["cold_brew_item"], output_ml=Decimal(rng.randrange(1000, 3001, 100)),
+        )
+        BrewBatch.objects.filter(pk=batch.pk).update(created_at=start + timedelta(seconds=rng.random() * span))
+        picks = rng.sample(coffees, rng.randint(1, min(2, len(coffees))))
+        BrewBatchIngredient.objects.bulk_create([
+            BrewBatchIngredient(batch=batch, coffee=c, grams=Decimal(rng.randrange(60, 121, 10)), sort_order=n)
+            for n, c in enumerate(picks)
+        ])
+
+
+def _cumulative(weights):
+    total, out = 0, []
+    for w in weights:
+        total += w
+        out.append(total)
+    return out
+
+
+def _transactions(rng, catalog, people, sessions, start, days, total):
+    """Generuje dávky riadkov pre COPY (session, person, item, quantity, price, created_at)."""
+    person_ids = [pk for pk, _ in people]
+    person_cw = _cumulative([w for _, w in people])
+    day_offsets = list(range(days))
+    beer_day_cw = _cumulative([BEER_WEEKDAYS[(start + timedelta(days=d)).weekday()] for d in day_offsets])
+    coffee_day_cw = _cumulative([COFFEE_WEEKDAYS[(start + timedelta(days=d)).weekday()] for d in day_offsets])
+    hours = list(range(24))
+    beer_hour_cw, coffee_hour_cw = _cumulative(BEER_HOURS), _cumulative(COFFEE_HOURS)
+    session_starts = [lo for _, lo, _ in sessions]
+    session_ids = [pk for pk, _, _ in sessions]
+    presets = catalog["presets"]
+    beers, coffees = catalog["beer"], catalog["coffee"]
+    beer_cw = _cumulative(range(len(beers), 0, -1))  # prvé pivo je najobľúbenejšie
+    coffee_cw = _cumulative(range(len(coffees), 0, -1))
+
+    written = 0
+    while written < total:
+        n = min(CHUNK, total - written)
+        # náhodné výbery po celých dávkach — rng.choices(k=n) je rádovo rýchlejšie ako po riadkoch
+        who = rng.choices(person_ids, cum_weights=person_cw, k=n)
+        kinds = [rng.random() for _ in range(n)]
+        beer_picks = rng.choices(beers, cum_weights=beer_cw, k=n)
+        coffee_picks = rng.choices(coffees, cum_weights=coffee_cw, k=n)
+        beer_days = rng.choices(day_offsets, cum_weights=beer_day_cw, k=n)
+        coffee_days = rng.choices(day_offsets, cum_weights=coffee_day_cw, k=n)
+        beer_hours = rng.choices(hours, cum_weights=beer_hour_cw, k=n)
+        coffee_hours = rng.choices(hours, cum_weights=coffee_hour_cw, k=n)
+        rows = []
+        for j in range(n):
+            kind = kinds[j]
+            if kind < 0.5:
+                item_id, unit = beer_picks[j]
+                qty_milli = 2000 if rng.random() < 0.1 else 1000
+                price = unit * qty_milli // 1000
+                day, hour = beer_days[j], beer_hours[j]
+            else:
+                if kind < 0.93:
+                    item_id, unit = coffee_picks[j]
+                    qty_milli = rng.randint(7, 22) * 1000
+                    price = unit * qty_milli // 1000
+                    for lo, hi, extra in presets:
+                        if lo <= qty_milli <= hi:
+                            price += extra
+                            break
+                else:
+                    item_id, unit = catalog["cold_brew"]
+                    qty_milli = rng.randrange(150, 401, 50) * 1000
+                    price = unit * qty_milli // 1000
+                day, hour = coffee_days[j], coffee_hours[j]
+            created = start + timedelta(days=day, hours=hour, seconds=rng.random() * 3600)
+            session_id = session_ids[max(0, bisect_right(session_starts, created) - 1)]
+            rows.append(
+                f"{session_id}\t{who[j]}\t{item_id}\t{qty_milli / 1000:.3f}\t{price / 1000:.3f}\t"
+                f"{created.isoformat()}\n"
+            )
+        written += n
+        yield rows
+
+
+@contextmanager
+def _without_indexes(table):
+    """
+    Počas COPY zhodí sekundárne indexy a FK tabuľky a potom ich obnoví z katalógu.
+    FK kontrola po riadkoch (deferred trigger) je pri miliónoch riadkov drahšia ako samotný COPY;
+    ADD CONSTRAINT ju spraví jedným joinom a CREATE INDEX jedným triedením.
+    """
+    with connection.cursor() as cur:
+        cur.execute(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint "
+            "WHERE conrelid = %s::regclass AND contype = 'f'",
+            [table],
+        )
+        foreign_keys = cur.fetchall()
+        cur.execute(
+            "SELECT i.relname, pg_get_indexdef(i.oid) FROM pg_index x JOIN pg_class i ON i.oid = x.indexrelid "
+            "WHERE x.indrelid = %s::regclass AND NOT x.indisprimary AND NOT x.indisunique",
+            [table],
+        )
+        indexes = cur.fetchall()
+        for name, _ in foreign_keys:
+            cur.execute(f'ALTER TABLE {table} DROP CONSTRAINT "{name}"')
+        for name, _ in indexes:
+            cur.execute(f'DROP INDEX "{name}"')
+    yield
+    with connection.cursor() as cur:
+        for _, definition in indexes:
+            cur.execute(definition)
+        for name, definition in foreign_keys:
+            cur.execute(f'ALTER TABLE {table} ADD CONSTRAINT "{name}" {definition}')
+
+
+def _copy(rows):
+    table = Transaction._meta.db_table
+    with connection.cursor() as cur:
+        with cur.copy(
+            f"COPY {table} (session_id, person_id, item_id, quantity, price_at_time, created_at) FROM STDIN"
+        ) as copy:
+            copy.write("".join(rows))
+
+
+def _finish(sessions):
+    """Materializované tabuľky z nových transakcií + štatistiky plánovača."""
+    ledger.rebuild_balances()
+    ledger.rebuild_rollups()
+    person_table = Person._meta.db_table
+    tx_table = Transaction._meta.db_table
+    item_table = Item._meta.db_table
+    category_table = Category._meta.db_table
+    with connection.cursor() as cur:
+        # rovnaké pravidlá ako TransactionView: káva po 15 g (min. 1), pivo po kusoch
+        cur.execute(
+            f"""
+            UPDATE {person_table} p SET total_beers = a.beers, total_coffees = a.coffees
+            FROM (
+                SELECT t.person_id,
+                       SUM(CASE WHEN lower(c.name) = %s THEN floor(t.quantity) ELSE 0 END) AS beers,
+                       SUM(CASE WHEN lower(c.name) = %s THEN GREATEST(1, floor(t.quantity / 15)) ELSE 0 END)
+                           AS coffees
+                FROM {tx_table} t
+                JOIN {item_table} i ON i.id = t.item_id
+                JOIN {category_table} c ON c.id = i.category_id
+                GROUP BY t.person_id
+            ) a
+            WHERE p.id = a.person_id
+            """,
+            [CATEGORY_BEER, CATEGORY_COFFEE],
+        )
+    for session in Session.objects.filter(pk__in=[pk for pk, _, _ in sessions], ended_at__isnull=False):
+        summaries.freeze(session)
+    with connection.cursor() as cur:
+        cur.execute("ANALYZE")
+    # bežiaci server si načíta nové predvoľby a otvorenú session
+    versioning.bump_version(PRESETS_VERSION)
+    active_session.invalidate()
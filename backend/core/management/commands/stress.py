@@ -0,0 +1,278 @@
+"""
+Záťažový test súbehu: N worker procesov strieľa create/undo/brew/settle cez skutočné view
+(Django test client) do samostatnej DB na lokálnom Postgrese; na konci sa počítadlá
+osôb, brew_count a zásoby porovnajú s prepočtom z Transaction / BrewBatch.
+Settle ide na sud, ktorý sa zároveň ťuká — kontroluje poradie zámkov položka → zostatky.
+"""
+import multiprocessing
+import random
+import statistics
+import tempfile
+import threading
+import time
+from collections import Counter, defaultdict
+from decimal import Decimal
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+
+OPS = (("create", 70), ("undo", 20), ("brew", 7), ("settle", 3))
+BIG_STOCK = Decimal("1000000")
+KEG_STOCK = Decimal("30")
+LOCK_SAMPLE_SECONDS = 0.05
+
+
+class Command(BaseCommand):
+    help = (
+        "Záťažový test: N procesov súbežne volá TransactionView, TransactionUndoView, BrewBatchView "
+        "a ItemSettleView "
+        "nad dočasnou DB a overí konzistenciu počítadiel a zásob. Vypíše priepustnosť a čakanie na zámky."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--workers", type=int, default=8)
+        parser.add_argument("--seconds", type=float, default=10.0, help="Dĺžka behu (predvolene 10 s).")
+        parser.add_argument("--persons", type=int, default=10,
+                            help="Počet osôb — menej osôb = viac súbehu na tých istých riadkoch.")
+        parser.add_argument("--seed", type=int, default=1, help="Seed pre reprodukovateľný mix operácií.")
+        parser.add_argument("--keepdb", action="store_true", help="Nezmaž stress DB po behu.")
+
+    def handle(self, *args, workers=8, seconds=10.0, persons=10, seed=1, keepdb=False, **options):
+        _isolate_settings()
+        db_settings = settings.DATABASES["default"]
+        db_settings.setdefault("TEST", {})["NAME"] = f"{db_settings['NAME']}_stress"
+        old_name = db_settings["NAME"]
+        connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False, keepdb=keepdb)
+        try:
+            fixture = _seed(persons)
+            results, wall, locks = self._run(fixture, workers, seconds, seed)
+            self._report(results, wall, locks)
+            problems = _check(fixture, results)
+        finally:
+            connections.close_all()
+            if not keepdb:
+                connection.creation.destroy_test_db(old_name, verbosity=0)
+
+        for problem in problems:
+            self.stdout.write(self.style.ERROR(problem))
+        if problems:
+            raise CommandError(f"{len(problems)} nekonzistencií po záťaži")
+        self.stdout.write(self.style.SUCCESS("Počítadlá, brew_count a zásoby sedia s Transaction."))
+
+    def _run(self, fixture, workers, seconds, seed):
+        ctx = multiprocessing.get_context("fork")
+        queue = ctx.Queue()
+        start = ctx.Event()
+        connections.close_all()  # deti si otvoria vlastné spojenia
+        connection.close_pool()  # pool (a jeho vlákna) sa nesmie zdediť cez fork
+        procs = [
+            ctx.Process(target=_worker, args=(i, fixture, seconds, seed, start, queue))
+            for i in range(workers)
+        ]
+        for p in procs:
+            p.start()
+
+        locks = []
+        stop = threading.Event()
+        sampler = threading.Thread(target=_sample_locks, args=(locks, stop), daemon=True)
+        sampler.start()
+        t0 = time.perf_counter()
+        start.set()
+        results = [queue.get() for _ in procs]
+        wall = time.perf_counter() - t0
+        for p in procs:
+            p.join()
+        stop.set()
+        sampler.join()
+        return results, wall, locks
+
+    def _report(self, results, wall, locks):
+        latencies = defaultdict(list)
+        statuses = defaultdict(Counter)
+        for r in results:
+            for op, values in r["latencies"].items():
+                latencies[op].extend(values)
+            for op, counts in r["statuses"].items():
+                statuses[op].update(counts)
+
+        total = sum(len(v) for v in latencies.values())
+        self.stdout.write(f"{total} požiadaviek za {wall:.1f} s → {total / wall:.0f} req/s")
+        for op, values in sorted(latencies.items()):
+            q = _quantiles(values)
+            codes = ", ".join(f"{code}×{n}" for code, n in sorted(statuses[op].items()))
+            self.stdout.write(
+                f"  {op:<7} {len(values):>6}  p50 {q[50]:6.1f} ms  p95 {q[95]:6.1f} ms  p99 {q[99]:6.1f} ms  [{codes}]"
+            )
+
+        waiting = [n for n, _ in locks]
+        if waiting:
+            longest = max(w for _, w in locks)
+            self.stdout.write(
+                f"Zámky: {len(locks)} vzoriek, čakajúce spojenia priemer {statistics.mean(waiting):.2f} / "
+                f"max {max(waiting)}, vzorky s čakaním {sum(1 for n in waiting if n) / len(waiting):.0%}, "
+                f"najdlhšie pozorované čakanie {longest * 1000:.0f} ms"
+            )
+
+
+def _isolate_settings():
+    # vlastná cache stamp-ov (inak by sa stress miešal s bežiacim serverom)
+    settings.CACHES["versions"]["LOCATION"] = tempfile.mkdtemp(prefix="drinkcounter-stress-")
+    # všetky kiosky idú z jednej "IP" test klienta — throttle by ich zahltil 429
+    settings.REST_FRAMEWORK["DEFAULT_THROTTLE_RATES"]["transactions"] = None
+    settings.EVENTS_PG_NOTIFY = False
+    settings.METRICS_DIR = tempfile.mkdtemp(prefix="drinkcounter-stress-metrics-")
+    settings.PROFILES_DIR = None
+    settings.ALLOWED_HOSTS = [*settings.ALLOWED_HOSTS, "testserver"]
+
+
+def _seed(persons):
+    from core import stock
+    from core.models import Category, CoffeePreset, Item, Person, Session
+
+    beer = Category.objects.create(name="Beer")
+    coffee = Category.objects.create(name="Coffee")
+    other = Category.objects.create(name="Other")
+    CoffeePreset.objects.create(label="Espresso", g_min=Decimal("7"), g_max=Decimal("20"), extra_eur=Decimal("0.2"))
+    Session.objects.create()
+    fixture = {
+        "persons": [Person.objects.create(name=f"Stress {i}").pk for i in range(persons)],
+        "beer": Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"),
+                                    stock_quantity=BIG_STOCK).pk,
+        "coffee": Item.objects.create(name="Zrno", category=coffee, pricing_mode="per_gram",
+                                      price=Decimal("0.05"), stock_quantity=BIG_STOCK).pk,
+        "cold_brew": Item.objects.create(name="Cold brew", category=coffee, pricing_mode="per_ml",
+                                         price=Decimal("0.01")).pk,
+        # mimo Beer/Coffee → settle ani undo nemenia počítadlá osôb
+        "keg": Item.objects.create(name="Sud", category=other, price=Decimal("2"), stock_quantity=KEG_STOCK).pk,
+    }
+    stock.baseline()  # počiatočné zásoby ako pohyby
+    return fixture
+
+
+def _worker(index, fixture, seconds, seed, start, queue):
+    from django.test import Client
+
+    connections.close_all()
+    rng = random.Random(seed * 1000 + index)
+    client = Client()
+    admin = Client()
+    session = admin.session
+    session["is_admin"] = True
+    session.save()
+    admin.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    ops = [op for op, weight in OPS for _ in range(weight)]
+    latencies = defaultdict(list)
+    statuses = defaultdict(Counter)
+    coffee_creates = 0
+
+    start.wait()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        op = rng.choice(ops)
+        person = rng.choice(fixture["persons"])
+        t0 = time.perf_counter()
+        if op == "create":
+            kind = rng.random()
+            if kind < 0.4:
+                body = {"person_id": person, "item_id": fixture["beer"], "quantity": str(rng.randint(1, 2))}
+            elif kind < 0.5:
+                body = {"person_id": person, "item_id": fixture["keg"], "quantity": "1"}
+            else:
+                body = {"person_id": person, "item_id": fixture["coffee"], "quantity": str(rng.randint(7, 25))}
+            r = client.post("/api/transactions", body, content_type="application/json")
+            if r.status_code == 201 and body["item_id"] == fixture["coffee"]:
+                coffee_creates += 1
+        elif op == "undo":
+            r = client.post("/api/transactions/undo", {"person_id": person}, content_type="application/json")
+        elif op == "settle":
+            # doplň sud a rozrátaj ho; 400 = súbežný settle ho už vyprázdnil
+            admin.post(f"/api/items/{fixture['keg']}/set-stock", {"stock_quantity": str(KEG_STOCK)},
+                       content_type="application/json")
+            r = admin.post(f"/api/items/{fixture['keg']}/settle")
+        else:
+            body = {
+                "output_item_id": fixture["cold_brew"],
+                "output_ml": str(rng.randint(100, 500)),
+                "ingredients": [{"coffee_id": fixture["coffee"], "grams": str(rng.randint(20, 60))}],
+            }
+            r = admin.post("/api/brew-batches", body, content_type="application/json")
+        latencies[op].append((time.perf_counter() - t0) * 1000)
+        statuses[op][r.status_code] += 1
+
+    connections.close_all()
+    queue.put({
+        "latencies": dict(latencies),
+        "statuses": {op: dict(c) for op, c in statuses.items()},
+        "coffee_creates": coffee_creates,
+    })
+
+
+def _sample_locks(samples, stop):
+    """(počet spojení čakajúcich na zámok, najdlhšie čakanie v s) z pg_stat_activity."""
+    with connection.cursor() as cur:
+        while not stop.is_set():
+            cur.execute(
+                """
+                SELECT COUNT(*),
+                       COALESCE(EXTRACT(EPOCH FROM MAX(now() - state_change)), 0)
+                FROM pg_stat_activity
+                WHERE datname = current_database() AND wait_event_type = 'Lock'
+                """
+            )
+            count, longest = cur.fetchone()
+            samples.append((count, float(longest)))
+            time.sleep(LOCK_SAMPLE_SECONDS)
+    connection.close()
+
+
+def _quantiles(values):
+    values = sorted(values)
+    return {p: values[min(len(values) - 1, int(len(values) * p / 100))] for p in (50, 95, 99)}
+
+
+def _check(fixture, results):
+    """Porovná materializované počítadlá s prepočtom z riadkov; vráti zoznam nezhôd."""
+    from django.db.models import Sum
+
+    from core import ledger, stock
+    from core.models import BrewBatch, BrewBatchIngredient, Item, Person, Transaction
+
+    problems = []
+    expected = defaultdict(lambda: [0, 0])
+    for t in Transaction.objects.only("person_id", "item_id", "quantity"):
+        if t.item_id == fixture["beer"]:
+            expected[t.person_id][0] += int(t.quantity)
+        elif t.item_id == fixture["coffee"]:
+            expected[t.person_id][1] += max(1, int(t.quantity // Decimal("15")))
+    for p in Person.objects.filter(pk__in=fixture["persons"]):
+        beers, coffees = expected[p.pk]
+        if (p.total_beers, p.total_coffees) != (beers, coffees):
+            problems.append(
+                f"{p.name}: total_beers/coffees {p.total_beers}/{p.total_coffees}, z Transaction {beers}/{coffees}"
+            )
+
+    items = {i.pk: i for i in Item.objects.filter(pk__in=[fixture["beer"], fixture["coffee"], fixture["cold_brew"]])}
+    # undo brew_count neznižuje → porovnáva sa s počtom úspešných ťukov na kávu
+    coffee_creates = sum(r["coffee_creates"] for r in results)
+    if items[fixture["coffee"]].brew_count != coffee_creates:
+        problems.append(f"brew_count {items[fixture['coffee']].brew_count}, úspešných ťukov na kávu {coffee_creates}")
+
+    def sold(item_id):
+        return Transaction.objects.filter(item_id=item_id).aggregate(s=Sum("quantity"))["s"] or 0
+
+    used = BrewBatchIngredient.objects.filter(coffee_id=fixture["coffee"]).aggregate(s=Sum("grams"))["s"] or 0
+    brewed = BrewBatch.objects.filter(output_item_id=fixture["cold_brew"]).aggregate(s=Sum("output_ml"))["s"] or 0
+    for pk, want in (
+        (fixture["beer"], BIG_STOCK - sold(fixture["beer"])),
+        (fixture["coffee"], BIG_STOCK - sold(fixture["coffee"]) - used),
+        (fixture["cold_brew"], brewed),
+    ):
+        if items[pk].stock_quantity != want:
+            problems.append(f"{items[pk].name}: zásoba {items[pk].stock_quantity}, prepočet {want}")
+
+    problems += [f"StockMovement item {pk}: zásoba {q}, súčet pohybov {s}" for pk, q, s in stock.diff()]
+    problems += [f"SessionPersonBalance {s}/{p}: {a} ≠ {e}" for s, p, a, e in ledger.diff_balances()]
+    problems += [f"StatsRollup {key}: {a} ≠ {e}" for key, a, e in ledger.diff_rollups()]
+    return problems
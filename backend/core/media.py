@@ -0,0 +1,180 @@
+"""
+Servírovanie /media/ (nahrané avatary a ich náhľady) namiesto django.views.static.serve.
+
+- Silný ETag a Last-Modified; If-None-Match / If-Modified-Since → 304 bez otvorenia súboru.
+- Náhľady adresované obsahom (core.avatars) idú s Cache-Control: immutable na rok —
+  prehliadač sa na ne už nepýta. Ostatné súbory (originály) sa revalidujú cez ETag.
+- Jeden rozsah Range: bytes=… → 206 (If-Range sa rešpektuje), nesplniteľný → 416;
+  viac rozsahov naraz sa ignoruje a ide celý súbor (RFC 9110 to dovoľuje).
+- Telo: pod WSGI FileResponse → wsgi.file_wrapper (gunicorn ho posiela cez os.sendfile),
+  pod ASGI async iterátor po blokoch, takže worker nečaká na pomalého klienta.
+  uvicorn zero-copy nepozná; tú dá až reverse proxy:
+- MEDIA_ACCEL_REDIRECT (napr. "/protected-media/") → prázdna odpoveď s X-Accel-Redirect
+  a súbor (aj rozsahy a 304) pošle nginx z internal location, bez workera.
+"""
+import mimetypes
+import os
+import posixpath
+import re
+from urllib.parse import quote
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, StreamingHttpResponse
+from django.utils._os import safe_join
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, parse_http_date_safe
+from django.views.decorators.http import require_safe
+
+from . import avatars
+
+BLOCK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+_RANGE = re.compile(r"bytes=(\d*)-(\d*)")
+
+
+@require_safe
+def serve(request, path):
+    name = posixpath.normpath(path).lstrip("/")
+    try:
+        fullpath = safe_join(settings.MEDIA_ROOT, name)
+        st = os.stat(fullpath)
+    except (SuspiciousFileOperation, OSError, ValueError):
+        raise Http404("Súbor neexistuje")
+    if not os.path.isfile(fullpath):
+        raise Http404("Súbor neexistuje")
+
+    content_type, encoding = mimetypes.guess_type(name)
+    content_type = content_type or "application/octet-stream"
+    immutable = avatars.is_variant(name)
+    accel = getattr(settings, "MEDIA_ACCEL_REDIRECT", "")
+    if accel:
+        response = HttpResponse(content_type=content_type)
+        response["X-Accel-Redirect"] = accel.rstrip("/") + "/" + quote(name)
+        response["Cache-Control"] = _cache_control(immutable)
+        return response
+
+    etag = _etag(name, st, immutable)
+    mtime = int(st.st_mtime)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": http_date(mtime),
+        "Cache-Control": _cache_control(immutable),
+        "Accept-Ranges": "bytes",
+    }
+    response = get_conditional_response(request, etag=etag, last_modified=mtime)
+    if response is not None:  # 304 / 412
+        for key, value in headers.items():
+            if key != "Accept-Ranges":
+                response[key] = value
+        return response
+
+    size = st.st_size
+    status, start, length = 200, 0, size
+    if request.method == "GET" and _if_range_matches(request, etag, mtime):
+        try:
+            byte_range = _byte_range(request.META.get("HTTP_RANGE", ""), size)
+        except ValueError:
+            response = HttpResponse(status=416)
+            response["Content-Range"] = f"bytes */{size}"
+            return response
+        if byte_range is not None:
+            status, start, length = 206, byte_range[0], byte_range[1] - byte_range[0] + 1
+
+    if request.method == "HEAD":
+        response = HttpResponse(content_type=content_type)
+    else:
+        response = _file_response(request, fullpath, start, length, size, content_type)
+    response.status_code = status
+    if status == 206:
+        response["Content-Range"] = f"bytes {start}-{start + length - 1}/{size}"
+    if encoding:  # napr. .svgz
+        response["Content-Encoding"] = encoding
+    for key, value in headers.items():
+        response[key] = value
+    response["Content-Length"] = str(length)
+    return response
+
+
+def _cache_control(immutable):
+    # za SITE_PASSWORD nesmie odpoveď skončiť v zdieľanej cache (tunel, CDN)
+    scope = "private" if getattr(settings, "SITE_PASSWORD", "") else "public"
+    if immutable:
+        return f"{scope}, max-age={IMMUTABLE_MAX_AGE}, immutable"
+    return f"{scope}, no-cache"
+
+
+def _etag(name, st, immutable):
+    """Náhľad: z mena (digest obsahu), rovnaký na každom stroji. Inak mtime + veľkosť."""
+    if immutable:
+        return f'"{posixpath.basename(name)}"'
+    return f'"{st.st_mtime_ns:x}-{st.st_size:x}"'
+
+
+def _if_range_matches(request, etag, mtime):
+    """Bez If-Range vždy; s ním len pri zhode silného ETagu alebo presného dátumu."""
+    value = request.META.get("HTTP_IF_RANGE")
+    if not value:
+        return True
+    if value.startswith('"'):
+        return value == etag
+    return parse_http_date_safe(value) == mtime
+
+
+def _byte_range(header, size):
+    """
+    (start, end) vrátane z hlavičky Range, None = poslať celý súbor (chýba, viac rozsahov,
+    iná jednotka, nezmysel). Nesplniteľný rozsah → ValueError (416).
+    """
+    m = _RANGE.fullmatch(header.replace(" ", ""))
+    if not m or m.groups() == ("", ""):
+        return None
+    first, last = m.groups()
+    if not first:  # bytes=-N: posledných N bajtov
+        if int(last) == 0 or size == 0:
+            raise ValueError(header)
+        return max(size - int(last), 0), size - 1
+    start = int(first)
+    if last and int(last) < start:
+        return None
+    if start >= size:
+        raise ValueError(header)
+    return start, min(int(last), size - 1) if last else size - 1
+
+
+def _file_response(request, fullpath, start, length, size, content_type):
+    f = open(fullpath, "rb")
+    if isinstance(request, ASGIRequest):
+        return StreamingHttpResponse(_read_async(f, start, length), content_type=content_type)
+    if start == 0 and length == size:
+        response = FileResponse(f, content_type=content_type)
+        response.block_size = BLOCK_SIZE
+        return response
+    return StreamingHttpResponse(_read_sync(f, start, length), content_type=content_type)
+
+
+def _read_sync(f, start, length):
+    with f:
+        f.seek(start)
+        while length > 0:
+            data = f.read(min(BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+
+
+async def _read_async(f, start, length):
+    read = sync_to_async(f.read, thread_sensitive=False)
+    try:
+        f.seek(start)
+        while length > 0:
+            data = await read(min(BLOCK_SIZE, length))
+            if not data:
+                break
+            length -= len(data)
+            yield data
+    finally:
+        f.close()
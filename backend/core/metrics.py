@@ -0,0 +1,379 @@
+"""
+Metriky požiadaviek pre Prometheus (GET /api/metrics).
+
+MetricsMiddleware (core.middleware) na každú požiadavku zapíše podľa
+(URL name, metóda): histogram latencie, počet a čas SQL príkazov (cez
+execute_wrapper z core.dbhooks, požiadavka sa nájde cez ContextVar — funguje aj
+v sync_to_async vláknach a pri async ORM) a histogram veľkosti odpovede.
+CompressionMiddleware sem pridáva bajty pred/po kompresii a CPU čas podľa (URL name, kódovanie).
+
+Každý proces drží súčty v pamäti a najviac raz za FLUSH_SECONDS ich zapíše do
+settings.METRICS_DIR/<pid>.json; export sčíta súbory všetkých procesov. Súbory
+mŕtvych procesov (recyklácia cez gunicorn max_requests) export zlúči do jedného
+retired.json a zmaže, takže ich počet nerastie; gunicorn.conf.py adresár vyprázdni pri štarte.
+"""
+import atexit
+import fcntl
+import json
+import os
+import threading
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+
+from . import dbhooks
+
+PREFIX = "drinkcounter"
+FLUSH_SECONDS = 5.0
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576)
+UNMATCHED = "<unmatched>"
+RETIRED = "retired.json"  # súčty mŕtvych procesov
+METHODS = {"GET", "HEAD", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"}
+
+_current = ContextVar("metrics_request", default=None)
+
+
+class RequestStats:
+    __slots__ = ("sql_count", "sql_seconds")
+
+    def __init__(self):
+        self.sql_count = 0
+        self.sql_seconds = 0.0
+
+
+def _sql_timer(execute, sql, params, many, context):
+    stats = _current.get()
+    if stats is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        stats.sql_seconds += time.perf_counter() - t0
+        stats.sql_count += 1
+
+
+dbhooks.register(_sql_timer)
+
+
+def start_request():
+    """Začne meranie požiadavky; vráti (stats, token) pre finish_request."""
+    dbhooks.install()
+    stats = RequestStats()
+    return stats, _current.set(stats)
+
+
+def finish_request(token):
+    _current.reset(token)
+
+
+def _bucket_index(buckets, value):
+    for i, bound in enumerate(buckets):
+        if value <= bound:
+            return i
+    return len(buckets)
+
+
+class Registry:
+    """Súčty jedného procesu; kľúč série je (view, method)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._reset(os.getpid())
+
+    def _reset(self, pid):
+        self._pid = pid
+        self._series = {}
+        self._statuses = {}
+        self._compression = {}  # (view, encoding) → [počet, bajty pred, bajty po, CPU s]
+        self._compression_skips = {}  # (view, dôvod) → počet
+        self._last_flush = time.monotonic()
+
+    def observe(self, view, method, status, seconds, stats, size):
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset(os.getpid())  # fork — súčty rodiča patria rodičovi
+            s = self._series.get((view, method))
+            if s is None:
+                s = self._series[(view, method)] = {
+                    "count": 0, "seconds": 0.0, "latency": [0] * (len(LATENCY_BUCKETS) + 1),
+                    "sql_count": 0, "sql_seconds": 0.0,
+                    "size_count": 0, "size_bytes": 0, "size": [0] * (len(SIZE_BUCKETS) + 1),
+                }
+            s["count"] += 1
+            s["seconds"] += seconds
+            s["latency"][_bucket_index(LATENCY_BUCKETS, seconds)] += 1
+            s["sql_count"] += stats.sql_count
+            s["sql_seconds"] += stats.sql_seconds
+            if size is not None:
+                s["size_count"] += 1
+                s["size_bytes"] += size
+                s["size"][_bucket_index(SIZE_BUCKETS, size)] += 1
+            key = (view, method, str(status))
+            self._statuses[key] = self._statuses.get(key, 0) + 1
+            snapshot = self._due_snapshot()
+        if snapshot is not None:
+            _write(self._pid, snapshot)
+
+    def observe_compression(self, view, encoding, bytes_in, bytes_out, cpu_seconds):
+        """Jedna skomprimovaná odpoveď (core.compression)."""
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset(os.getpid())
+            c = self._compression.setdefault((view, encoding), [0, 0, 0, 0.0])
+            c[0] += 1
+            c[1] += bytes_in
+            c[2] += bytes_out
+            c[3] += cpu_seconds
+            snapshot = self._due_snapshot()
+        if snapshot is not None:
+            _write(self._pid, snapshot)
+
+    def skip_compression(self, view, reason):
+        with self._lock:
+            if os.getpid() != self._pid:
+                self._reset(os.getpid())
+            key = (view, reason)
+            self._compression_skips[key] = self._compression_skips.get(key, 0) + 1
+
+    def _due_snapshot(self):
+        """Snapshot na zápis, ak od posledného uplynulo FLUSH_SECONDS (volá sa pod zámkom)."""
+        if time.monotonic() - self._last_flush < FLUSH_SECONDS:
+            return None
+        self._last_flush = time.monotonic()
+        return self._snapshot()
+
+    def _snapshot(self):
+        return {
+            "series": [[view, method, dict(s, latency=list(s["latency"]), size=list(s["size"]))]
+                       for (view, method), s in self._series.items()],
+            "statuses": [[*key, n] for key, n in self._statuses.items()],
+            "compression": [[*key, *c] for key, c in self._compression.items()],
+            "compression_skips": [[*key, n] for key, n in self._compression_skips.items()],
+        }
+
+    def flush(self):
+        with self._lock:
+            if os.getpid() != self._pid:
+                return
+            snapshot = self._snapshot()
+            self._last_flush = time.monotonic()
+        _write(self._pid, snapshot)
+        return snapshot
+
+
+registry = Registry()
+atexit.register(registry.flush)
+
+
+def _directory():
+    return getattr(settings, "METRICS_DIR", None)
+
+
+def _write(pid, snapshot):
+    directory = _directory()
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        tmp = os.path.join(directory, f".{pid}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(snapshot, f)
+        os.replace(tmp, os.path.join(directory, f"{pid}.json"))
+    except OSError:
+        pass  # metriky nesmú zhodiť požiadavku
+
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # práve prepisovaný, zmazaný alebo poškodený súbor
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True  # beží pod iným používateľom
+    return True
+
+
+def _collect():
+    """Snapshoty všetkých procesov (vlastný je vždy aktuálny) a zlúčené mŕtve procesy."""
+    own = registry.flush()
+    snapshots = [own] if own is not None else []
+    directory = _directory()
+    if not directory or not os.path.isdir(directory):
+        return snapshots
+    own_name = f"{os.getpid()}.json"
+    live, dead = [], []
+    for name in os.listdir(directory):
+        if not name.endswith(".json") or name in (own_name, RETIRED):
+            continue
+        pid = name[:-len(".json")]
+        (dead if pid.isdigit() and not _alive(int(pid)) else live).append(name)
+    if dead:
+        _retire(directory, dead)
+    for name in (RETIRED, *live):
+        snapshot = _read(os.path.join(directory, name))
+        if snapshot is not None:
+            snapshots.append(snapshot)
+    return snapshots
+
+
+def _retire(directory, names):
+    """
+    Pripočíta snapshoty mŕtvych procesov do RETIRED a ich súbory zmaže. Pod flock —
+    súbežný scrape na inom workeri ten istý súbor nezapočíta dvakrát.
+    """
+    try:
+        with open(os.path.join(directory, ".retire.lock"), "w") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            paths = [os.path.join(directory, name) for name in names]
+            snapshots = [s for s in map(_read, paths) if s is not None]
+            if not snapshots:
+                return  # iný scrape ich už zlúčil
+            retired = _read(os.path.join(directory, RETIRED))
+            merged = _merge(([retired] if retired is not None else []) + snapshots)
+            tmp = os.path.join(directory, f".{RETIRED}.tmp")
+            with open(tmp, "w") as f:
+                json.dump(_as_snapshot(*merged), f)
+            os.replace(tmp, os.path.join(directory, RETIRED))
+            for path in paths:
+                try:
+                    os.unlink(path)
+                except FileNotFoundError:
+                    pass
+    except OSError:
+        pass  # metriky nesmú zhodiť scrape; skúsi sa pri ďalšom
+
+
+def _merge(snapshots):
+    series, statuses, compression, skips = {}, {}, {}, {}
+    for snap in snapshots:
+        for view, method, s in snap["series"]:
+            acc = series.get((view, method))
+            if acc is None:
+                series[(view, method)] = dict(s, latency=list(s["latency"]), size=list(s["size"]))
+                continue
+            for field in ("count", "seconds", "sql_count", "sql_seconds", "size_count", "size_bytes"):
+                acc[field] += s[field]
+            acc["latency"] = [a + b for a, b in zip(acc["latency"], s["latency"])]
+            acc["size"] = [a + b for a, b in zip(acc["size"], s["size"])]
+        for view, method, status, n in snap["statuses"]:
+            statuses[(view, method, status)] = statuses.get((view, method, status), 0) + n
+        # .get: súbory procesov spred pridania kompresie
+        for view, encoding, *values in snap.get("compression", ()):
+            acc = compression.get((view, encoding), [0, 0, 0, 0.0])
+            compression[(view, encoding)] = [a + b for a, b in zip(acc, values)]
+        for view, reason, n in snap.get("compression_skips", ()):
+            skips[(view, reason)] = skips.get((view, reason), 0) + n
+    return series, statuses, compression, skips
+
+
+def _as_snapshot(series, statuses, compression, skips):
+    """Opak _merge: zlúčené súčty späť vo formáte snapshotu procesu."""
+    return {
+        "series": [[view, method, s] for (view, method), s in series.items()],
+        "statuses": [[*key, n] for key, n in statuses.items()],
+        "compression": [[*key, *c] for key, c in compression.items()],
+        "compression_skips": [[*key, n] for key, n in skips.items()],
+    }
+
+
+# ===== Prometheus text format =====
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(**labels):
+    return "{" + ",".join(f'{k}="{_label(v)}"' for k, v in labels.items()) + "}"
+
+
+def _histogram(lines, name, helptext, buckets, rows):
+    lines.append(f"# HELP {name} {helptext}")
+    lines.append(f"# TYPE {name} histogram")
+    for labels, counts, total, count in rows:
+        cumulative = 0
+        for bound, n in zip((*buckets, "+Inf"), counts):
+            cumulative += n
+            lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+        lines.append(f"{name}_sum{_labels(**labels)} {total}")
+        lines.append(f"{name}_count{_labels(**labels)} {count}")
+
+
+def _counter(lines, name, helptext, rows):
+    lines.append(f"# HELP {name} {helptext}")
+    lines.append(f"# TYPE {name} counter")
+    for labels, value in rows:
+        lines.append(f"{name}{_labels(**labels)} {value}")
+
+
+def render():
+    """Všetky metriky (sčítané cez procesy) v Prometheus text formáte 0.0.4."""
+    series, statuses, compression, skips = _merge(_collect())
+    keys = sorted(series)
+    lines = []
+    _histogram(
+        lines, f"{PREFIX}_http_request_duration_seconds", "Request latency by URL name and method.",
+        LATENCY_BUCKETS,
+        [({"view": v, "method": m}, series[v, m]["latency"], series[v, m]["seconds"], series[v, m]["count"])
+         for v, m in keys],
+    )
+    _counter(
+        lines, f"{PREFIX}_http_responses_total", "Responses by URL name, method and status code.",
+        [({"view": v, "method": m, "status": s}, statuses[v, m, s]) for v, m, s in sorted(statuses)],
+    )
+    _counter(
+        lines, f"{PREFIX}_sql_queries_total", "SQL statements executed while handling requests.",
+        [({"view": v, "method": m}, series[v, m]["sql_count"]) for v, m in keys],
+    )
+    _counter(
+        lines, f"{PREFIX}_sql_duration_seconds_total", "Time spent in SQL statements while handling requests.",
+        [({"view": v, "method": m}, series[v, m]["sql_seconds"]) for v, m in keys],
+    )
+    _histogram(
+        lines, f"{PREFIX}_http_response_size_bytes", "Response body size (streaming responses excluded).",
+        SIZE_BUCKETS,
+        [({"view": v, "method": m}, series[v, m]["size"], series[v, m]["size_bytes"], series[v, m]["size_count"])
+         for v, m in keys],
+    )
+    ckeys = sorted(compression)
+    _counter(
+        lines, f"{PREFIX}_compression_responses_total", "Compressed responses by URL name and encoding.",
+        [({"view": v, "encoding": e}, compression[v, e][0]) for v, e in ckeys],
+    )
+    _counter(
+        lines, f"{PREFIX}_compression_input_bytes_total", "Body bytes before compression.",
+        [({"view": v, "encoding": e}, compression[v, e][1]) for v, e in ckeys],
+    )
+    _counter(
+        lines, f"{PREFIX}_compression_output_bytes_total", "Body bytes after compression (ratio = output / input).",
+        [({"view": v, "encoding": e}, compression[v, e][2]) for v, e in ckeys],
+    )
+    _counter(
+        lines, f"{PREFIX}_compression_cpu_seconds_total", "Thread CPU time spent compressing.",
+        [({"view": v, "encoding": e}, compression[v, e][3]) for v, e in ckeys],
+    )
+    _counter(
+        lines, f"{PREFIX}_compression_skipped_total", "Responses left uncompressed, by reason.",
+        [({"view": v, "reason": r}, skips[v, r]) for v, r in sorted(skips)],
+    )
+    return "\n".join(lines) + "\n"
+
+
+def method_label(request):
+    return request.method if request.method in METHODS else "OTHER"
+
+
+def view_label(request):
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return UNMATCHED
+    return match.url_name or match.route or UNMATCHED
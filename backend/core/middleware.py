@@ -1,8 +1,13 @@
 import json
 import re
+import time
 
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
 from django.conf import settings
 from django.http import HttpResponse
+from django.urls import Resolver404, resolve
+
+from . import compression, metrics, profiling
 
 
 # Paths accessible without site password
@@ -14,7 +19,146 @@ COOKIE_NAME = "_site_auth"
 COOKIE_MAX_AGE = 60 * 60 * 24 * 30  # 30 days
 
 
-class SitePasswordMiddleware:
+class HybridMiddleware:
+    """
+    Base for middleware usable both under WSGI and ASGI: a sync-only middleware
+    would force every async view back onto a worker thread. Subclasses implement
+    __call__ (sync) and __acall__ (async).
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        return self.handle(request)
+
+
+class MetricsMiddleware(HybridMiddleware):
+    """
+    Per-request latency, SQL count/time and response size, keyed by URL name
+    and method (core.metrics). Sits first so it also sees SitePassword 401s.
+    """
+
+    def handle(self, request):
+        stats, token = metrics.start_request()
+        t0 = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self._observe(request, response, stats, t0)
+
+    async def __acall__(self, request):
+        stats, token = metrics.start_request()
+        t0 = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.finish_request(token)
+        return self._observe(request, response, stats, t0)
+
+    def _observe(self, request, response, stats, t0):
+        elapsed = time.perf_counter() - t0
+        size = None if response.streaming else len(response.content)
+        metrics.registry.observe(
+            metrics.view_label(request), metrics.method_label(request),
+            response.status_code, elapsed, stats, size,
+        )
+        return response
+
+
+class CompressionMiddleware(HybridMiddleware):
+    """
+    Brotli/gzip by Accept-Encoding for text responses above a size threshold,
+    including streaming ones (core.compression). Sits right after MetricsMiddleware,
+    so the size histogram records bytes on the wire.
+    """
+
+    def handle(self, request):
+        return compression.compress_response(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        return compression.compress_response(request, await self.get_response(request))
+
+
+class ProfilingMiddleware(HybridMiddleware):
+    """
+    Admin-only cProfile + SQL capture of a single request (core.profiling),
+    switched on by `X-Profile: 1` or `?_profile=1`. Needs the session, so it
+    sits after AuthenticationMiddleware. One profile per process at a time;
+    a concurrent profiled request gets 409.
+    """
+
+    def handle(self, request):
+        mode = profiling.requested(request)
+        if mode is None:
+            return self.get_response(request)
+        if not profiling.acquire():
+            return self._busy()
+        response = None
+        try:
+            state = profiling.Profile()
+            try:
+                response = state.run(self.get_response, request)
+            finally:
+                report = profiling.finish(request, response, state)
+        finally:
+            profiling.release()
+        return self._respond(mode, response, report)
+
+    async def __acall__(self, request):
+        mode = None
+        if profiling.PARAM in request.GET or profiling.HEADER in request.META:
+            # session sa v async kontexte načíta cez aget (sync prístup by padol)
+            mode = profiling.requested(request, is_admin=await request.session.aget("is_admin") is True)
+        if mode is None:
+            return await self.get_response(request)
+        if not profiling.acquire():
+            return self._busy()
+        response = None
+        try:
+            state = profiling.Profile()
+            try:
+                if _view_is_async(request):
+                    response = await state.arun(self.get_response(request))
+                else:
+                    # sync view beží vo vlákne asgiref — profil zapne process_view v ňom
+                    request._profiling = state
+                    response = await self.get_response(request)
+            finally:
+                report = profiling.finish(request, response, state)
+        finally:
+            profiling.release()
+        return self._respond(mode, response, report)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        # pod ASGI Django volá sync process_view cez sync_to_async(thread_sensitive=True),
+        # teda v tom istom vlákne, kde by bežal sync view
+        state = getattr(request, "_profiling", None)
+        if state is None or state.active:
+            return None
+        return state.run(_render_view, request, view_func, view_args, view_kwargs)
+
+    @staticmethod
+    def _busy():
+        return HttpResponse(json.dumps({"error": "Another request is being profiled"}),
+                            status=409, content_type="application/json")
+
+    @staticmethod
+    def _respond(mode, response, report):
+        if mode == "inline":
+            return HttpResponse(json.dumps(report), content_type="application/json")
+        response["X-Profile-Id"] = report["id"]
+        return response
+
+
+class SitePasswordMiddleware(HybridMiddleware):
     """
     Require a password when the request comes from PUBLIC_HOST.
     Auth is stored in a persistent cookie (30 days).
@@ -22,21 +166,27 @@ class SitePasswordMiddleware:
     can show a password modal instead of a server-rendered form.
     """
 
-    def __init__(self, get_response):
-        self.get_response = get_response
+    def handle(self, request):
+        response = self._gate(request)
+        return response if response is not None else self.get_response(request)
 
-    def __call__(self, request):
+    async def __acall__(self, request):
+        response = self._gate(request)
+        return response if response is not None else await self.get_response(request)
+
+    def _gate(self, request):
+        """Response that short-circuits the request, or None to let it through."""
         if not SITE_PASSWORD:
-            return self.get_response(request)
+            return None
 
         forwarded = request.META.get('HTTP_X_FORWARDED_HOST', '').split(':')[0]
         host = (forwarded or request.get_host()).split(':')[0]
         if host != PUBLIC_HOST:
-            return self.get_response(request)
+            return None
 
         # Pay-by-square links are always accessible (shared with guests)
         if _PUBLIC_PATHS.match(request.path):
-            return self.get_response(request)
+            return None
 
         # Handle login POST from the React frontend
         if request.method == "POST" and request.path == "/__site-login__":
@@ -44,7 +194,7 @@ class SitePasswordMiddleware:
 
         # Check persistent cookie
         if request.COOKIES.get(COOKIE_NAME) == "1":
-            return self.get_response(request)
+            return None
 
         # Not authenticated — tell the frontend to show the password modal
         return HttpResponse(
@@ -73,3 +223,19 @@ class SitePasswordMiddleware:
             content_type="application/json",
             status=401,
         )
+
+
+def _view_is_async(request):
+    try:
+        match = resolve(request.path_info, getattr(request, "urlconf", None))
+    except Resolver404:
+        return False
+    return iscoroutinefunction(match.func)
+
+
+def _render_view(request, view_func, view_args, view_kwargs):
+    """Zavolá view a vyrenderuje DRF Response (JSONRenderer) ešte pod profilom."""
+    response = view_func(request, *view_args, **view_kwargs)
+    if callable(getattr(response, "render", None)):
+        response = response.render()
+    return response
@@ -1,5 +1,7 @@
 from decimal import Decimal
+from django.core.serializers.json import DjangoJSONEncoder
 from django.db import models
+from django.utils import timezone
 
 CATEGORY_COFFEE = "coffee"
 CATEGORY_BEER = "beer"
@@ -14,6 +16,7 @@ class Person(models.Model):
     name = models.CharField(max_length=100)
     email = models.EmailField(max_length=255, blank=True, null=True)
     avatar = models.ImageField(upload_to='avatars/', blank=True, null=True)
+    avatar_hash = models.CharField(max_length=32, blank=True, default="")  # digest originálu → náhľady (core.avatars)
     is_guest = models.BooleanField(default=False)
     active = models.BooleanField(default=True)
     total_beers = models.PositiveIntegerField(default=0)
@@ -51,6 +54,17 @@ class Session(models.Model):
     started_at = models.DateTimeField(auto_now_add=True)
     ended_at = models.DateTimeField(blank=True, null=True)
 
+    class Meta:
+        constraints = [
+            # najviac jedna otvorená session (ended_at IS NULL); NULLy sa tu berú ako rovnaké
+            models.UniqueConstraint(
+                fields=["ended_at"],
+                condition=models.Q(ended_at__isnull=True),
+                nulls_distinct=False,
+                name="single_open_session",
+            ),
+        ]
+
     def __str__(self):
         return f"Session {self.id} ({self.started_at.date()})"
 
@@ -63,10 +77,111 @@ class Transaction(models.Model):
     price_at_time = models.DecimalField(max_digits=10, decimal_places=3)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            # undo (posledná podľa id) a dlh osoby v session (SUM price_at_time) — price v indexe,
+            # takže súčet ide index-only scanom
+            models.Index(fields=["session", "person", "-id"], include=["price_at_time"], name="tx_session_person_id"),
+            # zoznam transakcií: keyset stránkovanie podľa (created_at, id), aj s filtrom na osobu
+            models.Index(fields=["-created_at", "-id"], name="tx_created_id"),
+            models.Index(fields=["person", "-created_at", "-id"], name="tx_person_created_id"),
+        ]
+
     def __str__(self):
         return f"{self.person.name} -> {self.item.name} x{self.quantity} = {self.price_at_time} €"
 
 
+class SessionPersonBalance(models.Model):
+    """
+    Materializovaný súčet transakcií osoby v rámci session (pre session/active).
+    Udržiava sa inkrementálne cez core.ledger; `manage.py rebuild_balances` ho prepočíta z Transaction.
+    """
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="balances")
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="session_balances")
+    total_eur = models.DecimalField(max_digits=12, decimal_places=3, default=Decimal("0.000"))
+    count_items = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["session", "person"], name="uniq_balance_session_person"),
+        ]
+
+    def __str__(self):
+        return f"{self.session_id}/{self.person_id}: {self.total_eur} € ({self.count_items})"
+
+
+class SessionSummary(models.Model):
+    """
+    Zmrazený súhrn uzavretej session (core.summaries). `data` drží súčty po osobách a položkách,
+    total_eur/tx_count sú vytiahnuté pre admin zoznam.
+    """
+    session = models.OneToOneField(Session, on_delete=models.CASCADE, primary_key=True, related_name="summary")
+    total_eur = models.DecimalField(max_digits=12, decimal_places=3, default=Decimal("0.000"))
+    tx_count = models.IntegerField(default=0)
+    data = models.JSONField(encoder=DjangoJSONEncoder)
+    frozen_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"Session {self.session_id}: {self.total_eur} € ({self.tx_count})"
+
+
+class StatsRollup(models.Model):
+    """
+    Hodinový rollup transakcií (hour, session, person, item) → počet, množstvo, €.
+    Z neho číta /api/stats; udržiava ho core.ledger, `manage.py rebuild_stats` ho prepočíta.
+    """
+    hour = models.DateTimeField()  # začiatok hodiny (UTC) z Transaction.created_at
+    session = models.ForeignKey(Session, on_delete=models.CASCADE, related_name="rollups")
+    person = models.ForeignKey(Person, on_delete=models.CASCADE, related_name="rollups")
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="rollups")
+    tx_count = models.IntegerField(default=0)
+    qty = models.DecimalField(max_digits=14, decimal_places=3, default=Decimal("0.000"))
+    eur = models.DecimalField(max_digits=14, decimal_places=3, default=Decimal("0.000"))
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["hour", "session", "person", "item"], name="uniq_rollup_key"),
+        ]
+        indexes = [
+            models.Index(fields=["session", "hour"], name="rollup_session_hour"),
+        ]
+
+    def __str__(self):
+        return f"{self.hour:%Y-%m-%d %H}h {self.person_id}/{self.item_id}: {self.tx_count}× {self.eur} €"
+
+
+class StockMovement(models.Model):
+    """
+    Append-only pohyb zásoby položky (core.stock). Item.stock_quantity je ich materializovaný
+    súčet; `balance` je zásoba po pohybe (NULL = položka sa prestala sledovať).
+    """
+    REASON_CHOICES = (
+        ("sale", "sale"),
+        ("undo", "undo"),
+        ("set", "set"),
+        ("edit", "edit"),
+        ("settle", "settle"),
+        ("brew_use", "brew_use"),
+        ("brew_output", "brew_output"),
+        ("checkpoint", "checkpoint"),
+    )
+    item = models.ForeignKey(Item, on_delete=models.CASCADE, related_name="stock_movements")
+    delta = models.DecimalField(max_digits=12, decimal_places=3)
+    balance = models.DecimalField(max_digits=12, decimal_places=3, null=True, blank=True)
+    reason = models.CharField(max_length=16, choices=REASON_CHOICES)
+    ref = models.CharField(max_length=64, blank=True, default="")  # napr. "tx:123", "brew:5"
+    created_at = models.DateTimeField(default=timezone.now)  # nie auto_now_add — checkpoint preberá čas
+
+    class Meta:
+        indexes = [
+            # história zásoby položky od najnovšieho
+            models.Index(fields=["item", "-created_at", "-id"], name="stockmove_item_created"),
+        ]
+
+    def __str__(self):
+        return f"{self.item_id} {self.reason} {self.delta:+} → {self.balance}"
+
+
 class BrewBatch(models.Model):
     """Výroba cold brew: odčíta zásoby zdrojových káv, pridá zásobu výstupnému itemu."""
     output_item = models.ForeignKey(
@@ -1,3 +1,6 @@
+import hmac
+
+from django.conf import settings
 from rest_framework.permissions import BasePermission, SAFE_METHODS
 
 class IsAdminSession(BasePermission):
@@ -8,4 +11,13 @@ class ReadOnlyOrAdmin(BasePermission):
     def has_permission(self, request, view):
         if request.method in SAFE_METHODS:
             return True
-        return bool(request.session.get("is_admin") is True)
\ No newline at end of file
+        return bool(request.session.get("is_admin") is True)
+
+class IsAdminOrMetricsToken(BasePermission):
+    """Admin session, alebo `Authorization: Bearer <METRICS_TOKEN>` (Prometheus scrape)."""
+    def has_permission(self, request, view):
+        if request.session.get("is_admin") is True:
+            return True
+        token = getattr(settings, "METRICS_TOKEN", "")
+        header = request.META.get("HTTP_AUTHORIZATION", "")
+        return bool(token) and hmac.compare_digest(header, f"Bearer {token}")
@@ -0,0 +1,93 @@
+"""
+Cenotvorba transakcií.
+
+Príplatky z CoffeePreset sa hľadajú v procesnom intervalovom indexe (bisect),
+nie v DB. Index sa prebuduje, keď sa zmení stamp "coffee_presets"
+(core.versioning) — zvyšuje ho CoffeePresetViewSet aj admin.
+"""
+import logging
+import threading
+from bisect import bisect_left
+from decimal import Decimal
+
+from . import versioning
+from .models import CoffeePreset, CATEGORY_COFFEE
+
+log = logging.getLogger(__name__)
+
+PRESETS_VERSION = "coffee_presets"
+
+
+def category_name(item):
+    return item.category.name.lower() if item.category and item.category.name else None
+
+
+def line_total(item, qty):
+    """Cena jedného riadku transakcie (jednotková cena × množstvo + príplatok presetu pri káve per_gram)."""
+    total = (item.price * qty).quantize(Decimal("0.001"))
+    if item.pricing_mode == "per_gram" and category_name(item) == CATEGORY_COFFEE:
+        preset = preset_index().lookup(qty)
+        if preset:
+            total = (total + preset.extra_eur).quantize(Decimal("0.001"))
+    return total
+
+
+class PresetIndex:
+    """
+    Nemenný index nad CoffeePreset-mi.
+
+    Uzavreté intervaly [g_min, g_max] sa rozložia podľa všetkých hraníc na body a otvorené
+    úseky medzi nimi; pre každý je predpočítaný preset s najnižším (g_min, id), ktorý ho pokrýva.
+    Výsledok je teda rovnaký ako pôvodný ORDER BY g_min, id LIMIT 1 — aj pri prekryvoch,
+    ktoré sa však pri stavbe zalogujú.
+    """
+
+    def __init__(self, presets):
+        presets = sorted(presets, key=lambda p: (p.g_min, p.id))
+        valid = [p for p in presets if p.g_min <= p.g_max]
+        self.invalid = [p for p in presets if p.g_min > p.g_max]
+        self.overlaps = [
+            (a, b)
+            for i, a in enumerate(valid)
+            for b in valid[i + 1:]
+            if b.g_min <= a.g_max and a.g_min <= b.g_max
+        ]
+
+        self._bounds = sorted({p.g_min for p in valid} | {p.g_max for p in valid})
+        # _at[i]: víťaz v bode _bounds[i]; _between[i]: na otvorenom úseku (_bounds[i], _bounds[i+1])
+        self._at = [
+            next((p for p in valid if p.g_min <= b <= p.g_max), None) for b in self._bounds
+        ]
+        self._between = [
+            next((p for p in valid if p.g_min <= lo and p.g_max >= hi), None)
+            for lo, hi in zip(self._bounds, self._bounds[1:])
+        ]
+
+    def lookup(self, qty):
+        i = bisect_left(self._bounds, qty)
+        if i < len(self._bounds) and self._bounds[i] == qty:
+            return self._at[i]
+        if 0 < i < len(self._bounds):
+            return self._between[i - 1]
+        return None
+
+
+_index = None
+_index_version = None
+_index_lock = threading.Lock()
+
+
+def preset_index():
+    global _index, _index_version
+    version = versioning.get_version(PRESETS_VERSION)
+    if _index is None or _index_version != version:
+        with _index_lock:
+            if _index is None or _index_version != version:
+                index = PresetIndex(CoffeePreset.objects.all())
+                for a, b in index.overlaps:
+                    log.warning("CoffeePreset %s (%s) sa prekrýva s %s (%s); použije sa nižší g_min",
+                                a.pk, a, b.pk, b)
+                for p in index.invalid:
+                    log.warning("CoffeePreset %s (%s) má g_min > g_max, ignoruje sa", p.pk, p)
+                _index, _index_version = index, version
+    return _index
@@ -0,0 +1,302 @@
+"""
+Profilovanie jednej požiadavky na požiadanie (ProfilingMiddleware).
+
+Admin session pošle hlavičku `X-Profile: 1` alebo `?_profile=1` a požiadavka pobeží
+pod cProfile; každý SQL príkaz sa zaznamená s časom a miestom volania v kóde aplikácie.
+Report (top funkcie, SQL zoskupené podľa normalizovaného textu — opakované = kandidáti
+na N+1, čas v serializéroch) sa uloží do settings.PROFILES_DIR, kde sa drží len
+PROFILES_KEEP najnovších (zdieľané cez worker procesy). Odpoveď nesie X-Profile-Id;
+pri `_profile=inline` sa namiesto nej vráti priamo report.
+
+cProfile vidí len vlákno, v ktorom ho zapneme. Pod ASGI beží sync view (DRF) vo vlákne
+asgiref, nie v event loope, preto ho ProfilingMiddleware.process_view spustí pod profilom
+priamo v tom vlákne (aj s renderom Response). Async view sa profiluje v event loope, kde
+sa môžu primiešať súbežné korutiny iných požiadaviek. SQL sa zachytí v oboch prípadoch
+(wrapper z core.dbhooks, ContextVar sa do vlákna kopíruje). Naraz beží najviac jeden
+profil na proces (od Pythonu 3.12 cProfile druhý súčasne nedovolí) — ďalší dostane 409.
+"""
+import cProfile
+import json
+import logging
+import os
+import pstats
+import re
+import threading
+import time
+import traceback
+import uuid
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.utils import timezone
+
+from . import dbhooks
+
+log = logging.getLogger(__name__)
+
+HEADER = "HTTP_X_PROFILE"
+PARAM = "_profile"
+TOP_FUNCTIONS = 30
+MAX_STATEMENTS = 300
+ORIGIN_DEPTH = 3
+
+_SERIALIZER_FILES = (
+    os.path.join("rest_framework", "serializers.py"),
+    os.path.join("rest_framework", "fields.py"),
+    os.path.join("rest_framework", "relations.py"),
+    os.path.join("core", "serializers.py"),
+)
+_INFRA_FILES = tuple(os.path.join("core", name) for name in ("middleware.py", "metrics.py", "profiling.py"))
+_PLACEHOLDER_LIST = re.compile(r"\(\s*%s(?:\s*,\s*%s)+\s*\)")
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_SPACE = re.compile(r"\s+")
+
+_capture = ContextVar("profiling_statements", default=None)
+
+
+def _sql_capture(execute, sql, params, many, context):
+    statements = _capture.get()
+    if statements is None:
+        return execute(sql, params, many, context)
+    t0 = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        statements.append((sql, time.perf_counter() - t0, _origin()))
+
+
+dbhooks.register(_sql_capture)
+
+
+def requested(request, is_admin=None):
+    """
+    Chce požiadavka profil? (len admin session; inak sa hlavička ticho ignoruje).
+    V async ceste volajúci session prečíta sám (aget) a pošle `is_admin`.
+    """
+    mode = request.META.get(HEADER) or request.GET.get(PARAM)
+    if not mode or mode == "0":
+        return None
+    if is_admin is None:
+        session = getattr(request, "session", None)
+        is_admin = session is not None and session.get("is_admin") is True
+    if not is_admin:
+        return None
+    return "inline" if mode == "inline" else "store"
+
+
+_busy = threading.Lock()
+
+
+def acquire():
+    """Zaberie profilovanie pre tento proces; False = beží iný profil."""
+    return _busy.acquire(blocking=False)
+
+
+def release():
+    _busy.release()
+
+
+class Profile:
+    """
+    Záznam SQL pre aktuálny kontext od vytvorenia; cProfile sa zapína až cez run()/arun()
+    vo vlákne, kde beží view. `active` = view už beží pod profilom (process_view nič nerobí).
+    """
+
+    def __init__(self):
+        dbhooks.install()
+        self.statements = []
+        self.token = _capture.set(self.statements)
+        self.profiler = cProfile.Profile()
+        self.active = False
+        self.t0 = time.perf_counter()
+
+    def run(self, fn, *args):
+        self.active = True
+        self.profiler.enable()
+        try:
+            return fn(*args)
+        finally:
+            self.profiler.disable()
+
+    async def arun(self, awaitable):
+        self.active = True
+        self.profiler.enable()
+        try:
+            return await awaitable
+        finally:
+            self.profiler.disable()
+
+
+def finish(request, response, state):
+    """Zostaví a uloží report."""
+    total = time.perf_counter() - state.t0
+    _capture.reset(state.token)
+    report = _report(request, response, total, state.profiler, state.statements)
+    _store(report)
+    return report
+
+
+def _origin():
+    """Posledné rámce z kódu aplikácie (nie Django/DRF ani middleware a meranie)."""
+    base = str(settings.BASE_DIR)
+    frames = [
+        f for f in traceback.extract_stack()[:-2]
+        if f.filename.startswith(base) and "site-packages" not in f.filename
+        and not f.filename.endswith(_INFRA_FILES)
+    ]
+    return [f"{_short(f.filename)}:{f.lineno} {f.name}" for f in frames[-ORIGIN_DEPTH:]]
+
+
+def _short(path):
+    base = str(settings.BASE_DIR) + os.sep
+    if path.startswith(base):
+        return path[len(base):]
+    marker = "site-packages" + os.sep
+    return path.split(marker, 1)[1] if marker in path else path
+
+
+def normalize_sql(sql):
+    sql = _PLACEHOLDER_LIST.sub("(%s, ...)", sql)
+    sql = _STRING.sub("?", sql)
+    sql = _NUMBER.sub("?", sql)
+    return _SPACE.sub(" ", sql).strip()
+
+
+def _report(request, response, total, profiler, statements):
+    try:
+        stats = pstats.Stats(profiler)
+    except TypeError:  # view nezbehol (404 z resolvera, 403 z CSRF) — profil je prázdny
+        stats = None
+    groups = {}
+    for sql, seconds, origin in statements:
+        g = groups.setdefault(normalize_sql(sql), {"count": 0, "seconds": 0.0, "origins": []})
+        g["count"] += 1
+        g["seconds"] += seconds
+        if origin not in g["origins"] and len(g["origins"]) < 3:
+            g["origins"].append(origin)
+    grouped = sorted(
+        ({"sql": sql, "count": g["count"], "total_ms": _ms(g["seconds"]), "origins": g["origins"]}
+         for sql, g in groups.items()),
+        key=lambda g: g["total_ms"], reverse=True,
+    )
+    return {
+        "id": uuid.uuid4().hex[:12],
+        "created": timezone.now().isoformat(),
+        "method": request.method,
+        "path": request.path,
+        "query": {k: v for k, v in request.GET.items() if k != PARAM},
+        "status": response.status_code if response is not None else None,  # None = výnimka
+        "total_ms": _ms(total),
+        "serializer_ms": _ms(_serializer_seconds(stats)),
+        "sql": {
+            "count": len(statements),
+            "total_ms": _ms(sum(s for _, s, _ in statements)),
+            "groups": grouped,
+            "duplicates": [g for g in grouped if g["count"] > 1],
+            "statements": [
+                {"sql": sql, "ms": _ms(seconds), "origin": origin}
+                for sql, seconds, origin in statements[:MAX_STATEMENTS]
+            ],
+        },
+        "functions": _top_functions(stats),
+    }
+
+
+def _ms(seconds):
+    return round(seconds * 1000, 3)
+
+
+def _is_serializer(func):
+    return func[0].endswith(_SERIALIZER_FILES)
+
+
+def _serializer_seconds(stats):
+    """
+    Kumulatívny čas v serializéroch bez dvojitého počítania vnorených volaní:
+    sčíta sa len čas volaní serializérových funkcií z kódu mimo serializérov.
+    """
+    total = 0.0
+    if stats is None:
+        return total
+    for func, (_, _, _, _, callers) in stats.stats.items():
+        if not _is_serializer(func):
+            continue
+        total += sum(ct for caller, (_, _, _, ct) in callers.items() if not _is_serializer(caller))
+    return total
+
+
+def _top_functions(stats):
+    if stats is None:
+        return []
+    rows = sorted(stats.stats.items(), key=lambda kv: kv[1][3], reverse=True)[:TOP_FUNCTIONS]
+    return [
+        {
+            "function": f"{_short(filename)}:{line}({name})",
+            "ncalls": nc,
+            "tottime_ms": _ms(tt),
+            "cumtime_ms": _ms(ct),
+        }
+        for (filename, line, name), (_, nc, tt, ct, _) in rows
+    ]
+
+
+# ===== Ring buffer (súbory) =====
+def _directory():
+    return getattr(settings, "PROFILES_DIR", None)
+
+
+def _store(report):
+    directory = _directory()
+    if not directory:
+        return
+    try:
+        os.makedirs(directory, exist_ok=True)
+        name = f"{time.time_ns()}-{report['id']}.json"
+        tmp = os.path.join(directory, f".{name}.tmp")
+        with open(tmp, "w") as f:
+            json.dump(report, f)
+        os.replace(tmp, os.path.join(directory, name))
+        for old in _files()[getattr(settings, "PROFILES_KEEP", 20):]:
+            os.remove(os.path.join(directory, old))
+    except OSError as e:
+        log.warning("Profil %s sa nepodarilo uložiť: %s", report["id"], e)
+
+
+def _files():
+    """Mená reportov od najnovšieho."""
+    directory = _directory()
+    if not directory or not os.path.isdir(directory):
+        return []
+    return sorted((n for n in os.listdir(directory) if n.endswith(".json")), reverse=True)
+
+
+def _load(name):
+    try:
+        with open(os.path.join(_directory(), name)) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None  # medzitým vypadol z buffra
+
+
+def list_reports():
+    """Krátke súhrny uložených reportov (bez zoznamu príkazov a funkcií)."""
+    out = []
+    for name in _files():
+        report = _load(name)
+        if report is None:
+            continue
+        out.append({
+            "id": report["id"], "created": report["created"], "method": report["method"],
+            "path": report["path"], "status": report["status"], "total_ms": report["total_ms"],
+            "serializer_ms": report["serializer_ms"], "sql_count": report["sql"]["count"],
+            "sql_ms": report["sql"]["total_ms"], "duplicate_queries": len(report["sql"]["duplicates"]),
+        })
+    return out
+
+
+def get_report(report_id):
+    for name in _files():
+        if name.endswith(f"-{report_id}.json"):
+            return _load(name)
+    return None
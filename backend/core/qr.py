@@ -0,0 +1,59 @@
+"""
+Pay by Square QR kódy.
+
+Vyrenderovaný obrázok závisí len od (IBAN, suma, VS, správa, formát), preto sa drží
+v ohraničenej LRU cache procesu a ETag sa dá spočítať bez renderovania.
+"""
+import hashlib
+from functools import lru_cache
+from io import BytesIO
+
+import qrcode
+from qrcode.constants import ERROR_CORRECT_M
+from qrcode.image.pil import PilImage
+from qrcode.image.svg import SvgPathImage
+
+QR_CACHE_SIZE = 256
+
+QR_FORMATS = {
+    "png": "image/png",
+    "svg": "image/svg+xml",
+}
+
+_IMAGE_FACTORIES = {
+    "png": PilImage,
+    "svg": SvgPathImage,
+}
+
+
+def generate_epc_spd_payload(account: str, amount: float, currency: str, variable_symbol: str, message: str) -> str:
+    safe_msg = " ".join(str(message).split())
+    return f"SPD*1.0*ACC:{account}*AM:{amount:.2f}*CC:{currency}*X-VS:{variable_symbol}*MSG:{safe_msg}"
+
+
+def qr_etag(iban, amount, vs, message, fmt):
+    """Silný ETag (s úvodzovkami) pre QR s danými údajmi."""
+    payload = generate_epc_spd_payload(iban, float(amount), "EUR", vs, message)
+    return '"%s"' % hashlib.sha256(f"{fmt}\n{payload}".encode()).hexdigest()[:32]
+
+
+@lru_cache(maxsize=QR_CACHE_SIZE)
+def render_qr(iban, amount, vs, message, fmt="png"):
+    """Bajty obrázka QR kódu vo formáte `fmt` (png/svg)."""
+    payload = generate_epc_spd_payload(iban, float(amount), "EUR", vs, message)
+    qr = qrcode.QRCode(
+        version=None,
+        error_correction=ERROR_CORRECT_M,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(payload)
+    qr.make(fit=True)
+    img = qr.make_image(image_factory=_IMAGE_FACTORIES[fmt])
+
+    buf = BytesIO()
+    if fmt == "png":
+        img.save(buf, format="PNG")
+    else:
+        img.save(buf)
+    return buf.getvalue()
@@ -1,10 +1,16 @@
 from decimal import Decimal
 from rest_framework import serializers
-from .models import Person, Category, Item, Session, Transaction, CoffeePreset, BrewBatch, BrewBatchIngredient
+
+from . import avatars
+from .models import (
+    Person, Category, Item, Session, Transaction, CoffeePreset, BrewBatch, BrewBatchIngredient, StockMovement,
+)
 
 
 class PersonSerializer(serializers.ModelSerializer):
     avatar = serializers.ImageField(required=False, allow_null=True)
+    # {"webp": "url 96w, …", "jpeg": …} z náhľadov (core.avatars); None, kým nie sú
+    avatar_srcset = serializers.SerializerMethodField()
 
     def to_representation(self, instance):
         data = super().to_representation(instance)
@@ -15,9 +21,13 @@ class PersonSerializer(serializers.ModelSerializer):
             data["avatar"] = parsed.path
         return data
 
+    def get_avatar_srcset(self, instance):
+        return avatars.srcset(instance.avatar_hash)
+
     class Meta:
         model = Person
-        fields = ["id", "name", "email", "avatar", "is_guest", "active", "created_at","total_beers","total_coffees"]
+        fields = ["id", "name", "email", "avatar", "avatar_srcset", "is_guest", "active", "created_at",
+                  "total_beers", "total_coffees"]
 
 
 class CategorySerializer(serializers.ModelSerializer):
@@ -53,20 +63,28 @@ class SessionSerializer(serializers.ModelSerializer):
 
 
 class TransactionCreateSerializer(serializers.Serializer):
-    person_id = serializers.PrimaryKeyRelatedField(
-        source="person",
-        queryset=Person.objects.all()
-    )
-    item_id = serializers.PrimaryKeyRelatedField(
-        source="item",
-        queryset=Item.objects.all()
-    )
+    # len id-čka; osobu aj položku overí/načíta TransactionView (bez extra dotazov)
+    person_id = serializers.IntegerField(min_value=1)
+    item_id = serializers.IntegerField(min_value=1)
     # voliteľná gramáž/počet kusov (pri káve gramy)
     quantity = serializers.DecimalField(
         max_digits=8, decimal_places=3, required=False
     )
 
 
+class TransactionLineSerializer(serializers.Serializer):
+    # len id-čka; osoby a položky sa pre celý batch načítajú naraz vo view
+    person_id = serializers.IntegerField(min_value=1)
+    item_id = serializers.IntegerField(min_value=1)
+    quantity = serializers.DecimalField(
+        max_digits=8, decimal_places=3, required=False
+    )
+
+
+class TransactionBatchSerializer(serializers.Serializer):
+    lines = TransactionLineSerializer(many=True, allow_empty=False, max_length=200)
+
+
 class TransactionSerializer(serializers.ModelSerializer):
     person = PersonSerializer(read_only=True)
     item = ItemSerializer(read_only=True)
@@ -76,6 +94,12 @@ class TransactionSerializer(serializers.ModelSerializer):
         fields = ["id", "session", "person", "item", "quantity", "price_at_time", "created_at"]
 
 
+class StockMovementSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = StockMovement
+        fields = ["id", "delta", "balance", "reason", "ref", "created_at"]
+
+
 class TransactionPatchSerializer(serializers.Serializer):
     quantity = serializers.DecimalField(max_digits=14, decimal_places=6, required=False)
     price_at_time = serializers.DecimalField(max_digits=16, decimal_places=6, required=False)
@@ -0,0 +1,199 @@
+"""
+Pohyby zásob (StockMovement) — append-only ledger zásob položiek.
+
+Item.stock_quantity je materializovaný zostatok. Každá zmena zásoby ide cez tento
+modul jedným SQL príkazom: zamkne riadok položky (FOR UPDATE), zmení zostatok
+a zapíše pohyb so skutočne aplikovanou deltou (po orezaní na 0) a zostatkom po nej.
+Súbežné predaje / undo sa tak nikdy neprepíšu a platí SUM(delta) = zásoba.
+
+"Prečo je zásoba X" = pohyby položky podľa (item, -created_at) — jeden indexovaný dotaz.
+`manage.py compact_stock` zlúči staré pohyby do checkpointov a overí súčty.
+"""
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .models import Item, StockMovement
+
+REASON_SALE = "sale"
+REASON_UNDO = "undo"
+REASON_SET = "set"
+REASON_EDIT = "edit"
+REASON_SETTLE = "settle"
+REASON_BREW_USE = "brew_use"
+REASON_BREW_OUTPUT = "brew_output"
+REASON_CHECKPOINT = "checkpoint"
+
+ADD = "add"  # value = delta (zásoba sa oreže na 0)
+SET = "set"  # value = nový zostatok (NULL = nesleduje sa)
+
+
+def ctes(source, reason, created_at, mode=ADD, start_untracked=False, active=None, extra_set="", extra_params=()):
+    """
+    CTE klauzuly stock_d, stock_o, stock_u, stock_m pre jeden SQL príkaz.
+
+    `source` je CTE alebo podselect so stĺpcami (item_id, value, ref). Riadky tej istej položky
+    sa sčítajú (ADD). stock_u vracia (id, stock_quantity, active, brew_count) zmenených položiek.
+    Pri ADD sa nesledované položky (NULL) nemenia, ak nie je start_untracked (začni od 0);
+    `active` None = automaticky (deaktivuj pri poklese na 0, aktivuj pri náraste nad 0).
+    `extra_set` sú ďalšie priradenia v tom istom UPDATE (napr. brew_count), jedna položka
+    sa totiž v jednom príkaze nedá meniť dvakrát.
+    """
+    item_table = Item._meta.db_table
+    movement_table = StockMovement._meta.db_table
+    params = []
+
+    if mode == ADD:
+        new = "GREATEST(COALESCE(stock_o.stock_quantity, 0) + stock_d.value, 0)"
+        if not start_untracked:
+            new = f"CASE WHEN stock_o.stock_quantity IS NULL THEN NULL ELSE {new} END"
+    else:
+        new = "stock_d.value"
+
+    if active is not None:
+        active_sql = "%s"
+        params.append(active)
+    elif mode == ADD:
+        active_sql = (
+            f"CASE WHEN ({new}) IS NULL THEN i.active"
+            f" WHEN stock_d.value < 0 AND ({new}) <= 0 THEN false"
+            f" WHEN stock_d.value > 0 AND ({new}) > 0 THEN true"
+            f" ELSE i.active END"
+        )
+    else:
+        active_sql = "i.active"
+
+    where = ""
+    if mode == ADD and not start_untracked and not extra_set:
+        where = "AND stock_o.stock_quantity IS NOT NULL"
+
+    sql = f"""
+        stock_d AS (
+            SELECT item_id, SUM(value) AS value, MIN(ref) AS ref FROM {source} AS src GROUP BY item_id
+        ),
+        stock_o AS (
+            SELECT i.id, i.stock_quantity FROM {item_table} i JOIN stock_d ON stock_d.item_id = i.id
+            ORDER BY i.id FOR UPDATE OF i
+        ),
+        stock_u AS (
+            UPDATE {item_table} i SET stock_quantity = {new}, active = {active_sql} {extra_set}
+            FROM stock_o JOIN stock_d ON stock_d.item_id = stock_o.id
+            WHERE i.id = stock_o.id {where}
+            RETURNING i.id, i.stock_quantity, i.active, i.brew_count,
+                      stock_o.stock_quantity AS before, stock_d.ref
+        ),
+        stock_m AS (
+            INSERT INTO {movement_table} (item_id, delta, balance, reason, ref, created_at)
+            SELECT id, COALESCE(stock_quantity, 0) - COALESCE(before, 0), stock_quantity, %s, ref, %s
+            FROM stock_u WHERE stock_quantity IS DISTINCT FROM before
+        )
+    """
+    params += list(extra_params) + [reason, created_at]
+    return sql, params
+
+
+def apply(rows, reason, mode=ADD, start_untracked=False, active=None):
+    """
+    rows = [(item_id, value, ref), ...]. Vráti {item_id: (stock_quantity, active)} zmenených položiek.
+    """
+    if not rows:
+        return {}
+    values = ", ".join(["(%s::integer, %s::numeric, %s::varchar)"] * len(rows))
+    params = [p for row in rows for p in row]
+    cte_sql, cte_params = ctes(
+        "stock_src", reason, timezone.now(), mode=mode, start_untracked=start_untracked, active=active,
+    )
+    with connection.cursor() as cur:
+        cur.execute(
+            f"WITH stock_src (item_id, value, ref) AS (VALUES {values}), {cte_sql} "
+            f"SELECT id, stock_quantity, active FROM stock_u",
+            params + cte_params,
+        )
+        return {pk: (stock, is_active) for pk, stock, is_active in cur.fetchall()}
+
+
+def set_level(item, level, reason=REASON_SET, ref="", active=None):
+    """Nastaví zásobu (None = nesledovať) a prepíše stock_quantity/active na `item`."""
+    changed = apply([(item.pk, level, ref)], reason, mode=SET, active=active)
+    if item.pk in changed:
+        item.stock_quantity, item.active = changed[item.pk]
+    return item
+
+
+def record_initial(item, ref=""):
+    """Počiatočná zásoba práve vytvorenej položky."""
+    if item.stock_quantity is not None:
+        StockMovement.objects.create(
+            item=item, delta=item.stock_quantity, balance=item.stock_quantity,
+            reason=REASON_EDIT, ref=ref,
+        )
+
+
+# ===== Compaction / verify =====
+def baseline():
+    """Položky so zásobou, ale bez pohybov (pred zavedením ledgera) dostanú počiatočný checkpoint."""
+    item_table = Item._meta.db_table
+    movement_table = StockMovement._meta.db_table
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            INSERT INTO {movement_table} (item_id, delta, balance, reason, ref, created_at)
+            SELECT i.id, i.stock_quantity, i.stock_quantity, %s, 'baseline', now()
+            FROM {item_table} i
+            WHERE i.stock_quantity IS NOT NULL
+              AND NOT EXISTS (SELECT 1 FROM {movement_table} m WHERE m.item_id = i.id)
+            """,
+            [REASON_CHECKPOINT],
+        )
+        return cur.rowcount
+
+
+def compact(before):
+    """
+    Pohyby staršie ako `before` zlúči po položkách do jedného checkpointu
+    (súčet delt, zostatok a čas posledného zlúčeného). Vráti počet zmazaných pohybov.
+    """
+    movement_table = StockMovement._meta.db_table
+    with transaction.atomic(), connection.cursor() as cur:
+        cur.execute(
+            f"""
+            WITH old AS (
+                DELETE FROM {movement_table}
+                WHERE created_at < %s AND item_id IN (
+                    SELECT item_id FROM {movement_table} WHERE created_at < %s
+                    GROUP BY item_id HAVING COUNT(*) > 1
+                )
+                RETURNING id, item_id, delta, balance, created_at
+            ),
+            last AS (
+                SELECT DISTINCT ON (item_id) item_id, balance, created_at
+                FROM old ORDER BY item_id, created_at DESC, id DESC
+            ),
+            ins AS (
+                INSERT INTO {movement_table} (item_id, delta, balance, reason, ref, created_at)
+                SELECT old.item_id, SUM(old.delta), last.balance, %s, COUNT(*) || ' pohybov', last.created_at
+                FROM old JOIN last USING (item_id)
+                GROUP BY old.item_id, last.balance, last.created_at
+            )
+            SELECT COUNT(*) FROM old
+            """,
+            [before, before, REASON_CHECKPOINT],
+        )
+        return cur.fetchone()[0]
+
+
+def diff():
+    """Položky, kde SUM(delta) pohybov nesedí so zásobou: [(item_id, zásoba, súčet pohybov)]."""
+    item_table = Item._meta.db_table
+    movement_table = StockMovement._meta.db_table
+    with connection.cursor() as cur:
+        cur.execute(
+            f"""
+            SELECT i.id, i.stock_quantity, COALESCE(m.total, 0)
+            FROM {item_table} i
+            LEFT JOIN (SELECT item_id, SUM(delta) AS total FROM {movement_table} GROUP BY item_id) m
+                   ON m.item_id = i.id
+            WHERE COALESCE(i.stock_quantity, 0) <> COALESCE(m.total, 0)
+            ORDER BY i.id
+            """
+        )
+        return cur.fetchall()
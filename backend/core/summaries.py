@@ -0,0 +1,109 @@
+"""
+Zmrazené súhrny uzavretých session (SessionSummary).
+
+Pri uzavretí session sa raz zapíše súhrn — súčty po osobách, po položkách a celkovo —
+postavený z agregátov ledgera (SessionPersonBalance, StatsRollup), nie z Transaction.
+Všetky čítania histórie (admin, /api/stats?session=, /api/sessions/<id>/summary)
+idú z neho a nič nezapisujú — session uzavretá pred zavedením snapshotov sa počíta
+naživo, kým ju nedoplní `manage.py freeze_summaries`. Keď admin zmení alebo zmaže
+transakciu uzavretej session (admin, PATCH/DELETE transakcie, zmazanie položky či
+kategórie), snapshot sa v tej istej DB transakcii postaví znova (refreeze). Kiosk
+(ťuknutie, undo, batch) mení len otvorenú session, ktorá snapshot nemá.
+"""
+from contextlib import contextmanager
+from decimal import Decimal
+
+from django.db.models import Sum
+
+from .models import Session, SessionPersonBalance, SessionSummary, StatsRollup
+
+
+def build(session):
+    """Súhrn session ako dict (JSON-serializovateľný, sumy ako stringy)."""
+    persons = [
+        {
+            "person_id": b["person_id"],
+            "name": b["person__name"],
+            "total_eur": str(b["total_eur"]),
+            "count": b["count_items"],
+        }
+        for b in SessionPersonBalance.objects.filter(session=session, count_items__gt=0)
+        .values("person_id", "person__name", "total_eur", "count_items")
+        .order_by("-total_eur", "person_id")
+    ]
+    items = [
+        {
+            "item_id": r["item_id"],
+            "name": r["item__name"],
+            "category": r["item__category__name"],
+            "count": r["count"],
+            "qty": str(r["qty"]),
+            "eur": str(r["eur"]),
+        }
+        for r in StatsRollup.objects.filter(session=session, tx_count__gt=0)
+        .values("item_id", "item__name", "item__category__name")
+        .annotate(count=Sum("tx_count"), qty=Sum("qty"), eur=Sum("eur"))
+        .order_by("-count", "item_id")
+    ]
+    return {
+        "session": session.pk,
+        "started_at": session.started_at,
+        "ended_at": session.ended_at,
+        "grand_total": str(sum((Decimal(p["total_eur"]) for p in persons), Decimal("0"))),
+        "grand_count": sum(p["count"] for p in persons),
+        "persons": persons,
+        "items": items,
+    }
+
+
+def freeze(session):
+    """Zapíše (prepíše) súhrn uzavretej session."""
+    data = build(session)
+    summary, _ = SessionSummary.objects.update_or_create(
+        session=session,
+        defaults={
+            "total_eur": Decimal(data["grand_total"]),
+            "tx_count": data["grand_count"],
+            "data": data,
+        },
+    )
+    return summary
+
+
+def get_summary(session):
+    """Súhrn pre čítanie: uzavretá session → snapshot (chýba → živý výpočet), otvorená → živý výpočet."""
+    if session.ended_at is not None:
+        try:
+            return session.summary.data
+        except SessionSummary.DoesNotExist:
+            pass
+    return build(session)
+
+
+def invalidate(session_ids):
+    """Zahodí snapshoty daných session (admin znovu otvoril session)."""
+    session_ids = {s for s in session_ids if s is not None}
+    if session_ids:
+        SessionSummary.objects.filter(session_id__in=session_ids).delete()
+
+
+def closed_sessions(transactions):
+    """Id uzavretých session, do ktorých patria transakcie (queryset) — zisti pred zmazaním."""
+    return set(transactions.filter(session__ended_at__isnull=False).values_list("session_id", flat=True).distinct())
+
+
+def refreeze(session_ids):
+    """Admin zmenil transakcie daných session (po úprave ledgera): uzavretým postaví snapshot znova."""
+    session_ids = {s for s in session_ids if s is not None}
+    if not session_ids:
+        return
+    for session in Session.objects.filter(pk__in=session_ids, ended_at__isnull=False):
+        freeze(session)
+
+
+@contextmanager
+def refreezing(transactions):
+    """Blok, ktorý mení/maže transakcie (queryset) — potom refreeze ich uzavretých session."""
+    session_ids = closed_sessions(transactions)
+    yield
+    refreeze(session_ids)
@@ -0,0 +1,83 @@
+"""
+Zápis jednej transakcie (ťuk na pivo/kávu) jedným SQL príkazom.
+
+Writable CTE naraz: zamkne a aktualizuje počítadlá osoby, vloží transakciu,
+odpočíta zásobu ako pohyb (core.stock.ctes) spolu so zvýšením brew_count položky
+a zaúčtuje ju do agregátov ledgera (core.ledger.record_ctes) — nové hodnoty vráti
+cez RETURNING, takže netreba žiadne refresh_from_db.
+
+Poradie zámkov je všade osoba → položka → zostatky (SessionPersonBalance/StatsRollup):
+TransactionBatchView, undo aj ItemSettleView (položka → zostatky) zamykajú rovnako.
+Poradie vykonania CTE Postgres nezaručuje, preto ledger číta transakciu cez
+`t_booked`, ktoré závisí od stock_u — upsert zostatkov tak beží až po zámku položky.
+"""
+from django.db import connection
+
+from . import ledger, stock
+from .models import Person, Transaction
+
+
+def create_transaction(session, person_id, item, qty, total, created_at, beers=0, coffees=0, brew=False):
+    """
+    Vráti uloženú Transaction (s .person z RETURNING) alebo None, ak osoba neexistuje (vtedy sa nič nezapíše).
+    `item` treba mať načítaný; jeho stock_quantity/active/brew_count sa prepíšu novými hodnotami.
+    """
+    person_table = Person._meta.db_table
+    person_cols = [f.column for f in Person._meta.concrete_fields]
+    ctes, params = [], []
+
+    if beers or coffees:
+        ctes.append(
+            f"p AS (UPDATE {person_table} SET total_beers = total_beers + %s, "
+            f"total_coffees = total_coffees + %s WHERE id = %s RETURNING *)"
+        )
+        params += [beers, coffees, person_id]
+    else:
+        ctes.append(f"p AS (SELECT * FROM {person_table} WHERE id = %s)")
+        params += [person_id]
+
+    ctes.append(
+        f"t AS (INSERT INTO {Transaction._meta.db_table} "
+        f"(session_id, person_id, item_id, quantity, price_at_time, created_at) "
+        f"SELECT %s, p.id, %s, %s, %s, %s FROM p RETURNING *)"
+    )
+    params += [session.pk, item.pk, qty, total, created_at]
+
+    # riadok položky sa zamyká len keď sa naozaj mení (sledovaná zásoba alebo varenie);
+    # zásoba ide ako pohyb v core.stock, brew_count v tom istom UPDATE
+    touch_item = item.stock_quantity is not None or brew
+    if touch_item:
+        stock_sql, stock_params = stock.ctes(
+            "(SELECT item_id, -quantity AS value, 'tx:' || id AS ref FROM t)",
+            stock.REASON_SALE, created_at,
+            extra_set=", brew_count = i.brew_count + %s", extra_params=[1 if brew else 0],
+        )
+        ctes.append(stock_sql)
+        params += stock_params
+        # závislosť od stock_u: zostatky až po zámku položky (ako settle), inak deadlock
+        ctes.append("t_booked AS (SELECT t.* FROM t LEFT JOIN stock_u ON true)")
+        ctes.append(ledger.record_ctes("t_booked"))
+    else:
+        ctes.append(ledger.record_ctes("t"))
+
+    item_cols = "i.stock_quantity, i.active, i.brew_count" if touch_item else "NULL, NULL, NULL"
+    item_join = "LEFT JOIN stock_u i ON true" if touch_item else ""
+    sql = (
+        "WITH " + ", ".join(ctes) + " "
+        f"SELECT t.id, {item_cols}, {', '.join('p.' + c for c in person_cols)} "
+        f"FROM t CROSS JOIN p {item_join}"
+    )
+    with connection.cursor() as cur:
+        cur.execute(sql, params)
+        row = cur.fetchone()
+    if row is None:
+        return None
+
+    tx_id, stock_quantity, active, brew_count = row[:4]
+    person = Person.from_db(connection.alias, [f.attname for f in Person._meta.concrete_fields], row[4:])
+    if touch_item:
+        item.stock_quantity, item.active, item.brew_count = stock_quantity, active, brew_count
+    return Transaction(
+        id=tx_id, session=session, person=person, item=item,
+        quantity=qty, price_at_time=total, created_at=created_at,
+    )
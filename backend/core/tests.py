@@ -1,3 +1,1781 @@
-from django.test import TestCase
+import asyncio
+import base64
+import gzip
+import json
+import os
+import random
+import re
+import shutil
+import subprocess
+import tempfile
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import BytesIO, StringIO
 
-# Create your tests here.
+import brotli
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.backends.db import SessionStore
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import TruncDay, TruncHour, TruncWeek
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import Client, RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from PIL import Image
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+
+from . import (
+    active_session, avatars, compression, events, fast_serializers, ledger, metrics, pricing, profiling, qr,
+    stock, versioning,
+)
+from .models import (
+    BrewBatch, BrewBatchIngredient, Category, CoffeePreset, Item, Person, Session, SessionPersonBalance,
+    SessionSummary, StatsRollup, StockMovement, Transaction,
+)
+from .serializers import (
+    BrewBatchSerializer, ItemSerializer, PersonSerializer, TransactionSerializer,
+)
+
+
+def admin_client():
+    client = APIClient()
+    session = client.session
+    session["is_admin"] = True
+    session.save()
+    return client
+
+
+class QueryPlanTests(TestCase):
+    """
+    Hot dotazy nad Transaction musia ísť cez indexy aj pri veľkej tabuľke.
+    Dataset sa generuje priamo v Postgrese (generate_series), potom ANALYZE,
+    aby planner videl reálne štatistiky.
+    """
+    SESSIONS = 200
+    PERSONS = 40
+    TRANSACTIONS = 200_000
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        cls.item = Item.objects.create(name="Pivo", category=beer)
+        Person.objects.bulk_create(Person(name=f"P{i}") for i in range(cls.PERSONS))
+        Session.objects.bulk_create(
+            Session(ended_at="2024-01-01T00:00:00Z") for _ in range(cls.SESSIONS - 1)
+        )
+        cls.session = Session.objects.create()
+        cls.person = Person.objects.order_by("id").first()
+
+        with connection.cursor() as cur:
+            cur.execute(
+                f"""
+                INSERT INTO {Transaction._meta.db_table}
+                    (session_id, person_id, item_id, quantity, price_at_time, created_at)
+                SELECT s.ids[1 + g %% array_length(s.ids, 1)],
+                       p.ids[1 + (g / array_length(s.ids, 1)) %% array_length(p.ids, 1)],
+                       %s, 1, 1.5,
+                       now() - g * interval '1 minute'
+                FROM generate_series(1, %s) AS g,
+                     (SELECT array_agg(id) AS ids FROM {Session._meta.db_table}) s,
+                     (SELECT array_agg(id) AS ids FROM {Person._meta.db_table}) p
+                """,
+                [cls.item.pk, cls.TRANSACTIONS],
+            )
+        ledger.rebuild_balances()
+        ledger.rebuild_rollups()
+        with connection.cursor() as cur:
+            # FK kontroly sú DEFERRED — vybav ich hneď, inak by sa opakovali pri teardowne každého testu
+            cur.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cur.execute("SET CONSTRAINTS ALL DEFERRED")
+            cur.execute(f"ANALYZE {Transaction._meta.db_table}")
+            cur.execute(f"ANALYZE {SessionPersonBalance._meta.db_table}")
+            cur.execute(f"ANALYZE {StatsRollup._meta.db_table}")
+
+    def assertIndexed(self, qs, table=Transaction._meta.db_table):
+        plan = qs.explain()
+        self.assertNotIn(f"Seq Scan on {table}", plan, plan)
+        return plan
+
+    def test_undo_last_transaction(self):
+        self.assertIndexed(
+            Transaction.objects.filter(session=self.session, person=self.person).order_by("-id")[:1]
+        )
+
+    def test_person_debt_in_session(self):
+        plan = self.assertIndexed(
+            Transaction.objects.filter(session=self.session, person=self.person)
+            .values("session").annotate(total=Sum("price_at_time"))
+        )
+        self.assertIn("tx_session_person_id", plan)
+
+    def test_session_active_balances(self):
+        self.assertIndexed(
+            SessionPersonBalance.objects.filter(session=self.session, count_items__gt=0).order_by("person_id"),
+            table=SessionPersonBalance._meta.db_table,
+        )
+
+    def test_transaction_list_first_page(self):
+        self.assertIndexed(Transaction.objects.order_by("-created_at", "-id")[:20])
+
+    def test_transaction_list_cursor_page(self):
+        last = Transaction.objects.order_by("-created_at", "-id")[5000]
+        self.assertIndexed(
+            Transaction.objects.filter(created_at__lte=last.created_at)
+            .exclude(created_at=last.created_at, id__gte=last.pk)
+            .order_by("-created_at", "-id")[:20]
+        )
+
+    def test_transaction_list_person_filter(self):
+        self.assertIndexed(
+            Transaction.objects.filter(person_id__in=[self.person.pk]).order_by("-created_at", "-id")[:20]
+        )
+
+    def test_stats_date_range(self):
+        since = Transaction.objects.order_by("-created_at")[500].created_at
+        self.assertIndexed(
+            StatsRollup.objects.filter(hour__gte=since).values("person_id").annotate(eur=Sum("eur")),
+            table=StatsRollup._meta.db_table,
+        )
+
+    def test_stats_session(self):
+        self.assertIndexed(
+            StatsRollup.objects.filter(session=self.session).values("item_id").annotate(eur=Sum("eur")),
+            table=StatsRollup._meta.db_table,
+        )
+
+    def test_single_open_session(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Session.objects.create()
+
+
+class ActiveSessionTests(TestCase):
+    """
+    core.active_session: procesná cache podľa stamp-u "active_session", súbeh pri vytváraní
+    a zneplatnenie v ostatných procesoch po uzavretí / otvorení session.
+    """
+
+    def setUp(self):
+        active_session.clear_local_cache()
+        self.addCleanup(active_session.clear_local_cache)
+
+    def stamp(self):
+        return versioning.get_version(active_session.ACTIVE_SESSION_VERSION)
+
+    def other_process(self, session):
+        """Cache iného workera postavená so stamp-om platným pred zmenou (session=None: žiadna otvorená)."""
+        entry = (session.pk, session.started_at) if session is not None else (None, None)
+        active_session._remember((self.stamp(), *entry))
+
+    def test_cached_lookup_without_queries(self):
+        s = Session.objects.create()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(active_session.get_active_session().pk, s.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(active_session.get_active_session().pk, s.pk)
+
+    def test_create_race_takes_winners_session(self):
+        # súbežný request už session vytvoril — constraint single_open_session → IntegrityError
+        winner = Session.objects.create()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            self.assertEqual(active_session._create().pk, winner.pk)
+        self.assertEqual(Session.objects.filter(ended_at__isnull=True).count(), 1)
+        self.assertEqual(callbacks, [])  # prehra nič nezneplatňuje
+
+    def test_create_bumps_stamp(self):
+        before = self.stamp()
+        with self.captureOnCommitCallbacks(execute=True):
+            created = active_session.get_active_session()
+        self.assertNotEqual(self.stamp(), before)
+        self.assertEqual(active_session.get_active_session().pk, created.pk)
+
+    def test_reset_invalidates_other_process_cache(self):
+        old = Session.objects.create()
+        self.other_process(old)
+        stamp = self.stamp()
+        with self.captureOnCommitCallbacks(execute=True):
+            r = admin_client().post("/api/session/reset")
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertNotEqual(self.stamp(), stamp)
+        self.assertEqual(active_session.get_active_session().pk, r.json()["active"]["id"])
+
+    def test_admin_close_and_open_invalidate(self):
+        old = Session.objects.create()
+        self.other_process(old)
+        stamp = self.stamp()
+        user = User.objects.create_superuser("admin", "admin@example.com", "pw")
+        self.client.force_login(user)
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post("/admin/core/session/", {
+                "action": "close_sessions", "_selected_action": [old.pk],
+            })
+        self.assertEqual(r.status_code, 302)
+        self.assertNotEqual(self.stamp(), stamp)
+        self.assertIsNone(active_session.get_active_session(create=False))
+
+        # znovuotvorenie v SessionAdmin
+        self.other_process(None)
+        stamp = self.stamp()
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post(f"/admin/core/session/{old.pk}/change/", {
+                "ended_at_0": "", "ended_at_1": "",
+                "transactions-TOTAL_FORMS": "0", "transactions-INITIAL_FORMS": "0",
+            })
+        self.assertEqual(r.status_code, 302, r.content[:2000])
+        self.assertNotEqual(self.stamp(), stamp)
+        self.assertEqual(active_session.get_active_session(create=False).pk, old.pk)
+
+
+class TransactionCreateQueryTests(TestCase):
+    """
+    POST /api/transactions: aktívna session, položka + kategória a jeden writable CTE —
+    najviac 4 SQL príkazy pre každý pricing_mode.
+    """
+    BUDGET = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        coffee = Category.objects.create(name="Coffee")
+        other = Category.objects.create(name="Other")
+        cls.person = Person.objects.create(name="Jano")
+        cls.session = Session.objects.create()
+        CoffeePreset.objects.create(label="Espresso", g_min=Decimal("7"), g_max=Decimal("20"),
+                                    extra_eur=Decimal("0.2"))
+        with cls.captureOnCommitCallbacks(execute=True):
+            versioning.bump_version(pricing.PRESETS_VERSION)
+        cls.items = {
+            "per_item": Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"),
+                                            stock_quantity=Decimal("10")),
+            "per_gram": Item.objects.create(name="Zrno", category=coffee, pricing_mode="per_gram",
+                                            price=Decimal("0.05"), stock_quantity=Decimal("500")),
+            "per_ml": Item.objects.create(name="Cold brew", category=other, pricing_mode="per_ml",
+                                          price=Decimal("0.01")),
+        }
+
+    def setUp(self):
+        self.client = APIClient()
+        pricing.preset_index()  # procesná cache presetov je teplá, ako v bežiacom workeri
+        active_session.clear_local_cache()  # session z iného testu už v DB nie je
+
+    def tap(self, item, quantity):
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.post("/api/transactions",
+                                 {"person_id": self.person.pk, "item_id": item.pk, "quantity": quantity},
+                                 format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        self.assertLessEqual(len(queries), self.BUDGET, "\n".join(q["sql"] for q in queries))
+        return r.json()
+
+    def test_per_item_beer(self):
+        data = self.tap(self.items["per_item"], "2")
+        self.assertEqual(data["person"]["total_beers"], 2)
+        self.assertEqual(Decimal(data["item"]["stock_quantity"]), Decimal("8"))
+        self.assertEqual(Decimal(data["price_at_time"]), Decimal("3.000"))
+
+    def test_per_gram_coffee(self):
+        data = self.tap(self.items["per_gram"], "18")
+        self.assertEqual(data["person"]["total_coffees"], 1)
+        self.assertEqual(Decimal(data["price_at_time"]), Decimal("1.100"))
+        self.assertEqual(Item.objects.get(pk=self.items["per_gram"].pk).brew_count, 1)
+
+    def test_per_ml(self):
+        data = self.tap(self.items["per_ml"], "250")
+        self.assertEqual(Decimal(data["price_at_time"]), Decimal("2.500"))
+        self.assertIsNone(data["item"]["stock_quantity"])
+
+    def test_ledger_aggregates(self):
+        self.tap(self.items["per_item"], "1")
+        self.tap(self.items["per_gram"], "18")
+        self.assertEqual(ledger.diff_balances(), [])
+        self.assertEqual(ledger.diff_rollups(), [])
+
+    def test_unknown_person(self):
+        r = self.client.post("/api/transactions",
+                             {"person_id": 999999, "item_id": self.items["per_item"].pk}, format="json")
+        self.assertEqual(r.status_code, 400)
+        self.assertIn("person_id", r.json())
+        self.assertFalse(Transaction.objects.exists())
+
+
+class PresetIndexTests(TestCase):
+    """
+    core.pricing.PresetIndex: uzavreté hranice, medzery, prekryvy (vyhrá najnižší (g_min, id))
+    a prebudovanie po bump_version(PRESETS_VERSION). Bisect polia sa ľahko posunú o jeden.
+    """
+
+    def setUp(self):
+        self.addCleanup(self.bump)  # procesný index nesmie prežiť rollback testu
+
+    def bump(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            versioning.bump_version(pricing.PRESETS_VERSION)
+
+    def preset(self, pk, g_min, g_max):
+        return CoffeePreset(id=pk, label=f"P{pk}", g_min=Decimal(g_min), g_max=Decimal(g_max),
+                            extra_eur=Decimal("0.1"))
+
+    def assertLookups(self, index, expected):
+        for qty, pk in expected:
+            found = index.lookup(Decimal(qty))
+            self.assertEqual(found.pk if found else None, pk, qty)
+
+    def test_inclusive_edges_and_gaps(self):
+        index = pricing.PresetIndex([self.preset(2, "15", "20"), self.preset(1, "7", "12")])
+        self.assertLookups(index, [
+            ("0", None), ("6.999", None), ("7", 1), ("9.5", 1), ("12", 1), ("12.001", None),
+            ("14.999", None), ("15", 2), ("17", 2), ("20", 2), ("20.001", None), ("1000", None),
+        ])
+        self.assertEqual(index.overlaps, [])
+
+    def test_single_point_and_empty(self):
+        self.assertLookups(pricing.PresetIndex([self.preset(1, "10", "10")]),
+                           [("9.999", None), ("10", 1), ("10.001", None)])
+        self.assertLookups(pricing.PresetIndex([]), [("10", None)])
+
+    def test_overlaps_lowest_g_min_then_id_wins(self):
+        index = pricing.PresetIndex([
+            self.preset(1, "10", "20"),   # prekryv s 2 — 2 má nižší g_min
+            self.preset(2, "5", "15"),
+            self.preset(4, "30", "40"),   # rovnaký g_min ako 3 → vyhrá nižšie id
+            self.preset(3, "30", "35"),
+            self.preset(5, "50", "60"),   # dotýka sa 6 v bode 60
+            self.preset(6, "60", "70"),
+        ])
+        self.assertLookups(index, [
+            ("5", 2), ("10", 2), ("15", 2), ("15.001", 1), ("20", 1), ("30", 3), ("35", 3),
+            ("35.5", 4), ("40", 4), ("60", 5), ("60.001", 6),
+        ])
+        self.assertEqual({(a.pk, b.pk) for a, b in index.overlaps}, {(2, 1), (3, 4), (5, 6)})
+
+    def test_invalid_preset_ignored(self):
+        index = pricing.PresetIndex([self.preset(1, "20", "10"), self.preset(2, "12", "14")])
+        self.assertEqual([p.pk for p in index.invalid], [1])
+        self.assertLookups(index, [("11", None), ("13", 2), ("15", None)])
+
+    def test_matches_linear_scan(self):
+        rnd = random.Random(5)
+        for _ in range(50):
+            presets = []
+            for pk in range(1, rnd.randint(1, 6) + 1):
+                g_min = rnd.randint(0, 30)
+                presets.append(self.preset(pk, str(g_min), str(g_min + rnd.randint(0, 10))))
+            index = pricing.PresetIndex(presets)
+            for tenths in range(0, 450, 5):
+                qty = Decimal(tenths) / 10
+                covering = sorted((p for p in presets if p.g_min <= qty <= p.g_max), key=lambda p: (p.g_min, p.id))
+                self.assertIs(index.lookup(qty), covering[0] if covering else None, (qty, presets))
+
+    def test_rebuild_after_version_bump_logs_overlaps(self):
+        CoffeePreset.objects.create(label="Espresso", g_min=Decimal("7"), g_max=Decimal("12"), extra_eur=Decimal("0.2"))
+        self.bump()
+        index = pricing.preset_index()
+        self.assertIsNone(index.lookup(Decimal("18")))
+
+        lungo = CoffeePreset.objects.create(label="Lungo", g_min=Decimal("10"), g_max=Decimal("20"),
+                                            extra_eur=Decimal("0.3"))
+        self.assertIs(pricing.preset_index(), index)  # bez bumpu ostáva starý index
+        self.bump()
+        with self.assertLogs("core.pricing", "WARNING") as logs:
+            rebuilt = pricing.preset_index()
+        self.assertIsNot(rebuilt, index)
+        self.assertEqual(rebuilt.lookup(Decimal("18")), lungo)
+        self.assertEqual(rebuilt.lookup(Decimal("11")).label, "Espresso")
+        self.assertIn("prekrýva", logs.output[0])
+
+
+class TransactionBatchTests(TestCase):
+    """
+    POST /api/transactions/batch: počítadlá, zásoby a ledger ako pri jednotlivých ťuknutiach,
+    pohyb zásoby na každý riadok s ref na jeho transakciu a konštantný počet SQL.
+    """
+    BUDGET = 11
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        coffee = Category.objects.create(name="Coffee")
+        cls.jano = Person.objects.create(name="Jano")
+        cls.fero = Person.objects.create(name="Fero")
+        cls.pivo = Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"),
+                                       stock_quantity=Decimal("10"))
+        cls.zrno = Item.objects.create(name="Zrno", category=coffee, pricing_mode="per_gram",
+                                       price=Decimal("0.05"), stock_quantity=Decimal("100"))
+        for item in (cls.pivo, cls.zrno):
+            stock.record_initial(item)
+        Session.objects.create()
+        with cls.captureOnCommitCallbacks(execute=True):
+            versioning.bump_version(pricing.PRESETS_VERSION)  # bez presetov — žiadny príplatok
+
+    def setUp(self):
+        self.client = APIClient()
+        pricing.preset_index()  # procesné cache sú teplé, ako v bežiacom workeri
+        active_session.clear_local_cache()
+        active_session.get_active_session()
+
+    def post(self, lines):
+        return self.client.post("/api/transactions/batch", {"lines": lines}, format="json")
+
+    def line(self, person, item, quantity):
+        return {"person_id": person.pk, "item_id": item.pk, "quantity": quantity}
+
+    def test_mixed_beer_and_coffee(self):
+        r = self.post([
+            self.line(self.jano, self.pivo, "2"), self.line(self.fero, self.pivo, "1"),
+            self.line(self.jano, self.zrno, "18"), self.line(self.fero, self.zrno, "15"),
+        ])
+        self.assertEqual(r.status_code, 201, r.content)
+        results = r.json()["results"]
+        self.assertEqual([Decimal(t["price_at_time"]) for t in results],
+                         [Decimal("3"), Decimal("1.5"), Decimal("0.9"), Decimal("0.75")])
+
+        self.jano.refresh_from_db()
+        self.fero.refresh_from_db()
+        self.assertEqual((self.jano.total_beers, self.jano.total_coffees), (2, 1))
+        self.assertEqual((self.fero.total_beers, self.fero.total_coffees), (1, 1))
+        self.pivo.refresh_from_db()
+        self.zrno.refresh_from_db()
+        self.assertEqual(self.pivo.stock_quantity, Decimal("7"))
+        self.assertEqual((self.zrno.stock_quantity, self.zrno.brew_count), (Decimal("67"), 2))
+
+        movements = list(StockMovement.objects.filter(reason=stock.REASON_SALE).order_by("id")
+                         .values_list("item_id", "delta", "balance", "ref"))
+        self.assertEqual(movements, [
+            (self.pivo.pk, Decimal("-2"), Decimal("8"), f"tx:{results[0]['id']}"),
+            (self.pivo.pk, Decimal("-1"), Decimal("7"), f"tx:{results[1]['id']}"),
+            (self.zrno.pk, Decimal("-18"), Decimal("82"), f"tx:{results[2]['id']}"),
+            (self.zrno.pk, Decimal("-15"), Decimal("67"), f"tx:{results[3]['id']}"),
+        ])
+        self.assertEqual(stock.diff(), [])
+        self.assertEqual(ledger.diff_balances(), [])
+        self.assertEqual(ledger.diff_rollups(), [])
+
+    def test_unknown_person_or_item(self):
+        for lines, key in (
+            ([self.line(self.jano, self.pivo, "1"), {"person_id": 999999, "item_id": self.pivo.pk}],
+             "missing_person_ids"),
+            ([self.line(self.jano, self.pivo, "1"), {"person_id": self.jano.pk, "item_id": 999999}],
+             "missing_item_ids"),
+        ):
+            r = self.post(lines)
+            self.assertEqual(r.status_code, 400, r.content)
+            self.assertEqual(r.json()[key], [999999])
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(StockMovement.objects.filter(reason=stock.REASON_SALE).exists())
+        self.jano.refresh_from_db()
+        self.pivo.refresh_from_db()
+        self.assertEqual((self.jano.total_beers, self.pivo.stock_quantity), (0, Decimal("10")))
+
+    def test_query_budget(self):
+        counts = []
+        for n in (2, 20):
+            lines = [self.line(p, i, "1") for _ in range(n // 4 or 1)
+                     for p in (self.jano, self.fero) for i in (self.pivo, self.zrno)][:n]
+            with CaptureQueriesContext(connection) as queries:
+                r = self.post(lines)
+            self.assertEqual(r.status_code, 201, r.content)
+            self.assertLessEqual(len(queries), self.BUDGET, "\n".join(q["sql"] for q in queries))
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+
+class StockLedgerConsistencyTests(TestCase):
+    """
+    Undo, settle a brew zapisujú pohyby zásoby a ledger tak, že stock.diff() aj
+    ledger.diff_balances() ostanú prázdne (rovnaká kontrola ako na konci príkazu stress).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        coffee = Category.objects.create(name="Coffee")
+        other = Category.objects.create(name="Other")
+        cls.jano = Person.objects.create(name="Jano")
+        cls.fero = Person.objects.create(name="Fero")
+        Person.objects.create(name="Hosť", is_guest=True)
+        cls.pivo = Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"),
+                                       stock_quantity=Decimal("10"))
+        cls.zrno = Item.objects.create(name="Zrno", category=coffee, pricing_mode="per_gram",
+                                       price=Decimal("0.05"), stock_quantity=Decimal("100"))
+        cls.cold_brew = Item.objects.create(name="Cold brew", category=other, pricing_mode="per_ml",
+                                            price=Decimal("0.01"))  # zásobu zatiaľ nesleduje
+        for item in (cls.pivo, cls.zrno):
+            stock.record_initial(item)
+        Session.objects.create()
+        with cls.captureOnCommitCallbacks(execute=True):
+            versioning.bump_version(pricing.PRESETS_VERSION)
+
+    def setUp(self):
+        self.client = admin_client()
+        active_session.clear_local_cache()
+
+    def assertConsistent(self):
+        self.assertEqual(stock.diff(), [])
+        self.assertEqual(ledger.diff_balances(), [])
+        self.assertEqual(ledger.diff_rollups(), [])
+
+    def tap(self, person, item, quantity):
+        r = self.client.post("/api/transactions",
+                             {"person_id": person.pk, "item_id": item.pk, "quantity": quantity}, format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        return r.json()
+
+    def undo(self, person):
+        r = self.client.post("/api/transactions/undo", {"person_id": person.pk}, format="json")
+        self.assertEqual(r.status_code, 200, r.content)
+        return r.json()["undone"]
+
+    def level(self, item):
+        return Item.objects.get(pk=item.pk).stock_quantity
+
+    def test_undo(self):
+        self.tap(self.jano, self.pivo, "2")
+        last = self.tap(self.jano, self.zrno, "18")
+        self.tap(self.fero, self.pivo, "1")
+
+        self.assertEqual(self.undo(self.jano)["id"], last["id"])
+        self.assertEqual((self.level(self.pivo), self.level(self.zrno)), (Decimal("7"), Decimal("100")))
+        movement = StockMovement.objects.get(reason=stock.REASON_UNDO)
+        self.assertEqual((movement.item_id, movement.delta, movement.ref),
+                         (self.zrno.pk, Decimal("18"), f"tx:{last['id']}"))
+        self.assertConsistent()
+
+        self.undo(self.jano)
+        self.undo(self.fero)
+        self.assertEqual(self.level(self.pivo), Decimal("10"))
+        self.assertFalse(SessionPersonBalance.objects.filter(count_items__gt=0).exists())
+        self.assertConsistent()
+
+    def test_settle(self):
+        self.tap(self.jano, self.pivo, "4")
+        r = self.client.post(f"/api/items/{self.pivo.pk}/settle")
+        self.assertEqual(r.status_code, 201, r.content)
+        settled = r.json()["settled"]
+        # zvyšných 6 piv medzi dvoch domácich, hosť nič
+        self.assertEqual(sorted((t["person"]["id"], Decimal(t["quantity"])) for t in settled),
+                         [(self.jano.pk, Decimal("3")), (self.fero.pk, Decimal("3"))])
+        self.assertEqual(self.level(self.pivo), Decimal("0"))
+        self.assertFalse(Item.objects.get(pk=self.pivo.pk).active)
+        self.assertConsistent()
+
+        # undo rozrátaného podielu vráti zásobu ako pri bežnej transakcii
+        self.undo(self.fero)
+        self.assertEqual(self.level(self.pivo), Decimal("3"))
+        self.assertConsistent()
+
+    def test_brew(self):
+        r = self.client.post("/api/brew-batches", {
+            "ingredients": [{"coffee_id": self.zrno.pk, "grams": "60"}],
+            "output_item_id": self.cold_brew.pk,
+            "output_ml": "750",
+        }, format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        self.assertEqual((self.level(self.zrno), self.level(self.cold_brew)), (Decimal("40"), Decimal("750")))
+        ref = f"brew:{r.json()['id']}"
+        self.assertEqual(
+            sorted(StockMovement.objects.filter(ref=ref).values_list("reason", "item_id", "delta")),
+            [(stock.REASON_BREW_OUTPUT, self.cold_brew.pk, Decimal("750")),
+             (stock.REASON_BREW_USE, self.zrno.pk, Decimal("-60"))],
+        )
+        self.assertConsistent()
+
+        self.tap(self.jano, self.cold_brew, "250")
+        self.assertEqual(self.level(self.cold_brew), Decimal("500"))
+        self.undo(self.jano)
+        self.assertEqual(self.level(self.cold_brew), Decimal("750"))
+        self.assertConsistent()
+
+
+class LedgerMaintenanceTests(TestCase):
+    """
+    SessionPersonBalance a StatsRollup ostávajú zhodné so surovým ledgerom aj pri zápisoch mimo kiosku:
+    úprava / zmazanie transakcie v admine aj cez API, kaskády pri zmazaní kategórie či položky, reset dlhu.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.beer = Category.objects.create(name="Beer")
+        cls.coffee = Category.objects.create(name="Coffee")
+        cls.pivo = Item.objects.create(name="Pivo", category=cls.beer, price=Decimal("1.5"))
+        cls.kofola = Item.objects.create(name="Kofola", category=cls.beer, price=Decimal("1.2"))
+        cls.zrno = Item.objects.create(name="Zrno", category=cls.coffee, pricing_mode="per_gram",
+                                       price=Decimal("0.05"))
+        cls.jano = Person.objects.create(name="Jano")
+        cls.fero = Person.objects.create(name="Fero")
+        cls.closed = Session.objects.create(ended_at=timezone.now())
+        cls.open = Session.objects.create()
+        cls.superuser = User.objects.create_superuser("admin", "admin@example.com", "pw")
+
+    def setUp(self):
+        active_session.clear_local_cache()
+        txs = []
+        base = timezone.now() - timedelta(days=2)
+        for i, (session, person, item, price) in enumerate((
+            (self.closed, self.jano, self.pivo, "1.5"), (self.closed, self.fero, self.zrno, "0.9"),
+            (self.open, self.jano, self.pivo, "1.5"), (self.open, self.jano, self.kofola, "1.2"),
+            (self.open, self.fero, self.zrno, "0.9"), (self.open, self.fero, self.pivo, "3"),
+        )):
+            t = Transaction.objects.create(session=session, person=person, item=item, price_at_time=Decimal(price))
+            Transaction.objects.filter(pk=t.pk).update(created_at=base + timedelta(hours=5 * i))
+            t.refresh_from_db()
+            txs.append(t)
+        ledger.record(txs)
+        self.txs = txs
+        self.assertConsistent()
+
+    def assertConsistent(self):
+        self.assertEqual(ledger.diff_balances(), [])
+        self.assertEqual(ledger.diff_rollups(), [])
+
+    def admin(self):
+        self.client.force_login(self.superuser)
+        return self.client
+
+    def test_admin_edit_transaction(self):
+        t = self.txs[2]
+        r = self.admin().post(f"/admin/core/transaction/{t.pk}/change/", {
+            "session": self.closed.pk, "person": self.fero.pk, "item": self.kofola.pk,
+            "quantity": "2", "price_at_time": "2.4",
+        })
+        self.assertEqual(r.status_code, 302, r.content[:2000])
+        t.refresh_from_db()
+        self.assertEqual((t.session_id, t.person_id, t.price_at_time), (self.closed.pk, self.fero.pk, Decimal("2.4")))
+        self.assertConsistent()
+
+    def test_admin_delete_transactions(self):
+        r = self.admin().post(f"/admin/core/transaction/{self.txs[0].pk}/delete/", {"post": "yes"})
+        self.assertEqual(r.status_code, 302)
+        r = self.client.post("/admin/core/transaction/", {
+            "action": "delete_selected", "post": "yes", "_selected_action": [self.txs[2].pk, self.txs[5].pk],
+        })
+        self.assertEqual(r.status_code, 302)
+        self.assertEqual(Transaction.objects.count(), 3)
+        self.assertConsistent()
+
+    def test_admin_delete_category_and_items(self):
+        r = self.admin().post(f"/admin/core/item/{self.kofola.pk}/delete/", {"post": "yes"})
+        self.assertEqual(r.status_code, 302)
+        self.assertConsistent()
+        r = self.client.post("/admin/core/category/", {
+            "action": "delete_selected", "post": "yes", "_selected_action": [self.beer.pk],
+        })
+        self.assertEqual(r.status_code, 302)
+        self.assertFalse(Transaction.objects.filter(item__category__name="Beer").exists())
+        self.assertConsistent()
+        r = self.client.post("/admin/core/item/", {
+            "action": "delete_selected", "post": "yes", "_selected_action": [self.zrno.pk],
+        })
+        self.assertEqual(r.status_code, 302)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertFalse(SessionPersonBalance.objects.filter(count_items__gt=0).exists())
+        self.assertConsistent()
+
+    def test_admin_delete_single_category(self):
+        r = self.admin().post(f"/admin/core/category/{self.coffee.pk}/delete/", {"post": "yes"})
+        self.assertEqual(r.status_code, 302)
+        self.assertConsistent()
+
+    def test_api_patch_and_delete_transaction(self):
+        client = admin_client()
+        r = client.patch(f"/api/transactions/{self.txs[1].pk}", {"price_at_time": "0.5"}, format="json")
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertConsistent()
+        r = client.delete(f"/api/transactions/{self.txs[3].pk}")
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertConsistent()
+
+    def test_api_delete_category_and_item(self):
+        client = admin_client()
+        self.assertEqual(client.delete(f"/api/items/{self.zrno.pk}/").status_code, 204)
+        self.assertConsistent()
+        self.assertEqual(client.delete(f"/api/categories/{self.beer.pk}/").status_code, 204)
+        self.assertFalse(Transaction.objects.exists())
+        self.assertConsistent()
+
+    def test_reset_debt(self):
+        r = admin_client().post(f"/api/persons/{self.jano.pk}/reset-debt")
+        self.assertEqual(r.status_code, 200, r.content)
+        self.assertFalse(Transaction.objects.filter(session=self.open, person=self.jano).exists())
+        self.assertTrue(Transaction.objects.filter(session=self.closed, person=self.jano).exists())
+        self.assertConsistent()
+
+
+class TransactionCursorTests(TestCase):
+    """
+    Keyset stránkovanie /api/transactions/list?cursor=: tam aj späť bez duplicít a dier
+    aj cez skupiny s rovnakým created_at, s filtrom osôb, a 400 pre podvrhnutý kurzor.
+    """
+    URL = "/api/transactions/list"
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        item = Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"))
+        cls.jano = Person.objects.create(name="Jano")
+        cls.fero = Person.objects.create(name="Fero")
+        session = Session.objects.create()
+        base = timezone.now().replace(microsecond=0)
+        # 5 časov po 5 transakciách — hranice strán (limit 4 / 3) padnú doprostred skupín
+        Transaction.objects.bulk_create(
+            Transaction(session=session, person=cls.jano if n % 3 else cls.fero, item=item,
+                        quantity=Decimal("1"), price_at_time=Decimal("1.5"),
+                        created_at=base - timedelta(minutes=n // 5))
+            for n in range(25)
+        )
+        cls.expected = list(Transaction.objects.order_by("-created_at", "-id").values_list("id", flat=True))
+
+    def page(self, **params):
+        r = self.client.get(self.URL, params)
+        self.assertEqual(r.status_code, 200, r.content)
+        data = r.json()
+        key = "rows" if params.get("format") == "compact" else "results"
+        return [row[0] if key == "rows" else row["id"] for row in data[key]], data
+
+    def walk(self, **params):
+        """Prejde všetky strany dopredu, potom od poslednej späť; vráti (strany dopredu, strany späť)."""
+        forward = []
+        ids, data = self.page(cursor="", **params)
+        forward.append(ids)
+        while data["next"]:
+            ids, data = self.page(cursor=data["next"], **params)
+            forward.append(ids)
+        backward = [ids]
+        while data["prev"]:
+            ids, data = self.page(cursor=data["prev"], **params)
+            backward.append(ids)
+        return forward, backward[::-1]
+
+    def test_next_then_prev(self):
+        for fmt in ({}, {"format": "compact"}):
+            forward, backward = self.walk(limit=4, **fmt)
+            self.assertEqual(sum(forward, []), self.expected, fmt)
+            self.assertTrue(all(len(ids) == 4 for ids in forward[:-1]))
+            self.assertEqual(backward, forward, fmt)
+
+    def test_person_filter(self):
+        forward, backward = self.walk(limit=3, person_id=str(self.jano.pk))
+        expected = list(Transaction.objects.filter(person=self.jano).order_by("-created_at", "-id")
+                        .values_list("id", flat=True))
+        self.assertEqual(sum(forward, []), expected)
+        self.assertEqual(backward, forward)
+        _, data = self.page(cursor="", limit=3, person_id=str(self.fero.pk), with_count="1")
+        self.assertEqual(data["count"], Transaction.objects.filter(person=self.fero).count())
+
+    def test_invalid_cursor(self):
+        def encode(value):
+            return base64.urlsafe_b64encode(json.dumps(value).encode()).decode().rstrip("=")
+
+        valid = self.page(cursor="", limit=4)[1]["next"]
+        created_at = timezone.now().isoformat()
+        for cursor in (
+            "garbage", "%%%", valid[:-3], encode({"direction": "next"}), encode("abc"),
+            encode(["up", created_at, 1]), encode(["next", created_at, "1"]), encode(["next", created_at, True]),
+            encode(["next", created_at, 10 ** 30]), encode(["next", created_at, -1]),
+            encode(["next", "2024-01-01T00:00:00", 1]), encode(["next", "včera", 1]), encode(["next", None, 1]),
+        ):
+            r = self.client.get(self.URL, {"cursor": cursor})
+            self.assertEqual(r.status_code, 400, cursor)
+            self.assertEqual(r.json(), {"error": "invalid cursor"})
+
+
+class CompactFormatTests(TestCase):
+    """?format=compact: riadky + bočné tabuľky rozbalené späť = záznamy plného formátu tej istej strany."""
+    URL = "/api/transactions/list"
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        coffee = Category.objects.create(name="Coffee")
+        items = [
+            Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"), stock_quantity=Decimal("24"),
+                                color="#f5c542", note="čapované"),
+            Item.objects.create(name="Zrno", category=coffee, pricing_mode="per_gram", price=Decimal("0.05")),
+            Item.objects.create(name="Kofola", category=beer, price=Decimal("1.2"), active=False),
+        ]
+        persons = [
+            Person.objects.create(name="Jano", email="jano@example.com", total_beers=3),
+            Person.objects.create(name="Fero", is_guest=True, avatar_hash="ab" + "c" * (avatars.DIGEST_LENGTH - 2)),
+        ]
+        session = Session.objects.create()
+        base = timezone.now().replace(microsecond=0)
+        Transaction.objects.bulk_create(
+            Transaction(session=session, person=persons[n % 2], item=items[n % 3],
+                        quantity=Decimal("18.5") if n % 3 == 1 else Decimal("1"),
+                        price_at_time=Decimal("0.925") if n % 3 == 1 else Decimal("1.5"),
+                        created_at=base - timedelta(minutes=n))
+            for n in range(12)
+        )
+
+    def expand(self, data):
+        """Kompaktná odpoveď → zoznam záznamov v tvare plného formátu."""
+        self.assertEqual(data["format"], "compact")
+        persons = {p["id"]: p for p in data["persons"]}
+        categories = {c["id"]: c for c in data["categories"]}
+        items = {i["id"]: dict(i, category=categories[i["category"]]) for i in data["items"]}
+        self.assertEqual(len(persons), len(data["persons"]))  # každá osoba v tabuľke raz
+        records = []
+        for row in data["rows"]:
+            r = dict(zip(data["columns"], row))
+            r["person"] = persons[r["person"]]
+            r["item"] = items[r["item"]]
+            records.append(r)
+        return records
+
+    def normalized(self, records):
+        # plný formát: čísla ako reťazce, kompaktný ako JSON čísla
+        return [dict(r, quantity=Decimal(str(r["quantity"])), price_at_time=Decimal(str(r["price_at_time"])))
+                for r in records]
+
+    def assertSamePage(self, **params):
+        full = self.client.get(self.URL, params).json()
+        compact = self.client.get(self.URL, {**params, "format": "compact"}).json()
+        self.assertEqual(self.normalized(self.expand(compact)), self.normalized(full["results"]), params)
+        self.assertTrue(full["results"])
+        return full, compact
+
+    def test_offset_pages(self):
+        for offset in (0, 5, 10):
+            full, compact = self.assertSamePage(limit=5, offset=offset)
+            self.assertEqual(compact["count"], full["count"])
+
+    def test_cursor_pages_and_person_filter(self):
+        full, compact = self.assertSamePage(cursor="", limit=4)
+        self.assertSamePage(cursor=compact["next"], limit=4)
+        self.assertSamePage(cursor="", limit=20, person_id=str(Person.objects.get(name="Fero").pk))
+
+    def test_side_tables_match_serializers(self):
+        _, compact = self.assertSamePage(limit=12)
+        self.assertEqual(sorted(p["id"] for p in compact["persons"]),
+                         sorted(Person.objects.values_list("id", flat=True)))
+        fero = next(p for p in compact["persons"] if p["name"] == "Fero")
+        self.assertEqual(fero["avatar_srcset"], avatars.srcset(Person.objects.get(name="Fero").avatar_hash))
+        self.assertEqual(sorted(c["name"] for c in compact["categories"]), ["Beer", "Coffee"])
+
+
+class CatalogETagTests(TestCase):
+    """CatalogETagMixin: ETag sa mení so zápisom (API aj admin), líši sa pre detail/zoznam a formát."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.beer = Category.objects.create(name="Beer")
+        cls.pivo = Item.objects.create(name="Pivo", category=cls.beer, price=Decimal("1.5"))
+        cls.jano = Person.objects.create(name="Jano")
+
+    def etag(self, url, **headers):
+        r = self.client.get(url, **headers)
+        self.assertEqual(r.status_code, 200, url)
+        return r["ETag"]
+
+    def write(self, method, url, data=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            r = getattr(admin_client(), method)(url, data, format="json")
+        self.assertIn(r.status_code, (200, 201, 204), r.content)
+
+    def assertChanged(self, url, write, *args):
+        before = self.etag(url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before).status_code, 304)
+        write(*args)
+        after = self.etag(url)
+        self.assertNotEqual(after, before, url)
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=before).status_code, 200)
+
+    def test_api_writes_change_etag(self):
+        self.assertChanged("/api/persons/", self.write, "post", "/api/persons/", {"name": "Fero"})
+        self.assertChanged("/api/persons/", self.write, "patch", f"/api/persons/{self.jano.pk}/", {"name": "Janko"})
+        self.assertChanged("/api/items/", self.write, "patch", f"/api/items/{self.pivo.pk}/", {"price": "1.6"})
+        self.assertChanged("/api/categories/", self.write, "post", "/api/categories/", {"name": "Wine"})
+        # položka obsahuje vnorenú kategóriu → aj zmena kategórie mení ETag položiek
+        self.assertChanged(f"/api/items/{self.pivo.pk}/", self.write,
+                           "patch", f"/api/categories/{self.beer.pk}/", {"name": "Pivá"})
+        self.assertChanged("/api/items/", self.write, "delete", f"/api/items/{self.pivo.pk}/")
+
+    def test_admin_save_changes_etag(self):
+        client = Client()
+        client.force_login(User.objects.create_superuser("admin", "admin@example.com", "pw"))
+
+        def admin_post(url, data):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.assertEqual(client.post(url, data).status_code, 302)
+
+        self.assertChanged("/api/persons/", admin_post, f"/admin/core/person/{self.jano.pk}/change/",
+                           {"name": "Janko", "avatar_hash": "", "total_beers": 0, "total_coffees": 0, "active": "on"})
+        self.assertChanged("/api/categories/", admin_post, f"/admin/core/category/{self.beer.pk}/change/",
+                           {"name": "Pivá"})
+        self.assertChanged("/api/items/", admin_post, "/admin/core/item/",
+                           {"action": "deactivate_items", "_selected_action": [self.pivo.pk]})
+
+    def test_variants_have_distinct_etags(self):
+        list_etag = self.etag("/api/items/")
+        detail_etag = self.etag(f"/api/items/{self.pivo.pk}/")
+        self.assertNotEqual(list_etag, detail_etag)
+        self.assertEqual(self.etag("/api/items/"), list_etag)  # bez zmeny stabilný
+        self.assertNotEqual(self.etag("/api/items/?active=true"), list_etag)
+
+        html = self.etag("/api/items/", HTTP_ACCEPT="text/html")
+        self.assertNotEqual(self.etag("/api/items/", HTTP_ACCEPT="application/json"), html)
+        self.assertNotEqual(self.etag("/api/items/?format=json"), self.etag("/api/items/?format=api"))
+        # ETag JSON zoznamu nesmie potvrdiť HTML variant
+        r = self.client.get("/api/items/", HTTP_ACCEPT="text/html", HTTP_IF_NONE_MATCH=list_etag)
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("Accept", r["Vary"])
+
+
+class FastSerializerParityTests(TestCase):
+    """
+    core.fast_serializers musí dať bajt po bajte rovnaký JSON ako DRF serializéry
+    (poradie kľúčov, Decimal reťazce, datetime v aktuálnej zóne, avatar ako cesta, None).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        coffee = Category.objects.create(name="Coffee")
+        cls.persons = [
+            Person.objects.create(name="Jano", email="jano@example.com", avatar="avatars/jano čierny+1.png"),
+            Person.objects.create(name="Hosť", is_guest=True, active=False, total_beers=3),
+        ]
+        pivo = Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"), stock_quantity=Decimal("0"))
+        zrno = Item.objects.create(name="Zrno", category=coffee, pricing_mode="per_gram", price=Decimal("0.05"),
+                                   note="Etiópia", stock_quantity=Decimal("512.25"))
+        cold_brew = Item.objects.create(name="Cold brew", category=coffee, pricing_mode="per_ml",
+                                        price=Decimal("0.01"), color="linear-gradient(#000, #fff)")
+        session = Session.objects.create()
+        for person, item, qty, price in (
+            (cls.persons[0], pivo, "1", "1.5"), (cls.persons[0], zrno, "18.5", "0.925"),
+            (cls.persons[1], cold_brew, "250", "2.5"), (cls.persons[1], pivo, "2", "3"),
+        ):
+            Transaction.objects.create(session=session, person=person, item=item,
+                                       quantity=Decimal(qty), price_at_time=Decimal(price))
+        # celé sekundy: isoformat() vtedy vynechá mikrosekundy
+        Transaction.objects.filter(pk=Transaction.objects.order_by("id").first().pk).update(
+            created_at="2024-03-31T01:30:00Z",
+        )
+        batch = BrewBatch.objects.create(output_item=cold_brew, output_ml=Decimal("1000"), note="")
+        BrewBatchIngredient.objects.create(batch=batch, coffee=zrno, grams=Decimal("60"), sort_order=1)
+        BrewBatchIngredient.objects.create(batch=batch, coffee=pivo, grams=Decimal("0.5"), sort_order=0)
+        BrewBatch.objects.create(output_item=cold_brew, output_ml=Decimal("250.125"), note="bez ingrediencií")
+
+    def assertSameJSON(self, fast, drf):
+        self.assertEqual(JSONRenderer().render(fast), JSONRenderer().render(drf))
+
+    def test_persons(self):
+        qs = Person.objects.order_by("id")
+        self.assertSameJSON(fast_serializers.PERSON.many(qs), PersonSerializer(qs, many=True).data)
+
+    def test_items(self):
+        qs = Item.objects.order_by("id")
+        self.assertSameJSON(fast_serializers.ITEM.many(qs), ItemSerializer(qs, many=True).data)
+
+    def test_transactions(self):
+        qs = Transaction.objects.order_by("-created_at", "-id")
+        self.assertSameJSON(
+            fast_serializers.TRANSACTION.many(qs),
+            TransactionSerializer(qs.select_related("person", "item__category"), many=True).data,
+        )
+
+    def test_brew_batches(self):
+        qs = BrewBatch.objects.order_by("-created_at")
+        self.assertSameJSON(
+            fast_serializers.brew_batches(qs),
+            BrewBatchSerializer(qs.select_related("output_item").prefetch_related("ingredients__coffee"),
+                                many=True).data,
+        )
+
+    def test_current_timezone(self):
+        qs = Transaction.objects.order_by("id")
+        with timezone.override("Europe/Bratislava"):
+            self.assertSameJSON(
+                fast_serializers.TRANSACTION.many(qs),
+                TransactionSerializer(qs, many=True).data,
+            )
+
+    def test_list_endpoints(self):
+        client = admin_client()
+        for url, drf in (
+            ("/api/persons/", PersonSerializer(Person.objects.order_by("id"), many=True).data),
+            ("/api/items/", ItemSerializer(Item.objects.order_by("id"), many=True).data),
+            ("/api/brew-batches", BrewBatchSerializer(BrewBatch.objects.order_by("-created_at"), many=True).data),
+        ):
+            r = client.get(url)
+            self.assertEqual(r.status_code, 200, url)
+            self.assertEqual(r.content, JSONRenderer().render(drf), url)
+        r = client.get("/api/transactions/list?limit=500")
+        self.assertEqual(
+            r.json()["results"],
+            TransactionSerializer(Transaction.objects.order_by("-created_at"), many=True).data,
+        )
+
+
+@override_settings(PROFILES_DIR="")
+class PayBySquareTests(TestCase):
+    """Pay by Square: HTML s ?v= odkazom na QR, QR obrázok so silným ETag-om, 304 a nemenná URL."""
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        cls.pivo = Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"))
+        cls.jano = Person.objects.create(name="Jano")
+        cls.fero = Person.objects.create(name="Fero")
+        cls.session = Session.objects.create()
+
+    def setUp(self):
+        active_session.clear_local_cache()
+        self.tap()
+
+    def tap(self):
+        t = Transaction.objects.create(session=self.session, person=self.jano, item=self.pivo,
+                                       quantity=1, price_at_time=Decimal("1.5"))
+        ledger.record([t])
+
+    def qr_url(self, person=None):
+        r = self.client.get(f"/api/persons/{(person or self.jano).pk}/pay-by-square/")
+        self.assertEqual(r.status_code, 200)
+        return re.search(r'<img src="([^"]+)"', r.content.decode()).group(1)
+
+    def expected_etag(self, fmt):
+        debt = SessionPersonBalance.objects.get(session=self.session, person=self.jano).total_eur
+        return qr.qr_etag(settings.PAYMENT_IBAN, debt, f"{self.jano.pk:06d}", "Debt payment for Jano", fmt)
+
+    def test_png_and_svg(self):
+        for fmt, content_type, magic in (("png", "image/png", b"\x89PNG"), ("svg", "image/svg+xml", b"<svg")):
+            r = self.client.get(f"/api/persons/{self.jano.pk}/pay-by-square/qr.{fmt}")
+            self.assertEqual(r.status_code, 200, fmt)
+            self.assertEqual(r["Content-Type"], content_type)
+            self.assertIn(magic, r.content[:200])
+            self.assertEqual(r["ETag"], self.expected_etag(fmt))
+            self.assertEqual(r["Cache-Control"], "no-cache")  # bez ?v= len revalidácia
+
+    def test_if_none_match(self):
+        url = f"/api/persons/{self.jano.pk}/pay-by-square/qr.png"
+        r = self.client.get(url, HTTP_IF_NONE_MATCH=self.expected_etag("png"))
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r["ETag"], self.expected_etag("png"))
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH='"iny"').status_code, 200)
+
+    def test_versioned_url_changes_with_debt(self):
+        url = self.qr_url()
+        self.assertTrue(url.endswith("?v=" + self.expected_etag("png").strip('"')), url)
+        r = self.client.get(url)
+        self.assertEqual(r.status_code, 200)
+        self.assertIn("immutable", r["Cache-Control"])
+        self.assertEqual(self.qr_url(), url)  # dlh sa nezmenil → rovnaká URL
+
+        self.tap()
+        new_url = self.qr_url()
+        self.assertNotEqual(new_url, url)
+        self.assertEqual(self.client.get(new_url)["ETag"], self.expected_etag("png"))
+        # stará verzia v URL už nesedí → žiadne immutable, obsah podľa aktuálneho dlhu
+        stale = self.client.get(url)
+        self.assertEqual(stale["Cache-Control"], "no-cache")
+        self.assertEqual(stale["ETag"], self.expected_etag("png"))
+
+    def test_unsupported_format_and_no_debt(self):
+        self.assertEqual(self.client.get(f"/api/persons/{self.jano.pk}/pay-by-square/qr.gif").status_code, 404)
+        self.assertEqual(self.client.get("/api/persons/999999/pay-by-square/qr.png").status_code, 404)
+        # bez dlhu rovnako na stránke aj pri QR
+        self.assertEqual(self.client.get(f"/api/persons/{self.fero.pk}/pay-by-square/").status_code, 400)
+        self.assertEqual(self.client.get(f"/api/persons/{self.fero.pk}/pay-by-square/qr.png").status_code, 400)
+
+
+class ProfilingTests(TestCase):
+    """
+    Sync DRF view cez ASGI: cProfile musí bežať vo vlákne view (process_view),
+    nie v event loope — inak report neobsahuje view ani serializér.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        cls.item = Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"))
+
+    def setUp(self):
+        session = SessionStore()
+        session["is_admin"] = True
+        session.save()
+        self.async_client.cookies[settings.SESSION_COOKIE_NAME] = session.session_key
+
+    async def test_sync_view_under_asgi(self):
+        r = await self.async_client.get(f"/api/items/{self.item.pk}/?_profile=inline")
+        self.assertEqual(r.status_code, 200)
+        report = r.json()
+        self.assertEqual(report["status"], 200)
+        self.assertGreater(report["serializer_ms"], 0)
+        self.assertTrue(any(f["function"].startswith("core/views.py") for f in report["functions"]),
+                        [f["function"] for f in report["functions"]])
+        self.assertGreaterEqual(report["sql"]["count"], 1)
+
+    async def test_async_view_under_asgi(self):
+        r = await self.async_client.get("/api/transactions/list?_profile=inline")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.json()["functions"])
+
+    async def test_one_profile_at_a_time(self):
+        self.assertTrue(profiling.acquire())
+        try:
+            r = await self.async_client.get(f"/api/items/{self.item.pk}/?_profile=inline")
+        finally:
+            profiling.release()
+        self.assertEqual(r.status_code, 409)
+        r = await self.async_client.get(f"/api/items/{self.item.pk}/")
+        self.assertEqual(r.status_code, 200)
+
+
+class HealthTests(TestCase):
+    """GET /api/health z async view hlási pool, cez ktorý idú sync view (a transakcia testu)."""
+
+    async def test_pool_stats_of_sync_views(self):
+        r = await self.async_client.get("/api/health")
+        self.assertEqual(r.status_code, 200)
+        pool = r.json()["db_pool"]
+        if not settings.DB_POOL:
+            self.assertIsNone(pool)
+            return
+        options = settings.DATABASES["default"]["OPTIONS"]["pool"]
+        self.assertEqual((pool["min"], pool["max"]), (options["min_size"], options["max_size"]))
+        self.assertGreaterEqual(pool["in_use"], 1)  # transakcia testu drží spojenie sync vlákna
+
+
+class EventHubTests(SimpleTestCase):
+    """core.events.EventHub: živé doručenie, backlog po Last-Event-ID v poradí doručenia, reset."""
+
+    def event(self, event_id, **data):
+        return {"id": event_id, "type": "transaction.created", "data": data}
+
+    async def test_live_delivery(self):
+        hub = events.EventHub()
+        queue, backlog, reset = hub.subscribe()
+        self.assertEqual((backlog, reset), ([], False))
+        first = self.event("a", n=1)
+        hub.dispatch(first)
+        # LISTEN vlákno doručuje mimo event loopu
+        second = self.event("b", n=2)
+        thread = threading.Thread(target=hub.dispatch, args=(second,))
+        thread.start()
+        thread.join()
+        self.assertEqual(await asyncio.wait_for(queue.get(), 1), first)
+        self.assertEqual(await asyncio.wait_for(queue.get(), 1), second)
+        hub.unsubscribe(queue)
+        hub.dispatch(self.event("c"))
+        self.assertTrue(queue.empty())
+
+    async def test_backlog_in_delivery_order(self):
+        # id vznikajú pred commitom — neskôr commitnutá udalosť môže mať "menšie" id
+        hub = events.EventHub()
+        delivered = [self.event(event_id) for event_id in ("30", "10", "20", "15")]
+        for event in delivered:
+            hub.dispatch(event)
+        _, backlog, reset = hub.subscribe("30")
+        self.assertFalse(reset)
+        self.assertEqual(backlog, delivered[1:])
+        _, backlog, reset = hub.subscribe("15")
+        self.assertEqual((backlog, reset), ([], False))
+
+    async def test_reset_after_overflow(self):
+        hub = events.EventHub(history_size=3)
+        delivered = [self.event(f"e{i}") for i in range(5)]
+        for event in delivered:
+            hub.dispatch(event)
+        self.assertEqual(hub.subscribe("e0")[1:], ([], True))  # vypadla z ring buffra
+        self.assertEqual(hub.subscribe("e2")[1:], (delivered[3:], False))
+        self.assertEqual(hub.subscribe("neznáme")[1:], ([], True))
+
+    async def test_slow_subscriber_is_disconnected(self):
+        hub = events.EventHub()
+        queue, _, _ = hub.subscribe()
+        for i in range(events.QUEUE_SIZE + 1):
+            hub.dispatch(self.event(f"e{i}"))
+        await asyncio.sleep(0)  # call_soon_threadsafe
+        self.assertIsNone(await asyncio.wait_for(queue.get(), 1))
+
+
+class EventStreamTests(TestCase):
+    """GET /api/events: backlog po Last-Event-ID, potom živé udalosti; publish až po commite."""
+
+    def test_publish_after_commit(self):
+        before = len(events.hub._history)
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                events.publish("session.reset", {"previous": 1, "active": 2})
+                transaction.set_rollback(True)
+            events.publish("session.reset", {"previous": 2, "active": 3})
+            self.assertEqual(len(events.hub._history), before)
+        last = list(events.hub._history)[-1]
+        self.assertEqual((last["type"], last["data"]), ("session.reset", {"previous": 2, "active": 3}))
+        self.assertFalse(any(e["data"] == {"previous": 1, "active": 2} for e in events.hub._history))
+
+    def test_requires_asgi(self):
+        self.assertEqual(self.client.get("/api/events").status_code, 501)
+
+    async def test_backlog_then_live(self):
+        seen = {"id": uuid.uuid4().hex, "type": "stock.changed", "data": {"items": []}}
+        missed = {"id": uuid.uuid4().hex, "type": "transaction.undone", "data": {"id": 7}}
+        events.hub.dispatch(seen)
+        events.hub.dispatch(missed)
+
+        r = await self.async_client.get("/api/events", headers={"Last-Event-ID": seen["id"]})
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "text/event-stream")
+        chunks = r.streaming_content.__aiter__()
+        try:
+            self.assertEqual(await anext(chunks), b"retry: 3000\n\n")
+            self.assertEqual(await anext(chunks), events.format_sse(missed).encode())
+            live = {"id": uuid.uuid4().hex, "type": "transaction.created", "data": {"id": 8}}
+            events.hub.dispatch(live)
+            self.assertEqual(await asyncio.wait_for(anext(chunks), 1), events.format_sse(live).encode())
+        finally:
+            await chunks.aclose()
+
+    async def test_unknown_last_event_id_resets(self):
+        r = await self.async_client.get("/api/events?last_event_id=stare")
+        chunks = r.streaming_content.__aiter__()
+        try:
+            await anext(chunks)
+            self.assertEqual(json.loads((await anext(chunks)).decode().removeprefix("data: ")), {"type": "reset"})
+        finally:
+            await chunks.aclose()
+
+
+class StatsViewTests(TestCase):
+    """
+    GET /api/stats z hodinových rollupov: súčty a séria (hour/day/week) ako živý agregát
+    nad Transaction, hranice from/to v UTC a 400 pri zlých parametroch.
+    """
+    TIMES = (  # UTC; 2024-05-06 je pondelok
+        "2024-05-05T23:30", "2024-05-06T00:10", "2024-05-06T00:50", "2024-05-06T13:00",
+        "2024-05-07T23:59", "2024-05-12T23:30", "2024-05-13T00:00",
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        coffee = Category.objects.create(name="Coffee")
+        pivo = Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"))
+        zrno = Item.objects.create(name="Zrno", category=coffee, pricing_mode="per_gram", price=Decimal("0.05"))
+        persons = [Person.objects.create(name="Jano"), Person.objects.create(name="Fero")]
+        session = Session.objects.create()
+        for i, at in enumerate(cls.TIMES):
+            item = pivo if i % 2 else zrno
+            t = Transaction.objects.create(session=session, person=persons[i % 2], item=item,
+                                           quantity=Decimal("1") if i % 2 else Decimal("18"),
+                                           price_at_time=Decimal("1.5") if i % 2 else Decimal("0.9"))
+            Transaction.objects.filter(pk=t.pk).update(created_at=datetime.fromisoformat(at + "+00:00"))
+        ledger.record(list(Transaction.objects.order_by("id")))
+
+    def stats(self, **params):
+        r = self.client.get("/api/stats", params)
+        self.assertEqual(r.status_code, 200, r.content)
+        return r.json()
+
+    def live(self, trunc=None, **created):
+        qs = Transaction.objects.filter(**created).order_by()
+        totals = dict(count=Count("id"), total_qty=Sum("quantity"), total_eur=Sum("price_at_time"))
+        if trunc is None:
+            return qs.aggregate(**totals)
+        return list(qs.annotate(bucket=trunc("created_at", tzinfo=dt_timezone.utc))
+                    .values("bucket").annotate(**totals).order_by("bucket"))
+
+    def test_buckets_match_live_aggregate(self):
+        for bucket, trunc in (("hour", TruncHour), ("day", TruncDay), ("week", TruncWeek)):
+            series = self.stats(bucket=bucket)["series"]
+            self.assertEqual(
+                [(parse_datetime(r["bucket"]), r["count"], Decimal(str(r["total_qty"])), Decimal(str(r["total_eur"])))
+                 for r in series],
+                [(r["bucket"], r["count"], r["total_qty"], r["total_eur"]) for r in self.live(trunc)],
+                bucket,
+            )
+        data = self.stats()
+        live = self.live()
+        self.assertEqual((Decimal(data["grand_total"]), data["grand_count"]), (live["total_eur"], live["count"]))
+
+    def test_week_and_day_edges_are_utc(self):
+        weeks = self.stats(bucket="week")["series"]
+        self.assertEqual([(r["bucket"][:10], r["count"]) for r in weeks],
+                         [("2024-04-29", 1), ("2024-05-06", 5), ("2024-05-13", 1)])
+        days = {r["bucket"][:10]: r["count"] for r in self.stats(bucket="day")["series"]}
+        self.assertEqual((days["2024-05-05"], days["2024-05-06"], days["2024-05-07"]), (1, 3, 1))
+
+    def test_range_matches_live_aggregate(self):
+        # `to` ako dátum zahŕňa celý deň
+        data = self.stats(**{"from": "2024-05-06", "to": "2024-05-07"})
+        live = self.live(created_at__gte="2024-05-06T00:00Z", created_at__lt="2024-05-08T00:00Z")
+        self.assertEqual((data["grand_count"], Decimal(data["grand_total"])), (live["count"], live["total_eur"]))
+        self.assertEqual(data["grand_count"], 4)
+
+    def test_offsets_are_converted_to_utc(self):
+        # 01:30+02:00 = 23:30 UTC predošlého dňa → začiatok hodiny 23:00 UTC
+        self.assertEqual(self.stats(**{"from": "2024-05-06T01:30:00+02:00",
+                                       "to": "2024-05-06T02:00:00+02:00"})["grand_count"], 1)
+        # polhodinový offset: 05:15+05:30 = 23:45 UTC → hodina 23:00 UTC, nie 23:30
+        self.assertEqual(self.stats(**{"from": "2024-05-06T05:15:00+05:30",
+                                       "to": "2024-05-06T05:30:00+05:30"})["grand_count"], 1)
+        # bez offsetu = UTC; `to` je exkluzívne
+        self.assertEqual(self.stats(**{"from": "2024-05-13T00:00:00"})["grand_count"], 1)
+        self.assertEqual(self.stats(**{"from": "2024-05-12T00:00:00", "to": "2024-05-13T00:00:00"})["grand_count"], 1)
+
+    def test_bad_parameters(self):
+        for params in (
+            {"from": "včera"}, {"to": "2024-13-01"}, {"from": "2024-05-06T25:00"},
+            {"from": "2024-05-08", "to": "2024-05-06"},  # obrátený rozsah
+            {"from": "2024-05-07", "to": "2024-05-06"},  # `to` dátum končí presne na začiatku `from`
+            {"from": "2024-05-06T10:00Z", "to": "2024-05-06T09:00Z"},
+            {"bucket": "month"}, {"session": "x", "bucket": "day"},
+        ):
+            r = self.client.get("/api/stats", params)
+            self.assertEqual(r.status_code, 400, params)
+            self.assertIn("error", r.json())
+
+
+class SessionSummaryTests(TestCase):
+    """
+    Snapshot sa zapíše pri uzavretí session, čítania ho len čítajú a admin úprava
+    transakcie uzavretej session ho postaví znova; kiosk na snapshoty nesiaha.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        cls.item = Item.objects.create(name="Pivo", category=beer, price=Decimal("1.5"))
+        cls.jano = Person.objects.create(name="Jano")
+        cls.fero = Person.objects.create(name="Fero")
+
+    def setUp(self):
+        active_session.clear_local_cache()
+        self.client = admin_client()
+
+    def tap(self, person, quantity="1"):
+        r = self.client.post("/api/transactions", {"person_id": person.pk, "item_id": self.item.pk,
+                                                   "quantity": quantity}, format="json")
+        self.assertEqual(r.status_code, 201, r.content)
+        return r.json()
+
+    def close(self):
+        r = self.client.post("/api/session/reset")
+        self.assertEqual(r.status_code, 200, r.content)
+        return r.json()["previous"]["id"]
+
+    def test_close_freezes_snapshot(self):
+        self.tap(self.jano, "2")
+        self.tap(self.fero)
+        session_id = self.close()
+        summary = SessionSummary.objects.get(session_id=session_id)
+        self.assertEqual(summary.total_eur, Decimal("4.5"))
+        self.assertEqual(summary.tx_count, 2)
+        self.assertEqual([p["name"] for p in summary.data["persons"]], ["Jano", "Fero"])
+
+    def test_summary_endpoint_serves_snapshot_without_writes(self):
+        self.tap(self.jano)
+        session_id = self.close()
+        # snapshot (nie ledger) je zdroj pravdy pre čítanie
+        SessionSummary.objects.filter(session_id=session_id).update(
+            data={**SessionSummary.objects.get(session_id=session_id).data, "grand_total": "99.000"},
+        )
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.get(f"/api/sessions/{session_id}/summary")
+        self.assertEqual(r.status_code, 200)
+        self.assertTrue(r.json()["frozen"])
+        self.assertEqual(r.json()["grand_total"], "99.000")
+        writes = [q["sql"] for q in queries if q["sql"].lstrip().upper().startswith(("INSERT", "UPDATE", "DELETE"))]
+        self.assertEqual(writes, [])
+
+    def test_closed_session_without_snapshot_is_computed_live(self):
+        self.tap(self.jano)
+        session_id = self.close()
+        SessionSummary.objects.filter(session_id=session_id).delete()
+        r = self.client.get(f"/api/sessions/{session_id}/summary")
+        self.assertEqual(r.json()["grand_total"], "1.500")
+        self.assertFalse(SessionSummary.objects.filter(session_id=session_id).exists())
+        call_command("freeze_summaries", stdout=StringIO())
+        self.assertEqual(SessionSummary.objects.get(session_id=session_id).total_eur, Decimal("1.5"))
+
+    def test_admin_edit_refreezes(self):
+        tx_id = self.tap(self.jano, "2")["id"]
+        other_id = self.tap(self.fero)["id"]
+        session_id = self.close()
+
+        r = self.client.patch(f"/api/transactions/{tx_id}", {"price_at_time": "10"}, format="json")
+        self.assertEqual(r.status_code, 200, r.content)
+        summary = SessionSummary.objects.get(session_id=session_id)
+        self.assertEqual(summary.total_eur, Decimal("11.5"))
+        self.assertEqual(summary.data["persons"][0], {"person_id": self.jano.pk, "name": "Jano",
+                                                      "total_eur": "10.000", "count": 1})
+
+        r = self.client.delete(f"/api/transactions/{other_id}")
+        self.assertEqual(r.status_code, 200, r.content)
+        summary = SessionSummary.objects.get(session_id=session_id)
+        self.assertEqual((summary.total_eur, summary.tx_count), (Decimal("10"), 1))
+        self.assertEqual(self.client.get(f"/api/sessions/{session_id}/summary").json()["grand_total"], "10.000")
+
+    def test_kiosk_undo_does_not_touch_snapshots(self):
+        self.tap(self.jano)
+        with CaptureQueriesContext(connection) as queries:
+            r = self.client.post("/api/transactions/undo", {"person_id": self.jano.pk}, format="json")
+        self.assertEqual(r.status_code, 200, r.content)
+        table = SessionSummary._meta.db_table
+        self.assertFalse([q["sql"] for q in queries if table in q["sql"]])
+
+
+class MediaServeTests(TestCase):
+    """/media/ cez core.media: ETag/304, Range (206/416), immutable náhľady, X-Accel-Redirect."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root, ignore_errors=True)
+        cls.thumb = avatars.variant_name("ab" + "c" * (avatars.DIGEST_LENGTH - 2), 96, "webp")
+        cls.data = bytes(range(256)) * 40
+        os.makedirs(os.path.join(cls.media_root, os.path.dirname(cls.thumb)))
+        with open(os.path.join(cls.media_root, cls.thumb), "wb") as f:
+            f.write(cls.data)
+        with open(os.path.join(cls.media_root, "avatars", "jano.png"), "wb") as f:
+            f.write(b"png")
+
+    def setUp(self):
+        overrides = override_settings(MEDIA_ROOT=self.media_root, MEDIA_ACCEL_REDIRECT="", SITE_PASSWORD="")
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.url = "/media/" + self.thumb
+
+    def body(self, response):
+        return b"".join(response.streaming_content)
+
+    def test_full_get(self):
+        r = self.client.get(self.url)
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(self.body(r), self.data)
+        self.assertEqual(r["Content-Type"], "image/webp")
+        self.assertEqual(r["Content-Length"], str(len(self.data)))
+        self.assertEqual(r["Accept-Ranges"], "bytes")
+        self.assertEqual(r["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(r["ETag"], f'"{os.path.basename(self.thumb)}"')
+
+        r = self.client.get("/media/avatars/jano.png")
+        self.assertEqual(r["Cache-Control"], "public, no-cache")
+        self.assertTrue(r["ETag"].startswith('"'))
+
+    def test_single_range(self):
+        r = self.client.get(self.url, HTTP_RANGE="bytes=10-19")
+        self.assertEqual(r.status_code, 206)
+        self.assertEqual(r["Content-Range"], f"bytes 10-19/{len(self.data)}")
+        self.assertEqual(r["Content-Length"], "10")
+        self.assertEqual(self.body(r), self.data[10:20])
+
+        r = self.client.get(self.url, HTTP_RANGE="bytes=-5")
+        self.assertEqual(r["Content-Range"], f"bytes {len(self.data) - 5}-{len(self.data) - 1}/{len(self.data)}")
+        self.assertEqual(self.body(r), self.data[-5:])
+
+        # viac rozsahov / neplatný If-Range → celý súbor
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=0-1,5-6").status_code, 200)
+        self.assertEqual(self.client.get(self.url, HTTP_RANGE="bytes=0-1", HTTP_IF_RANGE='"old"').status_code, 200)
+
+    def test_unsatisfiable_range(self):
+        r = self.client.get(self.url, HTTP_RANGE=f"bytes={len(self.data)}-")
+        self.assertEqual(r.status_code, 416)
+        self.assertEqual(r["Content-Range"], f"bytes */{len(self.data)}")
+
+    def test_conditional_304(self):
+        etag = self.client.get(self.url)["ETag"]
+        r = self.client.get(self.url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(r.status_code, 304)
+        self.assertEqual(r["ETag"], etag)
+        self.assertIn("immutable", r["Cache-Control"])
+
+    def test_missing_and_outside_media_root(self):
+        for path in ("/media/avatars/nope.png", "/media/../manage.py", "/media/avatars"):
+            self.assertEqual(self.client.get(path).status_code, 404, path)
+
+    def test_accel_redirect(self):
+        with self.settings(MEDIA_ACCEL_REDIRECT="/protected-media/"):
+            r = self.client.get(self.url, HTTP_RANGE="bytes=0-9")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["X-Accel-Redirect"], "/protected-media/" + self.thumb)
+        self.assertEqual(r["Cache-Control"], "public, max-age=31536000, immutable")
+        self.assertEqual(r.content, b"")
+
+
+@override_settings(AVATAR_THUMB_SIZES=(96, 160, 320))
+class AvatarUploadTests(TestCase):
+    """Upload avatara cez /api/persons/: náhľady po commite pod menom adresovaným obsahom."""
+
+    def setUp(self):
+        self.media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_root, ignore_errors=True)
+        overrides = override_settings(MEDIA_ROOT=self.media_root)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.client = admin_client()
+
+    def png(self, color=(200, 30, 30)):
+        buf = BytesIO()
+        Image.new("RGB", (400, 300), color).save(buf, "PNG")
+        return SimpleUploadedFile("jano.png", buf.getvalue(), content_type="image/png")
+
+    def upload(self, name, upload):
+        with self.captureOnCommitCallbacks(execute=True):
+            r = self.client.post("/api/persons/", {"name": name, "avatar": upload}, format="multipart")
+        self.assertEqual(r.status_code, 201, r.content)
+        # v TestCase bežia on_commit až po odpovedi — hotový srcset ukáže nasledujúci GET
+        return self.client.get(f"/api/persons/{r.json()['id']}/").json()
+
+    def thumbs(self):
+        root = os.path.join(self.media_root, avatars.THUMB_DIR)
+        return sorted(os.path.relpath(os.path.join(d, f), self.media_root)
+                      for d, _, files in os.walk(root) for f in files)
+
+    def test_srcset_after_upload(self):
+        upload = self.png()
+        digest = avatars.content_digest(upload.read())
+        upload.seek(0)
+        data = self.upload("Jano", upload)
+
+        self.assertEqual(Person.objects.get(pk=data["id"]).avatar_hash, digest)
+        expected = {
+            fmt: ", ".join(f"/media/{avatars.variant_name(digest, size, ext)} {size}w" for size in (96, 160, 320))
+            for fmt, ext in (("webp", "webp"), ("jpeg", "jpg"))
+        }
+        self.assertEqual(data["avatar_srcset"], expected)
+        listed = {p["id"]: p for p in self.client.get("/api/persons/").json()}
+        self.assertEqual(listed[data["id"]]["avatar_srcset"], expected)
+        self.assertEqual(self.thumbs(), sorted(avatars.variant_names(digest)))
+        with Image.open(os.path.join(self.media_root, avatars.variant_name(digest, 160, "jpg"))) as img:
+            self.assertEqual((img.format, img.size), ("JPEG", (160, 160)))
+
+    def test_same_image_shares_thumbnails(self):
+        first = self.upload("Jano", self.png())
+        second = self.upload("Fero", self.png())
+        self.assertEqual(first["avatar_srcset"], second["avatar_srcset"])
+        digest = Person.objects.get(pk=first["id"]).avatar_hash
+        self.assertEqual(self.thumbs(), sorted(avatars.variant_names(digest)))
+
+    def test_write_variant_overwrites_exact_name(self):
+        # súbežný upload: druhý zápisca nájde súbor, ktorý pri jeho kontrole ešte neexistoval
+        storage = avatars._storage()
+        name = avatars.variant_name("ab" + "c" * (avatars.DIGEST_LENGTH - 2), 96, "webp")
+        avatars.write_variant(storage, name, b"first")
+        avatars.write_variant(storage, name, b"second")
+        self.assertEqual(self.thumbs(), [name])
+        with storage.open(name, "rb") as f:
+            self.assertEqual(f.read(), b"second")
+
+    def test_rollback_leaves_no_thumbnails(self):
+        person = Person.objects.create(name="Jano")
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                person.avatar.save("jano.png", self.png())
+                avatars.attach(person, {"avatar": person.avatar})
+                transaction.set_rollback(True)
+        self.assertEqual(self.thumbs(), [])
+        self.assertEqual(Person.objects.get(pk=person.pk).avatar_hash, "")
+
+
+@override_settings(COMPRESSION_MIN_BYTES=1024, COMPRESSION_BROTLI=True)
+class CompressionTests(SimpleTestCase):
+    """core.compression: výber kódovania, prahy a výnimky, hlavičky a rozbaliteľné telo."""
+    BODY = b'{"items": [' + b", ".join(b'{"id": %d, "name": "Pivo"}' % i for i in range(200)) + b"]}"
+
+    def compress(self, response, accept="br, gzip"):
+        request = RequestFactory().get("/api/items/", HTTP_ACCEPT_ENCODING=accept)
+        return compression.compress_response(request, response)
+
+    def json_response(self, body=BODY, **headers):
+        response = HttpResponse(body, content_type="application/json")
+        for key, value in headers.items():
+            response[key] = value
+        return response
+
+    def test_negotiate(self):
+        for header, expected in (
+            ("gzip, deflate, br", "br"),
+            ("gzip", "gzip"),
+            ("br;q=0.5, gzip", "gzip"),
+            ("br;q=0.8, gzip;q=0.8", "br"),
+            ("br;q=0, *", "gzip"),
+            ("*;q=0.1", "br"),
+            ("gzip;q=1.0, identity;q=0", "gzip"),
+            ("identity;q=0", None),
+            ("deflate", None),
+            ("", None),
+        ):
+            self.assertEqual(compression.negotiate(header), expected, header)
+        with self.settings(COMPRESSION_BROTLI=False):
+            self.assertEqual(compression.negotiate("br, gzip"), "gzip")
+
+    def test_brotli(self):
+        r = self.compress(self.json_response(ETag='"v1"'))
+        self.assertEqual(r["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(r.content), self.BODY)
+        self.assertEqual(r["Content-Length"], str(len(r.content)))
+        self.assertIn("Accept-Encoding", r["Vary"])
+        self.assertEqual(r["ETag"], 'W/"v1"')
+
+    def test_gzip(self):
+        r = self.compress(self.json_response(ETag='W/"v1"'), accept="gzip")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertEqual(gzip.decompress(r.content), self.BODY)
+        self.assertEqual(r["ETag"], 'W/"v1"')  # slabý ostáva
+
+    def test_not_accepted_still_varies(self):
+        r = self.compress(self.json_response(), accept="identity")
+        self.assertFalse(r.has_header("Content-Encoding"))
+        self.assertEqual(r.content, self.BODY)
+        self.assertIn("Accept-Encoding", r["Vary"])
+
+    def test_below_threshold(self):
+        body = b'{"ok": true}'
+        r = self.compress(self.json_response(body))
+        self.assertFalse(r.has_header("Content-Encoding"))
+        self.assertEqual(r.content, body)
+        with self.settings(COMPRESSION_MIN_BYTES=1):
+            r = self.compress(self.json_response(b'{"ok": true, "ok2": true, "ok3": true, "ok4": true}'))
+        self.assertEqual(r["Content-Encoding"], "br")
+
+    def test_skipped_responses(self):
+        partial = self.json_response(ETag='"v1"')
+        partial.status_code = 206
+        partial["Content-Range"] = f"bytes 0-{len(self.BODY) - 1}/{len(self.BODY) * 2}"
+        encoded = self.json_response(gzip.compress(self.BODY), **{"Content-Encoding": "gzip"})
+        events = StreamingHttpResponse(iter([b"data: x\n\n"] * 200), content_type="text/event-stream")
+        image = HttpResponse(self.BODY, content_type="image/png")
+        no_transform = self.json_response(**{"Cache-Control": "no-transform"})
+        for response, encoding in ((partial, None), (encoded, "gzip"), (events, None), (image, None),
+                                   (no_transform, None)):
+            r = self.compress(response)
+            self.assertEqual(r.get("Content-Encoding"), encoding)
+            self.assertNotIn("Accept-Encoding", r.get("Vary", ""))
+        self.assertEqual(partial["ETag"], '"v1"')
+        self.assertEqual(partial.content, self.BODY)
+
+    def test_streaming(self):
+        chunks = [self.BODY[i:i + 100] for i in range(0, len(self.BODY), 100)]
+        r = self.compress(StreamingHttpResponse(iter(chunks), content_type="application/json"), accept="gzip")
+        self.assertEqual(r["Content-Encoding"], "gzip")
+        self.assertFalse(r.has_header("Content-Length"))
+        self.assertIn("Accept-Encoding", r["Vary"])
+        self.assertEqual(gzip.decompress(b"".join(r.streaming_content)), self.BODY)
+
+
+@override_settings(COMPRESSION_MIN_BYTES=1024, COMPRESSION_BROTLI=True)
+class CompressionMiddlewareTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        beer = Category.objects.create(name="Beer")
+        Item.objects.bulk_create(Item(name=f"Pivo {i}", category=beer, price=Decimal("1.5")) for i in range(30))
+
+    def test_json_list(self):
+        plain = self.client.get("/api/items/")
+        self.assertFalse(plain.has_header("Content-Encoding"))
+        self.assertIn("Accept-Encoding", plain["Vary"])
+        r = self.client.get("/api/items/", HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(r["Content-Encoding"], "br")
+        self.assertEqual(brotli.decompress(r.content), plain.content)
+        self.assertEqual(r["ETag"], plain["ETag"])  # katalóg má už slabý ETag
+        self.assertEqual(self.client.get("/api/items/", HTTP_ACCEPT_ENCODING="br",
+                                         HTTP_IF_NONE_MATCH=r["ETag"]).status_code, 304)
+
+
+@override_settings(METRICS_TOKEN="scrape-token")
+class MetricsTests(TestCase):
+    """GET /api/metrics: Prometheus text, labely, prístup a súčty cez procesy (aj mŕtve)."""
+
+    def setUp(self):
+        self.metrics_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.metrics_dir, ignore_errors=True)
+        overrides = override_settings(METRICS_DIR=self.metrics_dir)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def scrape(self):
+        r = self.client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(r.status_code, 200)
+        self.assertEqual(r["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        samples = {}
+        for line in r.content.decode().splitlines():
+            if not line.startswith("#"):
+                name, value = line.rsplit(" ", 1)
+                samples[name] = float(value)
+        return r.content.decode(), samples
+
+    def snapshot(self, view, status, seconds):
+        registry = metrics.Registry()
+        stats = metrics.RequestStats()
+        stats.sql_count, stats.sql_seconds = 2, 0.001
+        registry.observe(view, "GET", status, seconds, stats, 300)
+        registry.observe_compression(view, "br", 1000, 250, 0.002)
+        return registry._snapshot()
+
+    def dead_pid(self):
+        process = subprocess.Popen(["true"])
+        process.wait()
+        return process.pid
+
+    def test_permission(self):
+        self.assertEqual(self.client.get("/api/metrics").status_code, 403)
+        self.assertEqual(self.client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer wrong").status_code, 403)
+        with self.settings(METRICS_TOKEN=""):
+            self.assertEqual(self.client.get("/api/metrics", HTTP_AUTHORIZATION="Bearer ").status_code, 403)
+        self.assertEqual(admin_client().get("/api/metrics").status_code, 200)
+        self.scrape()
+
+    def test_prometheus_text(self):
+        _, before = self.scrape()
+        self.assertEqual(self.client.get("/api/items/").status_code, 200)
+        text, after = self.scrape()
+
+        labels = '{view="item-list",method="GET"}'
+        name = "drinkcounter_http_request_duration_seconds"
+        self.assertIn(f"# TYPE {name} histogram", text)
+        self.assertIn("# TYPE drinkcounter_http_responses_total counter", text)
+        self.assertEqual(after[f"{name}_count{labels}"] - before.get(f"{name}_count{labels}", 0), 1)
+        self.assertEqual(after[f'{name}_bucket{{view="item-list",method="GET",le="+Inf"}}'],
+                         after[f"{name}_count{labels}"])
+        status = 'drinkcounter_http_responses_total{view="item-list",method="GET",status="200"}'
+        self.assertEqual(after[status] - before.get(status, 0), 1)
+        self.assertGreaterEqual(after[f"drinkcounter_sql_queries_total{labels}"], 1)
+        # bucket-y sú kumulatívne
+        buckets = [v for k, v in after.items() if k.startswith(f'{name}_bucket{{view="item-list",method="GET",')]
+        self.assertEqual(buckets, sorted(buckets))
+
+    def test_label_escaping(self):
+        self.assertEqual(metrics._labels(view='a"b\\c\nd', method="GET"), '{view="a\\"b\\\\c\\nd",method="GET"}')
+
+    def test_merge_two_snapshots(self):
+        series, statuses, compression, skips = metrics._merge([
+            self.snapshot("item-list", 200, 0.003), self.snapshot("item-list", 500, 0.2),
+        ])
+        s = series["item-list", "GET"]
+        self.assertEqual((s["count"], s["sql_count"], s["size_count"], s["size_bytes"]), (2, 4, 2, 600))
+        self.assertAlmostEqual(s["seconds"], 0.203)
+        self.assertEqual(s["latency"][metrics._bucket_index(metrics.LATENCY_BUCKETS, 0.003)], 1)
+        self.assertEqual(s["latency"][metrics._bucket_index(metrics.LATENCY_BUCKETS, 0.2)], 1)
+        self.assertEqual(sum(s["latency"]), 2)
+        self.assertEqual(statuses, {("item-list", "GET", "200"): 1, ("item-list", "GET", "500"): 1})
+        self.assertEqual(compression["item-list", "br"][:3], [2, 2000, 500])
+        self.assertEqual(skips, {})
+
+    def test_dead_workers_are_retired(self):
+        for pid, status in ((self.dead_pid(), 200), (self.dead_pid(), 404)):
+            with open(os.path.join(self.metrics_dir, f"{pid}.json"), "w") as f:
+                json.dump(self.snapshot("stats", status, 0.01), f)
+        key = 'drinkcounter_http_request_duration_seconds_count{view="stats",method="GET"}'
+
+        _, samples = self.scrape()
+        self.assertEqual(samples[key], 2)
+        self.assertEqual(sorted(os.listdir(self.metrics_dir)),
+                         sorted([".retire.lock", metrics.RETIRED, f"{os.getpid()}.json"]))
+
+        # ďalší mŕtvy worker sa pripočíta k retired.json, nič sa nezráta dvakrát
+        with open(os.path.join(self.metrics_dir, f"{self.dead_pid()}.json"), "w") as f:
+            json.dump(self.snapshot("stats", 200, 0.01), f)
+        _, samples = self.scrape()
+        self.assertEqual(samples[key], 3)
+        self.assertEqual(samples['drinkcounter_http_responses_total{view="stats",method="GET",status="200"}'], 2)
+        _, samples = self.scrape()
+        self.assertEqual(samples[key], 3)
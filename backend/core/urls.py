@@ -4,12 +4,12 @@ from .views import HealthView
 from .views import CsrfView
 from .views import (
     PersonViewSet, CategoryViewSet, ItemViewSet,
-    SessionActiveView, SessionResetView,
-    TransactionView, TransactionListView, TransactionDetailView, TransactionUndoView,
+    SessionActiveView, SessionResetView, SessionSummaryView,
+    TransactionView, TransactionBatchView, TransactionListView, TransactionDetailView, TransactionUndoView,
     AdminLoginView, AdminLogoutView, AdminCheckView, ResetPersonDebtView,
-    CoffeePresetViewSet, GeneratePayBySquareView,
-    ItemSettleView, ItemSetStockView, StatsView,
-    BrewBatchView,
+    CoffeePresetViewSet, GeneratePayBySquareView, PayBySquareQRView,
+    ItemSettleView, ItemStockMovementsView, ItemSetStockView, StatsView,
+    BrewBatchView, EventStreamView, MetricsView, ProfileListView, ProfileDetailView,
 )
 
 
@@ -24,7 +24,9 @@ urlpatterns = [
     path("", include(router.urls)),
     path("session/active", SessionActiveView.as_view()),
     path("session/reset", SessionResetView.as_view()),
+    path("sessions/<int:pk>/summary", SessionSummaryView.as_view()),
     path("transactions", TransactionView.as_view()),
+    path("transactions/batch", TransactionBatchView.as_view()),
     path("transactions/list", TransactionListView.as_view()),
     path("transactions/<int:pk>", TransactionDetailView.as_view()),
     path("transactions/undo", TransactionUndoView.as_view()),
@@ -32,11 +34,17 @@ urlpatterns = [
     path("auth/admin-logout", AdminLogoutView.as_view()),
     path("auth/admin-check", AdminCheckView.as_view()),
     path("health", HealthView.as_view()),
+    path("events", EventStreamView.as_view()),
+    path("metrics", MetricsView.as_view(), name="metrics"),
+    path("profiles", ProfileListView.as_view(), name="profiles"),
+    path("profiles/<str:report_id>", ProfileDetailView.as_view(), name="profile-detail"),
     path("auth/csrf", CsrfView.as_view()),
     path("persons/<int:pk>/reset-debt", ResetPersonDebtView.as_view()),
     path("persons/<int:pk>/pay-by-square/", GeneratePayBySquareView.as_view(), name="pay-by-square"),
+    path("persons/<int:pk>/pay-by-square/qr.<str:fmt>", PayBySquareQRView.as_view(), name="pay-by-square-qr"),
     path("items/<int:pk>/set-stock", ItemSetStockView.as_view(), name="item-set-stock"),
     path("items/<int:pk>/settle", ItemSettleView.as_view(), name="item-settle"),
+    path("items/<int:pk>/stock-movements", ItemStockMovementsView.as_view(), name="item-stock-movements"),
     path("stats", StatsView.as_view()),
     path("brew-batches", BrewBatchView.as_view(), name="brew-batches"),
 ]
@@ -0,0 +1,40 @@
+"""
+Verzie (stamp-y) tabuliek zdieľané medzi worker procesmi.
+
+Procesné cache si pamätajú stamp, s ktorým boli postavené; keď ho niekto
+zmení (bump_version po commite zápisu), pri ďalšom čítaní sa prebudujú.
+Stamp-y žijú v cache aliase "versions" (settings.CACHES), ktorý musí byť
+zdieľaný všetkými procesmi — predvolene súborová cache.
+"""
+import uuid
+
+from django.core.cache import caches
+from django.db import transaction
+
+VERSIONS_CACHE = "versions"
+
+
+def _key(name):
+    return f"version:{name}"
+
+
+def get_version(name):
+    cache = caches[VERSIONS_CACHE]
+    version = cache.get(_key(name))
+    if version is None:
+        # stamp chýba (prvý štart, zmazaná cache) → nový, nech sa všetci prebudujú.
+        # FileBasedCache.add() je has_key + set, nie atomické: pri súbehu môžu stamp zapísať
+        # dva procesy a ten, ktorého stamp sa prepísal, si cache raz zbytočne prebuduje
+        cache.add(_key(name), uuid.uuid4().hex, None)
+        version = cache.get(_key(name))
+    return version
+
+
+def bump_version(name):
+    """
+    Zneplatní procesné cache pre `name`. V atomic bloku sa stamp zmení až po commite,
+    inak by si iný proces mohol postaviť cache z ešte necommitnutých dát pod novým stamp-om.
+    """
+    transaction.on_commit(
+        lambda: caches[VERSIONS_CACHE].set(_key(name), uuid.uuid4().hex, None)
+    )
@@ -1,32 +1,51 @@
+import asyncio
 import base64
+import binascii
+import hashlib
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
 from decimal import Decimal, ROUND_HALF_UP
-from io import BytesIO
 
-import qrcode
+from asgiref.sync import sync_to_async
 from django.conf import settings
-from django.db import transaction
-from django.db.models import Count, F, Sum
-from django.db.models.functions import Greatest
-from django.http import HttpResponse, JsonResponse
+from django.core.cache import cache
+from django.db import connections, transaction
+from django.db.models import Case, F, Sum, Value, When
+from django.db.models.functions import Greatest, TruncDay, TruncHour, TruncWeek
+from django.core.handlers.asgi import ASGIRequest
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
 from django.middleware.csrf import get_token
+from django.urls import reverse
+from django.utils.cache import get_conditional_response, patch_cache_control, patch_vary_headers
 from django.utils import timezone
 from django.utils import html as html_utils
+from django.utils.dateparse import parse_date, parse_datetime
 from django.utils.decorators import method_decorator
-from django.views.decorators.csrf import ensure_csrf_cookie
-from qrcode.constants import ERROR_CORRECT_M
-from qrcode.image.pil import PilImage
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt, ensure_csrf_cookie
 from rest_framework import status, viewsets
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from rest_framework.throttling import AnonRateThrottle
 from rest_framework.views import APIView
 
-from .models import Category, Item, Session, CoffeePreset, Person, Transaction, BrewBatch, BrewBatchIngredient, CATEGORY_COFFEE, CATEGORY_BEER
-from .permissions import ReadOnlyOrAdmin, IsAdminSession
+from . import (
+    active_session, avatars, compact, events, fast_serializers, ledger, metrics, profiling, qr, stock, summaries,
+    taps, versioning,
+)
+from .active_session import get_active_session
+from .models import (
+    Category, Item, Session, CoffeePreset, Person, Transaction, BrewBatch, BrewBatchIngredient,
+    SessionPersonBalance, StatsRollup, StockMovement, CATEGORY_COFFEE, CATEGORY_BEER,
+)
+from .permissions import ReadOnlyOrAdmin, IsAdminSession, IsAdminOrMetricsToken
+from .pricing import PRESETS_VERSION, category_name, line_total
 from .serializers import (
     PersonSerializer, CategorySerializer, ItemSerializer,
     SessionSerializer, TransactionCreateSerializer, TransactionSerializer,
     TransactionPatchSerializer, AdminLoginSerializer, CoffeePresetSerializer,
-    BrewBatchCreateSerializer, BrewBatchSerializer,
+    BrewBatchCreateSerializer, BrewBatchSerializer, TransactionBatchSerializer, StockMovementSerializer,
 )
 
 
@@ -39,20 +58,43 @@ class TransactionThrottle(AnonRateThrottle):
 
 
 # ===== Helper =====
-def get_active_session(create=True):
-    s = Session.objects.filter(ended_at__isnull=True).order_by("-id").first()
-    if not s and create:
-        s = Session.objects.create()
-    return s
+def _person_debt(person, session):
+    """Dlh osoby v session z materializovaných zostatkov (core.ledger)."""
+    balance = SessionPersonBalance.objects.filter(session=session, person=person).first()
+    return balance.total_eur if balance else Decimal("0")
+
 
+def _payment_for(person, debt):
+    """(IBAN, suma, VS, správa) — kľúč pre QR cache aj ETag."""
+    return settings.PAYMENT_IBAN, debt, f"{person.id:06d}", f"Debt payment for {person.name}"
 
 
+class AsyncReadView(View):
+    """
+    Read-only GET s async handlerom (Django async ORM): pod ASGI pomalý klient na tuneli
+    nedrží worker vlákno. DRF APIView async handlery nepodporuje — odpoveď sa preto
+    renderuje tým istým JSONRenderer-om ako Response, takže telo je bajt po bajte rovnaké.
+    """
+    http_method_names = ["get", "head", "options"]
+    renderer = JSONRenderer()
 
+    @classmethod
+    def as_view(cls, **initkwargs):
+        return csrf_exempt(super().as_view(**initkwargs))  # ako APIView
 
+    def respond(self, data, status=200):
+        response = HttpResponse(self.renderer.render(data), status=status, content_type="application/json")
+        patch_vary_headers(response, ("Accept",))
+        return response
 
-def generate_epc_spd_payload(account: str, amount: float, currency: str, variable_symbol: str, message: str) -> str:
-    safe_msg = " ".join(str(message).split())
-    return f"SPD*1.0*ACC:{account}*AM:{amount:.2f}*CC:{currency}*X-VS:{variable_symbol}*MSG:{safe_msg}"
+
+def _not_modified(request, etag, **cache_control):
+    """304 s ETag/Cache-Control, ak klient už má aktuálnu verziu; inak None."""
+    response = get_conditional_response(request, etag=etag)
+    if response is not None:
+        response["ETag"] = etag
+        patch_cache_control(response, **cache_control)
+    return response
 
 
 class GeneratePayBySquareView(APIView):
@@ -63,41 +105,19 @@ class GeneratePayBySquareView(APIView):
             return JsonResponse({"error": "Person not found"}, status=404)
 
         session = get_active_session()
-        debt = Transaction.objects.filter(session=session, person=person)\
-                                  .aggregate(total=Sum("price_at_time"))["total"] or 0
+        debt = _person_debt(person, session)
 
         if debt <= 0:
             return JsonResponse({"error": "No debt to pay"}, status=400)
 
-        iban = settings.PAYMENT_IBAN
-        vs = f"{person.id:06d}"
-        message = f"Debt payment for {person.name}"
-        safe_name = html_utils.escape(person.name)
+        iban, amount, vs, message = _payment_for(person, debt)
         safe_iban = html_utils.escape(iban)
         safe_vs = html_utils.escape(vs)
         safe_message = html_utils.escape(message)
 
-        payload = generate_epc_spd_payload(
-            account=iban,
-            amount=float(debt),
-            currency="EUR",
-            variable_symbol=vs,
-            message=message
-        )
-
-        qr = qrcode.QRCode(
-            version=None,
-            error_correction=ERROR_CORRECT_M,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(payload)
-        qr.make(fit=True)
-        img = qr.make_image(image_factory=PilImage)
-
-        buf = BytesIO()
-        img.save(buf, format="PNG")
-        img_base64 = base64.b64encode(buf.getvalue()).decode("utf-8")
+        # QR ide samostatným (cachovateľným) requestom; v= je jeho ETag, takže URL je nemenná
+        qr_version = qr.qr_etag(iban, amount, vs, message, "png").strip('"')
+        qr_url = reverse("pay-by-square-qr", kwargs={"pk": person.pk, "fmt": "png"}) + f"?v={qr_version}"
 
         # vrátime HTML s QR a údajmi
         html = f"""
@@ -105,7 +125,7 @@ class GeneratePayBySquareView(APIView):
           <head><title>Pay by Square</title></head>
           <body style="font-family: sans-serif; text-align: center;">
             <h2>Platba dlhu</h2>
-            <img src="data:image/png;base64,{img_base64}" alt="QR kód" /><br/><br/>
+            <img src="{qr_url}" alt="QR kód" /><br/><br/>
             <table style="margin: 0 auto; text-align: left;">
               <tr><td><b>IBAN:</b></td><td>{safe_iban}</td></tr>
               <tr><td><b>Suma:</b></td><td>{debt:.2f} EUR</td></tr>
@@ -115,25 +135,168 @@ class GeneratePayBySquareView(APIView):
           </body>
         </html>
         """
-        return HttpResponse(html)
+        etag = '"%s"' % hashlib.sha256(html.encode()).hexdigest()[:32]
+        not_modified = _not_modified(request, etag, no_cache=True)
+        if not_modified is not None:
+            return not_modified
+        response = HttpResponse(html)
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+
+class PayBySquareQRView(APIView):
+    """GET: samotný QR obrázok (png/svg) s ETag; s aktuálnym ?v= je nemenný."""
+
+    def get(self, request, pk, fmt):
+        if fmt not in qr.QR_FORMATS:
+            return JsonResponse({"error": "Unsupported format"}, status=404)
+        try:
+            person = Person.objects.get(pk=pk)
+        except Person.DoesNotExist:
+            return JsonResponse({"error": "Person not found"}, status=404)
+
+        debt = _person_debt(person, get_active_session())
+        if debt <= 0:
+            return JsonResponse({"error": "No debt to pay"}, status=400)
+
+        payment = _payment_for(person, debt)
+        etag = qr.qr_etag(*payment, fmt)
+        if request.query_params.get("v") == etag.strip('"'):
+            cache_control = {"public": True, "max_age": 60 * 60 * 24 * 365, "immutable": True}
+        else:
+            # bez (aktuálnej) verzie v URL sa obsah mení s dlhom — len revalidácia cez ETag
+            cache_control = {"no_cache": True}
+
+        not_modified = _not_modified(request, etag, **cache_control)
+        if not_modified is not None:
+            return not_modified
+        response = HttpResponse(qr.render_qr(*payment, fmt), content_type=qr.QR_FORMATS[fmt])
+        response["ETag"] = etag
+        patch_cache_control(response, **cache_control)
+        return response
 
 # ===== Person / Category / Item =====
-class PersonViewSet(viewsets.ModelViewSet):
+class CatalogETagMixin:
+    """
+    Podmienený GET pre read-mostly viewsety: slabý ETag sa skladá zo stamp-ov tabuliek
+    (core.versioning) a URL, takže nezmenený zoznam odpovie 304 bez ORM aj serializácie.
+    Zápisy cez viewset zvýšia stamp-y v `bumps`; ostatné view ich zvyšujú cez _bump().
+    """
+    etag_versions = ()  # tabuľky, z ktorých je odpoveď poskladaná
+    bumps = ()  # tabuľky, ktoré zápis cez viewset mení
+
+    def list(self, request, *args, **kwargs):
+        return self._conditional(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self._conditional(super().retrieve, request, *args, **kwargs)
+
+    def _conditional(self, handler, request, *args, **kwargs):
+        versions = ":".join(versioning.get_version(name) for name in self.etag_versions)
+        raw = f"{versions}|{request.get_full_path()}|{request.headers.get('Accept', '')}"
+        etag = 'W/"%s"' % hashlib.sha1(raw.encode()).hexdigest()[:24]
+        not_modified = _not_modified(request, etag, no_cache=True)
+        if not_modified is not None:
+            return not_modified
+        response = handler(request, *args, **kwargs)
+        response["ETag"] = etag
+        patch_cache_control(response, no_cache=True)
+        return response
+
+    def perform_create(self, serializer):
+        super().perform_create(serializer)
+        _bump(*self.bumps)
+
+    def perform_update(self, serializer):
+        super().perform_update(serializer)
+        _bump(*self.bumps)
+
+    def perform_destroy(self, instance):
+        super().perform_destroy(instance)
+        _bump(*self.bumps)
+
+
+class FastListMixin:
+    """
+    list() cez core.fast_serializers (values_list, bez DRF serializácie po poliach) —
+    rovnaký JSON ako serializer_class, ktorý ostáva pre detail a zápisy.
+    """
+    fast_shape = None
+
+    def list(self, request, *args, **kwargs):
+        return Response(self.fast_shape.many(self.filter_queryset(self.get_queryset())))
+
+
+class PersonViewSet(CatalogETagMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Person.objects.all().order_by("id")
     serializer_class = PersonSerializer
+    fast_shape = fast_serializers.PERSON
     permission_classes = [ReadOnlyOrAdmin]
+    etag_versions = bumps = ("persons",)
+
+    # nový avatar → náhľady po commite (avatars.attach); odpoveď už nesie hotový avatar_srcset
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            avatars.attach(serializer.instance, serializer.validated_data)
+
+    def perform_update(self, serializer):
+        with transaction.atomic():
+            super().perform_update(serializer)
+            avatars.attach(serializer.instance, serializer.validated_data)
 
 
-class CategoryViewSet(viewsets.ModelViewSet):
+class CategoryViewSet(CatalogETagMixin, viewsets.ModelViewSet):
     queryset = Category.objects.all().order_by("id")
     serializer_class = CategorySerializer
     permission_classes = [ReadOnlyOrAdmin]  # menenie kategórií len admin
+    etag_versions = bumps = ("categories",)
 
+    def perform_destroy(self, instance):
+        # kaskáda: kategória → položky → transakcie
+        txs = Transaction.objects.filter(item__category=instance)
+        with transaction.atomic(), summaries.refreezing(txs):
+            ledger.unrecord_queryset(txs)
+            super().perform_destroy(instance)
+            _bump("items")
 
-class ItemViewSet(viewsets.ModelViewSet):
+
+class ItemViewSet(CatalogETagMixin, FastListMixin, viewsets.ModelViewSet):
     queryset = Item.objects.all().order_by("id")
     serializer_class = ItemSerializer
+    fast_shape = fast_serializers.ITEM
     permission_classes = [ReadOnlyOrAdmin]  # ceny/položky mení len admin
+    etag_versions = ("items", "categories")  # položka obsahuje vnorenú kategóriu
+    bumps = ("items",)
+
+    def perform_create(self, serializer):
+        with transaction.atomic():
+            super().perform_create(serializer)
+            stock.record_initial(serializer.instance)
+
+    def perform_update(self, serializer):
+        # zásoba nejde cez save() — ten by súbežné predaje prepísal starou hodnotou; je to pohyb (core.stock)
+        data = dict(serializer.validated_data)
+        item = serializer.instance
+        with transaction.atomic():
+            set_stock = "stock_quantity" in data
+            level = data.pop("stock_quantity", None)
+            for attr, value in data.items():
+                setattr(item, attr, value)
+            if data:
+                item.save(update_fields=list(data))
+            if set_stock and level != item.stock_quantity:
+                stock.set_level(item, level, stock.REASON_EDIT)
+        _bump(*self.bumps)
+        _publish_stock([item])
+
+    def perform_destroy(self, instance):
+        # zmazanie položky kaskádovo zmaže aj jej transakcie
+        txs = Transaction.objects.filter(item=instance)
+        with transaction.atomic(), summaries.refreezing(txs):
+            ledger.unrecord_queryset(txs)
+            super().perform_destroy(instance)
 
     def get_queryset(self):
         qs = super().get_queryset()
@@ -147,36 +310,30 @@ class ItemViewSet(viewsets.ModelViewSet):
 
 
 # ===== Coffee Presets =====
-class CoffeePresetViewSet(viewsets.ModelViewSet):
+class CoffeePresetViewSet(CatalogETagMixin, viewsets.ModelViewSet):
     queryset = CoffeePreset.objects.all().order_by( "g_min", "id")
     serializer_class = CoffeePresetSerializer
     permission_classes = [ReadOnlyOrAdmin]
+    # ten istý stamp zneplatňuje aj intervalový index presetov vo všetkých procesoch (core.pricing)
+    etag_versions = bumps = (PRESETS_VERSION,)
 
 
 # ===== Sessions =====
-class SessionActiveView(APIView):
-    def get(self, request):
-        s = get_active_session(create=False)
+class SessionActiveView(AsyncReadView):
+    async def get(self, request):
+        s = await sync_to_async(get_active_session)(create=False)
         if not s:
-            return Response({"session": None, "per_person": [], "total": 0})
-        tx = (
-            Transaction.objects.filter(session=s)
-            .values("person_id")
-            .annotate(
-                person_name=F("person__name"),
-                total_eur=Sum("price_at_time"),
-                count_items=Count("id"),
-            )
+            return self.respond({"session": None, "per_person": [], "total": 0})
+        # materializované zostatky (core.ledger) — O(osôb), nie O(transakcií)
+        per_person = [
+            row async for row in SessionPersonBalance.objects.filter(session=s, count_items__gt=0)
+            .values("person_id", "total_eur", "count_items", person_name=F("person__name"))
             .order_by("person_id")
-        )
-        total = (
-            Transaction.objects.filter(session=s)
-            .aggregate(total=Sum("price_at_time"))
-            .get("total") or 0
-        )
-        return Response({
+        ]
+        total = sum(row["total_eur"] for row in per_person)
+        return self.respond({
             "session": SessionSerializer(s).data,
-            "per_person": list(tx),
+            "per_person": per_person,
             "total": total
         })
 
@@ -185,43 +342,127 @@ class SessionResetView(APIView):
     permission_classes = [IsAdminSession]
 
     def post(self, request):
-        s = get_active_session()
-        s.ended_at = timezone.now()
-        s.save()
-        s2 = Session.objects.create()
+        with transaction.atomic():
+            s = get_active_session()
+            s.ended_at = timezone.now()
+            s.save(update_fields=["ended_at"])
+            summaries.freeze(s)
+            s2 = Session.objects.create()
+            active_session.invalidate()
+        events.publish("session.reset", {"previous": s.pk, "active": s2.pk})
         return Response({
             "previous": SessionSerializer(s).data,
             "active": SessionSerializer(s2).data
         })
 
 
+class SessionSummaryView(APIView):
+    """GET /api/sessions/<id>/summary — zmrazený súhrn uzavretej session (otvorená sa počíta naživo)."""
+    def get(self, request, pk):
+        try:
+            session = Session.objects.select_related("summary").get(pk=pk)
+        except Session.DoesNotExist:
+            return Response({"error": "Session not found"}, status=404)
+        data = summaries.get_summary(session)
+        return Response({**data, "frozen": session.ended_at is not None})
+
+
 # ===== Transactions =====
-class TransactionListView(APIView):
-    """GET: list transactions with pagination (limit/offset)"""
-    def get(self, request):
+class TransactionListView(AsyncReadView):
+    """
+    GET: list transactions.
+    - limit/offset (pôvodný režim, vracia aj count)
+    - ?cursor= (prázdny = prvá strana) — keyset stránkovanie podľa (created_at, id),
+      rovnako rýchle na 1. aj 5000. strane; count len pri ?with_count=1 (cachovaný)
+    - ?format=compact — riadky ako id a čísla + bočné tabuľky osôb/položiek/kategórií (core.compact)
+    """
+    async def get(self, request):
         try:
-            limit = max(1, min(int(request.query_params.get("limit", 20)), 500))
-            offset = max(0, int(request.query_params.get("offset", 0)))
+            limit = max(1, min(int(request.GET.get("limit", 20)), 500))
+            offset = max(0, int(request.GET.get("offset", 0)))
         except (ValueError, TypeError):
-            return Response({"error": "limit and offset must be integers"}, status=400)
+            return self.respond({"error": "limit and offset must be integers"}, status=400)
 
-        qs = Transaction.objects.select_related("person", "item__category").order_by("-created_at")
-        person_id = request.query_params.get("person_id")
+        qs = Transaction.objects.order_by("-created_at")
+        person_id = request.GET.get("person_id")
+        ids = []
         if person_id:
             ids = [i.strip() for i in person_id.split(",") if i.strip().isdigit()]
             if ids:
                 qs = qs.filter(person_id__in=ids)
+        compact_format = request.GET.get("format") == "compact"
 
-        transactions = qs[offset:offset+limit]
-        total_count = qs.count()
-        
-        return Response({
-            "results": TransactionSerializer(transactions, many=True).data,
+        cursor = request.GET.get("cursor")
+        if cursor is not None:
+            try:
+                return await self._cursor_page(request, qs, limit, cursor, ids, compact_format)
+            except ValueError:
+                return self.respond({"error": "invalid cursor"}, status=400)
+
+        rows = await _transaction_rows(qs[offset:offset+limit], compact_format)
+        total_count = await qs.acount()
+
+        return self.respond({
+            **_transaction_results(rows, compact_format),
             "count": total_count,
             "limit": limit,
             "offset": offset
         })
 
+    async def _cursor_page(self, request, qs, limit, cursor, person_ids, compact_format):
+        direction, created_at, pk = _decode_cursor(cursor) if cursor else ("next", None, None)
+
+        if direction == "next":
+            # staršie ako kurzor; lte + exclude drží dotaz na range scane indexu (created_at, id)
+            if created_at is not None:
+                qs = qs.filter(created_at__lte=created_at).exclude(created_at=created_at, id__gte=pk)
+            rows = await _transaction_rows(qs.order_by("-created_at", "-id")[:limit + 1], compact_format)
+            has_more = len(rows) > limit
+            rows = rows[:limit]
+            has_next, has_prev = has_more, created_at is not None
+        else:
+            qs = qs.filter(created_at__gte=created_at).exclude(created_at=created_at, id__lte=pk)
+            rows = await _transaction_rows(qs.order_by("created_at", "id")[:limit + 1], compact_format)
+            has_more = len(rows) > limit
+            rows = rows[:limit][::-1]
+            has_next, has_prev = True, has_more
+
+        count = None
+        if request.GET.get("with_count") in ("1", "true"):
+            count = await sync_to_async(_cached_transaction_count)(person_ids)
+
+        key = _compact_cursor_key if compact_format else _transaction_cursor_key
+        return self.respond({
+            **_transaction_results(rows, compact_format),
+            "next": _encode_cursor("next", *key(rows[-1])) if rows and has_next else None,
+            "prev": _encode_cursor("prev", *key(rows[0])) if rows and has_prev else None,
+            "count": count,
+            "limit": limit,
+        })
+
+
+async def _transaction_rows(qs, compact_format):
+    """Strana transakcií ako values tuples (core.compact alebo tvar TransactionSerializer)."""
+    values = compact.VALUES if compact_format else fast_serializers.TRANSACTION.paths
+    return [r async for r in qs.values_list(*values)]
+
+
+def _transaction_results(rows, compact_format):
+    if compact_format:
+        return compact.transactions(rows)
+    return {"results": fast_serializers.TRANSACTION.build(rows)}
+
+
+_TX_CREATED_AT = fast_serializers.TRANSACTION.index("created_at")
+
+
+def _transaction_cursor_key(row):
+    return row[_TX_CREATED_AT], row[0]
+
+
+def _compact_cursor_key(row):
+    return row[6], row[0]  # created_at, id (poradie core.compact.VALUES)
+
 class TransactionDetailView(APIView):
     """PATCH: update, DELETE: delete specific transaction"""
     permission_classes = [IsAdminSession]
@@ -235,6 +476,7 @@ class TransactionDetailView(APIView):
         ser = TransactionPatchSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
 
+        old_price, old_quantity = tx.price_at_time, tx.quantity
         update_fields = []
         if "quantity" in ser.validated_data:
             tx.quantity = ser.validated_data["quantity"].quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
@@ -244,7 +486,11 @@ class TransactionDetailView(APIView):
             update_fields.append("price_at_time")
 
         if update_fields:
-            tx.save(update_fields=update_fields)
+            with transaction.atomic():
+                tx.save(update_fields=update_fields)
+                ledger.adjust(tx, old_price, old_quantity)
+                summaries.refreeze([tx.session_id])
+                _publish_tx("transaction.patched", tx, eur_delta=tx.price_at_time - old_price)
         return Response(TransactionSerializer(tx).data)
     
     def delete(self, request, pk):
@@ -257,73 +503,175 @@ class TransactionDetailView(APIView):
         with transaction.atomic():
             _decrement_person_counters(tx)
             _restore_item_stock(tx)
+            ledger.unrecord([tx])
+            _publish_tx("transaction.deleted", tx)
             tx.delete()
+            summaries.refreeze([tx.session_id])
         return Response({"deleted": data})
 
 class TransactionView(APIView):
     throttle_classes = [TransactionThrottle]
 
     def post(self, request):
+        """
+        Jeden ťuk = najviac 4 SQL príkazy: aktívna session, položka s kategóriou
+        a jeden writable CTE (core.taps) — rozpočet drží TransactionCreateQueryTests.
+        """
         s = get_active_session()
         ser = TransactionCreateSerializer(data=request.data)
         ser.is_valid(raise_exception=True)
-        person = ser.validated_data["person"]
-        item = ser.validated_data["item"]
+        person_id = ser.validated_data["person_id"]
         qty = ser.validated_data.get("quantity", Decimal("1.000"))
+        try:
+            item = Item.objects.select_related("category").get(pk=ser.validated_data["item_id"])
+        except Item.DoesNotExist:
+            raise ValidationError({"item_id": [_does_not_exist(ser.validated_data["item_id"])]})
+
+        total = line_total(item, qty)
+        cat = category_name(item)
+
+        # počty osoby: káva po 15 g na šálku (min. 1), pivo po kusoch
+        beers = coffees = 0
+        if cat == CATEGORY_COFFEE:
+            coffees = max(1, int(qty // Decimal("15")))
+        elif cat == CATEGORY_BEER:
+            beers = int(qty)
+        # brew_count pre coffee per_gram — signál každých 10 varení
+        brew = cat == CATEGORY_COFFEE and item.pricing_mode == "per_gram"
+        stock_tracked = item.stock_quantity is not None
+
+        t = taps.create_transaction(
+            s, person_id, item, qty, total, timezone.now(),
+            beers=beers, coffees=coffees, brew=brew,
+        )
+        if t is None:
+            raise ValidationError({"person_id": [_does_not_exist(person_id)]})
 
-        if item.pricing_mode in ("per_gram", "per_ml"):
-            total = (item.price * qty).quantize(Decimal("0.001"))
-            if item.pricing_mode == "per_gram" and (item.category and item.category.name.lower() == CATEGORY_COFFEE):
-                preset = (CoffeePreset.objects
-                          .filter(g_min__lte=qty, g_max__gte=qty)
-                          .order_by("g_min", "id")
-                          .first())
-                if preset:
-                    total = (total + preset.extra_eur).quantize(Decimal("0.001"))
-        else:
-            total = (item.price * qty).quantize(Decimal("0.001"))
+        _publish_tx("transaction.created", t)
+        if beers or coffees:
+            _bump("persons")
+        if stock_tracked:
+            _bump("items")
+            _publish_stock([item])
 
-        cat = (item.category.name.lower() if item.category and item.category.name else None)
+        data = TransactionSerializer(t).data
+        data["trigger_check"] = brew and item.brew_count % 10 == 0
+        return Response(data, status=status.HTTP_201_CREATED)
 
-        with transaction.atomic():
-            # vytvor transakciu
-            t = Transaction.objects.create(
-                session=s, person=person, item=item,
-                quantity=qty, price_at_time=total
-            )
 
-            # inkrementuj počty cez SQL (bez načítania a ukladania objektu)
-            if cat == CATEGORY_COFFEE:
-                cups = max(1, int(qty // Decimal("15")))
-                Person.objects.filter(pk=person.pk).update(
-                    total_coffees=F("total_coffees") + cups
-                )
-            elif cat == CATEGORY_BEER:
-                Person.objects.filter(pk=person.pk).update(
-                    total_beers=F("total_beers") + int(qty)
-                )
+def _does_not_exist(pk):
+    # rovnaká hláška ako PrimaryKeyRelatedField
+    return f'Invalid pk "{pk}" - object does not exist.'
 
-            # odpočítaj zásobu atomicky (bez race condition pri viacerých requestoch)
-            if item.stock_quantity is not None:
-                Item.objects.filter(pk=item.pk).update(
-                    stock_quantity=Greatest(F("stock_quantity") - qty, Decimal("0"))
-                )
-                item.refresh_from_db(fields=["stock_quantity"])
-                if item.stock_quantity <= Decimal("0"):
-                    Item.objects.filter(pk=item.pk).update(active=False)
 
-            # brew_count pre coffee per_gram — signál každých 10 varení
-            trigger_check = False
-            if cat == CATEGORY_COFFEE and item.pricing_mode == "per_gram":
-                Item.objects.filter(pk=item.pk).update(brew_count=F("brew_count") + 1)
-                item.refresh_from_db(fields=["brew_count"])
-                trigger_check = (item.brew_count % 10 == 0)
+class TransactionBatchView(APIView):
+    """
+    POST: viac transakcií naraz (napr. kolo pre celú partiu).
+    Body: {"lines": [{person_id, item_id, quantity?}, ...]} alebo priamo zoznam riadkov.
+    Ceny sa rátajú v pamäti, transakcie sa vložia jedným bulk insertom a počítadlá
+    osôb / zásoby položiek sa aktualizujú jedným UPDATE na tabuľku.
+    """
+    throttle_classes = [TransactionThrottle]
 
-        person.refresh_from_db(fields=["total_beers", "total_coffees"])
+    def post(self, request):
+        lines = request.data if isinstance(request.data, list) else request.data.get("lines")
+        ser = TransactionBatchSerializer(data={"lines": lines})
+        ser.is_valid(raise_exception=True)
+        lines = ser.validated_data["lines"]
 
-        data = TransactionSerializer(t).data
-        data["trigger_check"] = trigger_check
-        return Response(data, status=status.HTTP_201_CREATED)
+        person_ids = sorted({line["person_id"] for line in lines})
+        item_ids = sorted({line["item_id"] for line in lines})
+        s = get_active_session()
+
+        with transaction.atomic():
+            # zamkni riadky v poradí podľa id (bez deadlockov medzi súbežnými batchmi),
+            # potom už môžeme počítať nové hodnoty v pamäti
+            persons = {
+                p.pk: p for p in Person.objects.select_for_update().filter(pk__in=person_ids).order_by("id")
+            }
+            items = {
+                i.pk: i for i in Item.objects.select_for_update(of=("self",))
+                .select_related("category").filter(pk__in=item_ids).order_by("id")
+            }
+            missing_persons = [pk for pk in person_ids if pk not in persons]
+            missing_items = [pk for pk in item_ids if pk not in items]
+            if missing_persons or missing_items:
+                return Response({
+                    "error": "Unknown person or item",
+                    "missing_person_ids": missing_persons,
+                    "missing_item_ids": missing_items,
+                }, status=400)
+
+            txs, triggers, moves = [], [], []
+            touched_persons, touched_items = set(), set()
+            for line in lines:
+                person = persons[line["person_id"]]
+                item = items[line["item_id"]]
+                qty = line.get("quantity", Decimal("1.000"))
+                cat = category_name(item)
+
+                if cat == CATEGORY_COFFEE:
+                    person.total_coffees += max(1, int(qty // Decimal("15")))
+                    touched_persons.add(person.pk)
+                elif cat == CATEGORY_BEER:
+                    person.total_beers += int(qty)
+                    touched_persons.add(person.pk)
+
+                move = None
+                if item.stock_quantity is not None:
+                    before = item.stock_quantity
+                    item.stock_quantity = max(item.stock_quantity - qty, Decimal("0"))
+                    if item.stock_quantity <= Decimal("0"):
+                        item.active = False
+                    touched_items.add(item.pk)
+                    move = (before, item.stock_quantity)
+
+                trigger_check = False
+                if cat == CATEGORY_COFFEE and item.pricing_mode == "per_gram":
+                    item.brew_count += 1
+                    trigger_check = (item.brew_count % 10 == 0)
+                    touched_items.add(item.pk)
+
+                txs.append(Transaction(
+                    session=s, person=person, item=item,
+                    quantity=qty, price_at_time=line_total(item, qty),
+                ))
+                triggers.append(trigger_check)
+                moves.append(move)
+
+            Transaction.objects.bulk_create(txs)
+            ledger.record(txs)
+            for t in txs:
+                _publish_tx("transaction.created", t)
+            if touched_persons:
+                Person.objects.filter(pk__in=touched_persons).update(
+                    total_coffees=_case_by_pk(persons, touched_persons, "total_coffees"),
+                    total_beers=_case_by_pk(persons, touched_persons, "total_beers"),
+                )
+                _bump("persons")
+            if touched_items:
+                Item.objects.filter(pk__in=touched_items).update(
+                    stock_quantity=_case_by_pk(items, touched_items, "stock_quantity"),
+                    brew_count=_case_by_pk(items, touched_items, "brew_count"),
+                    active=_case_by_pk(items, touched_items, "active"),
+                )
+                # riadky sú zamknuté, takže delty z pamäte sú presné — pohyb na každý riadok,
+                # s ref na transakciu, ktorá ho spôsobila (ako pri jednom ťuknutí)
+                StockMovement.objects.bulk_create(
+                    StockMovement(
+                        item_id=t.item_id, delta=move[1] - move[0], balance=move[1],
+                        reason=stock.REASON_SALE, ref=f"tx:{t.pk}",
+                    )
+                    for t, move in zip(txs, moves)
+                    if move is not None and move[1] != move[0]
+                )
+                _bump("items")
+                _publish_stock(items[pk] for pk in sorted(touched_items) if items[pk].stock_quantity is not None)
+
+        results = TransactionSerializer(txs, many=True).data
+        for data, trigger_check in zip(results, triggers):
+            data["trigger_check"] = trigger_check
+        return Response({"results": results}, status=status.HTTP_201_CREATED)
 
 
 class TransactionUndoView(APIView):
@@ -333,18 +681,94 @@ class TransactionUndoView(APIView):
         person_id = request.data.get("person_id")
         if not person_id:
             return Response({"detail": "person_id required"}, status=400)
-        t = Transaction.objects.select_related("item__category").filter(session=s, person_id=person_id).order_by("-id").first()
-        if not t:
-            return Response({"detail": "nothing to undo"}, status=404)
-        data = TransactionSerializer(t).data
         with transaction.atomic():
+            # zamkni poslednú transakciu — dve súbežné undo nesmú zmazať (a odpočítať) tú istú;
+            # kto prehrá, nevidí ju (už je zmazaná) a dostane 404
+            t = (
+                Transaction.objects.select_for_update(of=("self",)).select_related("item__category")
+                .filter(session=s, person_id=person_id).order_by("-id").first()
+            )
+            if not t:
+                return Response({"detail": "nothing to undo"}, status=404)
+            data = TransactionSerializer(t).data
             _decrement_person_counters(t)
             _restore_item_stock(t)
+            ledger.unrecord([t])
+            _publish_tx("transaction.undone", t)
             t.delete()
         return Response({"undone": data})
 
 
 # ===== Helpers =====
+def _publish_tx(event_type, tx, **extra):
+    """Kompaktná delta transakcie pre SSE odberateľov (core.events)."""
+    events.publish(event_type, {
+        "id": tx.pk,
+        "session_id": tx.session_id,
+        "person_id": tx.person_id,
+        "item_id": tx.item_id,
+        "quantity": tx.quantity,
+        "price_at_time": tx.price_at_time,
+        **extra,
+    })
+
+
+def _publish_stock(items):
+    rows = [{"id": i.pk, "stock_quantity": i.stock_quantity, "active": i.active} for i in items]
+    if rows:
+        events.publish("stock.changed", {"items": rows})
+
+
+def _bump(*names):
+    """Zneplatní ETagy / procesné cache pre dané tabuľky (po commite)."""
+    for name in names:
+        versioning.bump_version(name)
+
+
+def _encode_cursor(direction, created_at, pk):
+    raw = json.dumps([direction, created_at.isoformat(), pk])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip("=")
+
+
+def _decode_cursor(cursor):
+    """Inverzná k _encode_cursor; pri čomkoľvek podozrivom ValueError."""
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        direction, created_at, pk = json.loads(raw)
+        created_at = datetime.fromisoformat(created_at)
+    except (TypeError, ValueError, binascii.Error):
+        raise ValueError("invalid cursor")
+    if (direction not in ("next", "prev") or type(pk) is not int or not 0 < pk < 2 ** 63
+            or created_at.tzinfo is None):  # bigint mimo rozsahu by v Postgrese skončil 500
+        raise ValueError("invalid cursor")
+    return direction, created_at, pk
+
+
+TRANSACTION_COUNT_TTL = 60  # s — count je len orientačný údaj pre UI
+
+
+def _cached_transaction_count(person_ids):
+    key = "tx-count:" + ",".join(sorted(person_ids, key=int))
+    count = cache.get(key)
+    if count is None:
+        qs = Transaction.objects.all()
+        if person_ids:
+            qs = qs.filter(person_id__in=person_ids)
+        count = qs.count()
+        cache.set(key, count, TRANSACTION_COUNT_TTL)
+    return count
+
+
+def _case_by_pk(objects, pks, field):
+    """CASE WHEN pk=… THEN … — nové hodnoty pre viac riadkov v jednom UPDATE."""
+    model_field = next(iter(objects.values()))._meta.get_field(field)
+    return Case(
+        *[When(pk=pk, then=Value(getattr(objects[pk], field), output_field=model_field)) for pk in sorted(pks)],
+        default=F(field),
+        output_field=model_field,
+    )
+
+
 def _decrement_person_counters(tx):
     """Reverse the counter increments made when a transaction was created."""
     cat = (
@@ -357,60 +781,168 @@ def _decrement_person_counters(tx):
         Person.objects.filter(pk=tx.person_id).update(
             total_coffees=Greatest(F("total_coffees") - cups, 0)
         )
+        _bump("persons")
     elif cat == CATEGORY_BEER:
         Person.objects.filter(pk=tx.person_id).update(
             total_beers=Greatest(F("total_beers") - int(tx.quantity), 0)
         )
+        _bump("persons")
 
 
 def _restore_item_stock(tx):
-    """Vráti zásobu položky späť po zmazaní transakcie."""
+    """Vráti zásobu položky späť po zmazaní transakcie (pohyb "undo", bez read-modify-write)."""
+    changed = stock.apply([(tx.item_id, tx.quantity, f"tx:{tx.pk}")], stock.REASON_UNDO)
+    if tx.item_id not in changed:
+        return  # položka nesleduje zásobu
     item = tx.item
-    # Refresh priamo z DB aby sme mali aktuálnu hodnotu (nie stale in-memory)
-    item.refresh_from_db(fields=["stock_quantity", "active"])
-    if item.stock_quantity is None:
-        return
-    new_stock = item.stock_quantity + tx.quantity
-    update_kwargs = {"stock_quantity": new_stock}
-    # reaktivuj len ak bola deaktivovaná (pravdepodobne auto-deaktiváciou pri stock=0)
-    if not item.active and new_stock > Decimal("0"):
-        update_kwargs["active"] = True
-    Item.objects.filter(pk=item.pk).update(**update_kwargs)
-
-
-class StatsView(APIView):
-    def get(self, request):
-        from django.db.models import Sum, Count, Avg
-
-        persons_stats = list(
-            Person.objects.annotate(
-                total_spent=Sum("transactions__price_at_time"),
-                tx_count=Count("transactions"),
-            ).values("id", "name", "is_guest", "total_beers", "total_coffees", "total_spent", "tx_count")
-            .order_by("-total_spent")
-        )
+    item.stock_quantity, item.active = changed[tx.item_id]
+    _bump("items")
+    _publish_stock([item])
+
+
+class StatsView(AsyncReadView):
+    """
+    GET /api/stats — rebríček osôb, top položky a súčty; číta len z StatsRollup,
+    takže cena nezávisí od dĺžky histórie.
+
+    Voliteľné parametre:
+      from, to   ISO dátum alebo čas (UTC); `to` ako dátum je vrátane celého dňa, inak exkluzívne
+      session    len transakcie danej session
+      bucket     hour|day|week → navyše "series": súčty po časových úsekoch
+    Granularita rollupu je hodina, `from`/`to` sa teda zaokrúhľujú na celé hodiny.
+    Samotné ?session= uzavretej session sa odpovie zo zmrazeného súhrnu (core.summaries).
+    """
+    BUCKETS = {"hour": TruncHour, "day": TruncDay, "week": TruncWeek}
+
+    async def get(self, request):
+        params = request.GET
+        session_id = params.get("session", "")
+        if session_id.isdigit() and not any(params.get(k) for k in ("from", "to", "bucket")):
+            # uzavretá session → zmrazený súhrn, rollupy netreba
+            session = await (
+                Session.objects.filter(pk=session_id, ended_at__isnull=False)
+                .select_related("summary").afirst()
+            )
+            if session is not None:
+                summary = await sync_to_async(summaries.get_summary)(session)
+                return self.respond(await self._from_summary(summary))
+        try:
+            rollups = self._filtered_rollups(params)
+        except ValueError as e:
+            return self.respond({"error": str(e)}, status=400)
+        bucket = params.get("bucket")
+        if bucket is not None and bucket not in self.BUCKETS:
+            return self.respond({"error": "bucket must be one of hour, day, week"}, status=400)
+        rollups = rollups.filter(tx_count__gt=0)
+
+        persons_stats = await self._persons({
+            r["person_id"]: (r["total_spent"], r["tx_count"])
+            async for r in rollups.order_by().values("person_id").annotate(
+                total_spent=Sum("eur"), tx_count=Sum("tx_count"),
+            )
+        })
 
-        top_items = list(
-            Transaction.objects.values(
+        top_items = [
+            row async for row in rollups.order_by().values(
                 "item__name", "item__category__name"
             ).annotate(
-                count=Count("id"),
-                total_qty=Sum("quantity"),
-                total_eur=Sum("price_at_time"),
+                count=Sum("tx_count"),
+                total_qty=Sum("qty"),
+                total_eur=Sum("eur"),
             ).order_by("-count")[:10]
-        )
+        ]
 
-        grand = Transaction.objects.aggregate(
-            total=Sum("price_at_time"),
-            count=Count("id"),
+        grand = await rollups.aaggregate(
+            total=Sum("eur"),
+            count=Sum("tx_count"),
         )
 
-        return Response({
+        data = {
             "persons": persons_stats,
             "top_items": top_items,
             "grand_total": str(grand["total"] or 0),
             "grand_count": grand["count"] or 0,
-        })
+        }
+        if bucket:
+            trunc = self.BUCKETS[bucket]("hour", tzinfo=dt_timezone.utc)
+            data["series"] = [
+                row async for row in rollups.order_by().annotate(bucket=trunc).values("bucket").annotate(
+                    count=Sum("tx_count"),
+                    total_qty=Sum("qty"),
+                    total_eur=Sum("eur"),
+                ).order_by("bucket")
+            ]
+        return self.respond(data)
+
+    @staticmethod
+    async def _persons(per_person):
+        """Všetky osoby so súčtami {person_id: (€, počet)}; poradie ako pôvodné ORDER BY -total_spent."""
+        persons_stats = []
+        async for p in Person.objects.values("id", "name", "is_guest", "total_beers", "total_coffees"):
+            p["total_spent"], p["tx_count"] = per_person.get(p["id"], (None, 0))
+            persons_stats.append(p)
+        # ako ORDER BY total_spent DESC v Postgrese: NULL (bez útraty) na začiatku
+        persons_stats.sort(
+            key=lambda p: (p["total_spent"] is None, p["total_spent"] or 0), reverse=True
+        )
+        return persons_stats
+
+    async def _from_summary(self, summary):
+        return {
+            "persons": await self._persons({
+                p["person_id"]: (Decimal(p["total_eur"]), p["count"]) for p in summary["persons"]
+            }),
+            "top_items": [
+                {
+                    "item__name": i["name"],
+                    "item__category__name": i["category"],
+                    "count": i["count"],
+                    "total_qty": Decimal(i["qty"]),
+                    "total_eur": Decimal(i["eur"]),
+                }
+                for i in summary["items"][:10]
+            ],
+            "grand_total": summary["grand_total"],
+            "grand_count": summary["grand_count"],
+        }
+
+    @staticmethod
+    def _filtered_rollups(params):
+        qs = StatsRollup.objects.all()
+        start = _parse_stats_bound(params["from"], "from", end=False) if params.get("from") else None
+        end = _parse_stats_bound(params["to"], "to", end=True) if params.get("to") else None
+        if start is not None and end is not None and start >= end:
+            raise ValueError("from must be before to")
+        if start is not None:
+            # rollup je po hodinách — začiatok zaokrúhli nadol, nech sa hodina so začiatkom nestratí
+            qs = qs.filter(hour__gte=start.replace(minute=0, second=0, microsecond=0))
+        if end is not None:
+            qs = qs.filter(hour__lt=end)
+        if params.get("session"):
+            try:
+                qs = qs.filter(session_id=int(params["session"]))
+            except ValueError:
+                raise ValueError("session must be an integer")
+        return qs
+
+
+def _parse_stats_bound(raw, name, end):
+    """ISO dátum/čas → aware datetime (UTC); dátum ako `to` znamená koniec toho dňa."""
+    try:
+        # dátum najprv — parse_datetime (fromisoformat) berie aj holý dátum ako polnoc
+        d = parse_date(raw)
+        dt = parse_datetime(raw) if d is None else None
+    except ValueError:  # správny tvar, neplatná hodnota (napr. 2024-13-01)
+        d = dt = None
+    if d is not None:
+        dt = datetime.combine(d, datetime.min.time())
+        if end:
+            dt += timedelta(days=1)
+    elif dt is None:
+        raise ValueError(f"{name} must be an ISO date or datetime")
+    if timezone.is_naive(dt):
+        dt = timezone.make_aware(dt, dt_timezone.utc)
+    return dt.astimezone(dt_timezone.utc)
 
 
 # ===== Inventory / Stock =====
@@ -435,38 +967,59 @@ class ItemSetStockView(APIView):
         except Exception:
             return Response({"error": "stock_quantity must be a non-negative number"}, status=400)
 
-        Item.objects.filter(pk=pk).update(stock_quantity=qty)
-        item.refresh_from_db()
+        stock.set_level(item, qty, stock.REASON_SET)
+        _bump("items")
+        _publish_stock([item])
         return Response(ItemSerializer(item).data)
 
 
-class ItemSettleView(APIView):
-    """POST: rozrátá zostatok zásoby medzi domácich užívateľov ako nové transakcie"""
+class ItemStockMovementsView(APIView):
+    """GET: história zásoby položky (StockMovement) od najnovšieho — odpoveď na "prečo je zásoba X"."""
     permission_classes = [IsAdminSession]
 
-    def post(self, request, pk):
+    def get(self, request, pk):
         try:
-            item = Item.objects.get(pk=pk)
+            item = Item.objects.only("id", "stock_quantity").get(pk=pk)
         except Item.DoesNotExist:
             return Response({"error": "Item not found"}, status=404)
+        try:
+            limit = max(1, min(int(request.query_params.get("limit", 50)), 500))
+        except (ValueError, TypeError):
+            return Response({"error": "limit must be an integer"}, status=400)
+        movements = StockMovement.objects.filter(item=item).order_by("-created_at", "-id")[:limit]
+        return Response({
+            "stock_quantity": item.stock_quantity,
+            "movements": StockMovementSerializer(movements, many=True).data,
+        })
 
-        if item.stock_quantity is None or item.stock_quantity <= Decimal("0"):
-            return Response({"error": "No stock to settle"}, status=400)
 
-        domestic = list(Person.objects.filter(is_guest=False, active=True).order_by("id"))
-        if not domestic:
-            return Response({"error": "No domestic users found"}, status=400)
-
-        remaining = item.stock_quantity
-        remaining_value = (remaining * item.price).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
-        count = len(domestic)
-        per_person = (remaining_value / count).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
-        qty_per_person = (remaining / count).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
+class ItemSettleView(APIView):
+    """POST: rozrátá zostatok zásoby medzi domácich užívateľov ako nové transakcie"""
+    permission_classes = [IsAdminSession]
 
-        s = get_active_session()
+    def post(self, request, pk):
+        domestic = list(Person.objects.filter(is_guest=False, active=True).order_by("id"))
         created = []
 
         with transaction.atomic():
+            # zamkni položku — zostatok sa rozráta presne, súbežný predaj počká
+            try:
+                item = Item.objects.select_for_update().get(pk=pk)
+            except Item.DoesNotExist:
+                return Response({"error": "Item not found"}, status=404)
+
+            if item.stock_quantity is None or item.stock_quantity <= Decimal("0"):
+                return Response({"error": "No stock to settle"}, status=400)
+            if not domestic:
+                return Response({"error": "No domestic users found"}, status=400)
+
+            remaining = item.stock_quantity
+            remaining_value = (remaining * item.price).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
+            count = len(domestic)
+            per_person = (remaining_value / count).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
+            qty_per_person = (remaining / count).quantize(Decimal("0.001"), rounding=ROUND_HALF_UP)
+
+            s = get_active_session()
             total_assigned = Decimal("0")
             for i, person in enumerate(domestic):
                 if i == count - 1:
@@ -487,7 +1040,12 @@ class ItemSettleView(APIView):
                 )
                 created.append(t)
 
-            Item.objects.filter(pk=pk).update(stock_quantity=Decimal("0"), active=False)
+            ledger.record(created)
+            for t in created:
+                _publish_tx("transaction.created", t)
+            stock.set_level(item, Decimal("0"), stock.REASON_SETTLE, ref=f"tx:{created[0].pk}", active=False)
+            _bump("items")
+            _publish_stock([item])
 
         return Response({
             "settled": TransactionSerializer(created, many=True).data,
@@ -508,7 +1066,11 @@ class ResetPersonDebtView(APIView):
             return Response({"error": "Person not found"}, status=404)
 
         session = get_active_session()
-        Transaction.objects.filter(session=session, person=person).delete()
+        with transaction.atomic():
+            txs = Transaction.objects.filter(session=session, person=person)
+            ledger.unrecord_queryset(txs)
+            txs.delete()
+            events.publish("transactions.cleared", {"session_id": session.pk, "person_id": person.pk})
         return Response({"ok": True}, status=status.HTTP_200_OK)
 
 
@@ -547,12 +1109,8 @@ class BrewBatchView(APIView):
     permission_classes = [IsAdminSession]
 
     def get(self, request):
-        batches = BrewBatch.objects.select_related(
-            "output_item"
-        ).prefetch_related(
-            "ingredients__coffee"
-        ).order_by("-created_at")[:30]
-        return Response(BrewBatchSerializer(batches, many=True).data)
+        batches = BrewBatch.objects.order_by("-created_at")[:30]
+        return Response(fast_serializers.brew_batches(batches))
 
     def post(self, request):
         ser = BrewBatchCreateSerializer(data=request.data)
@@ -574,32 +1132,26 @@ class BrewBatchView(APIView):
                 )
 
         with transaction.atomic():
-            # Deduct each coffee's stock
-            for ing in ingredients:
-                coffee = ing["coffee"]
-                grams = ing["grams"]
-                if coffee.stock_quantity is not None:
-                    Item.objects.filter(pk=coffee.pk).update(
-                        stock_quantity=Greatest(F("stock_quantity") - grams, Decimal("0"))
-                    )
-                    coffee.refresh_from_db(fields=["stock_quantity"])
-                    if coffee.stock_quantity <= Decimal("0"):
-                        Item.objects.filter(pk=coffee.pk).update(active=False)
-
-            # Add ml to output item (activate if was inactive)
-            if output.stock_quantity is None:
-                Item.objects.filter(pk=output.pk).update(stock_quantity=output_ml, active=True)
-            else:
-                Item.objects.filter(pk=output.pk).update(
-                    stock_quantity=F("stock_quantity") + output_ml,
-                    active=True,
-                )
-
             batch = BrewBatch.objects.create(
                 output_item=output,
                 output_ml=output_ml,
                 note=d.get("note") or "",
             )
+            ref = f"brew:{batch.pk}"
+            # odpočítaj kávy (len sledované) a pridaj ml výstupu (aj keď sa doteraz nesledoval)
+            changed = stock.apply(
+                [(ing["coffee"].pk, -ing["grams"], ref) for ing in ingredients], stock.REASON_BREW_USE,
+            )
+            changed.update(stock.apply(
+                [(output.pk, output_ml, ref)], stock.REASON_BREW_OUTPUT, start_untracked=True, active=True,
+            ))
+
+            _bump("items")
+            _publish_stock(
+                Item(id=pk, stock_quantity=qty, active=active)
+                for pk, (qty, active) in sorted(changed.items())
+            )
+
             for sort_idx, ing in enumerate(ingredients):
                 BrewBatchIngredient.objects.create(
                     batch=batch,
@@ -612,6 +1164,97 @@ class BrewBatchView(APIView):
         return Response(BrewBatchSerializer(batch).data, status=status.HTTP_201_CREATED)
 
 
-class HealthView(APIView):
+class EventStreamView(View):
+    """
+    GET: Server-Sent Events so zmenami ledgera (core.events) — náhrada za polling.
+    Pri reconnecte klient pošle Last-Event-ID a dostane zmeškané udalosti.
+    Beží len pod ASGI (stream drží spojenie, nie worker vlákno).
+    """
+    HEARTBEAT_SECONDS = 15
+
+    async def get(self, request):
+        if not isinstance(request, ASGIRequest):
+            return JsonResponse({"error": "Event stream requires the ASGI server"}, status=501)
+
+        events.ensure_listener()
+        last_event_id = request.headers.get("Last-Event-ID") or request.GET.get("last_event_id")
+        queue, backlog, reset = events.hub.subscribe(last_event_id)
+
+        async def stream():
+            try:
+                yield "retry: 3000\n\n"
+                if reset:
+                    yield f"data: {json.dumps({'type': 'reset'})}\n\n"
+                for event in backlog:
+                    yield events.format_sse(event)
+                while True:
+                    try:
+                        event = await asyncio.wait_for(queue.get(), self.HEARTBEAT_SECONDS)
+                    except asyncio.TimeoutError:
+                        yield ": ping\n\n"
+                        continue
+                    if event is None:
+                        break
+                    yield events.format_sse(event)
+            finally:
+                events.hub.unsubscribe(queue)
+
+        response = StreamingHttpResponse(stream(), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
+
+class HealthView(AsyncReadView):
+    """GET: stav procesu; `db_pool` = pool spojenia tohto workera (None, ak je vypnutý)."""
+
+    async def get(self, request):
+        # connections[] v async kontexte patrí tejto úlohe; pool sync view sa číta v ich vlákne
+        return self.respond({"ok": True, "db_pool": await sync_to_async(_pool_stats)()})
+
+
+def _pool_stats():
+    pool = connections["default"].pool
+    if pool is None:
+        return None
+    stats = pool.get_stats()  # kľúče s nulovou hodnotou psycopg_pool vynecháva
+    return {
+        "min": stats["pool_min"],
+        "max": stats["pool_max"],
+        "size": stats["pool_size"],
+        "in_use": stats["pool_size"] - stats["pool_available"],
+        "idle": stats["pool_available"],
+        "waiting": stats.get("requests_waiting", 0),
+        "requests": stats.get("requests_num", 0),
+        "requests_queued": stats.get("requests_queued", 0),  # museli čakať na voľné spojenie
+        "wait_ms": stats.get("requests_wait_ms", 0),
+        "timeouts": stats.get("requests_errors", 0),
+        "connection_errors": stats.get("connections_errors", 0),
+    }
+
+
+class MetricsView(APIView):
+    """GET: metriky požiadaviek v Prometheus text formáte (core.metrics), sčítané cez worker procesy."""
+    permission_classes = [IsAdminOrMetricsToken]
+
+    def get(self, request):
+        return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
+
+
+class ProfileListView(APIView):
+    """GET: uložené profily požiadaviek (core.profiling), od najnovšieho."""
+    permission_classes = [IsAdminSession]
+
     def get(self, request):
-        return Response({"ok": True})
\ No newline at end of file
+        return Response(profiling.list_reports())
+
+
+class ProfileDetailView(APIView):
+    """GET: celý report profilu — top funkcie, SQL po skupinách, čas serializérov."""
+    permission_classes = [IsAdminSession]
+
+    def get(self, request, report_id):
+        report = profiling.get_report(report_id)
+        if report is None:
+            return Response({"error": "Profile not found"}, status=404)
+        return Response(report)
@@ -0,0 +1,49 @@
+"""
+Produkčný server: gunicorn spravuje worker procesy, každý beží uvicorn (ASGI)
+nad backend.asgi:application — async view a SSE (/api/events) nedržia vlákno.
+
+    gunicorn -c gunicorn.conf.py backend.asgi:application
+
+Sync view (DRF viewsety, ťuknutie, undo, batch, várka) Django pod ASGI púšťa cez
+sync_to_async(thread_sensitive=True), teda na jednom vlákne na worker — a tam beží aj
+async ORM. Súbežnosť zápisov je preto počet workerov, nie vlákien.
+
+Env: WEB_CONCURRENCY (počet workerov = súbežné sync view, predvolene 2 × CPU + 1, max 8),
+PORT, GUNICORN_TIMEOUT, GUNICORN_MAX_REQUESTS, DB_MAX_CONNECTIONS (rozpočet spojení
+na DB pre všetkých workerov → DB_POOL_MAX na worker).
+"""
+import multiprocessing
+import os
+import shutil
+
+bind = f"0.0.0.0:{os.getenv('PORT', '8001')}"
+worker_class = "uvicorn_worker.UvicornWorker"
+workers = int(os.getenv("WEB_CONCURRENCY", min(2 * multiprocessing.cpu_count() + 1, 8)))
+
+# viac procesov → SSE udalosti cez Postgres LISTEN/NOTIFY (core.events)
+if workers > 1:
+    os.environ.setdefault("EVENTS_PG_NOTIFY", "true")
+
+# každý worker má vlastný pool spojení; DB_MAX_CONNECTIONS (rozpočet pre celú
+# aplikáciu, nižší než max_connections v Postgrese) sa rozdelí medzi workerov
+# po odpočítaní LISTEN spojenia, ktoré si každý worker drží mimo poolu
+if os.getenv("DB_MAX_CONNECTIONS") and "DB_POOL_MAX" not in os.environ:
+    listen = 1 if os.environ.get("EVENTS_PG_NOTIFY", "false").lower() == "true" else 0
+    per_worker = int(os.environ["DB_MAX_CONNECTIONS"]) // workers - listen
+    os.environ["DB_POOL_MAX"] = str(max(per_worker, 1))
+    os.environ.setdefault("DB_POOL_MIN", "1")
+
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "60"))
+graceful_timeout = 20
+keepalive = 5
+# recyklácia workerov proti pomalému rastu pamäte; jitter, nech sa nereštartujú naraz
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", "5000"))
+max_requests_jitter = max_requests // 10
+accesslog = "-"
+forwarded_allow_ips = "*"  # za reverse proxy / tunelom
+
+
+def on_starting(server):
+    # súčty metrík mŕtvych workerov z minulého behu (core.metrics) sa nesmú pripočítavať
+    metrics_dir = os.getenv("METRICS_DIR", "/tmp/drinkcounter-metrics")
+    shutil.rmtree(metrics_dir, ignore_errors=True)
@@ -1,5 +1,7 @@
 import { memo, useCallback, useEffect, useMemo, useRef, useState } from 'react'
 import { api } from './api'
+import { API_BASE } from './config'
+import { avatarSrc } from './avatar'
 import './App.css'
 import { FaBeer, FaCoffee, FaSnowflake } from 'react-icons/fa'
 import logo from '/favicon.png'
@@ -117,7 +119,7 @@ function CoffeeCheckModal({ item, onClose }) {
 
 // ── PersonCard — memo = re-renderuje len ked sa jej vlastné props zmenia ──
 const PersonCard = memo(function PersonCard({ p, multi, selected, debt, onClick, enterDelay }) {
-  const avatarUrl = p.avatar?.startsWith('/media/') ? p.avatar : null
+  const avatarUrl = avatarSrc(p, 150)  // karta má 150 px
 
   return (
     <button
@@ -231,6 +233,18 @@ export default function App() {
 
   useEffect(() => { Promise.all([loadPersons(), loadItems(), refreshSummary()]) }, [])
 
+  // živé zmeny z ostatných tabletov (SSE) — pri udalosti sa dáta prenačítajú (ETag → lacné)
+  useEffect(() => {
+    if (typeof EventSource === 'undefined') return
+    const es = new EventSource(`${API_BASE}/events`, { withCredentials: true })
+    let timer = null
+    es.onmessage = () => {
+      clearTimeout(timer)
+      timer = setTimeout(() => { Promise.all([loadPersons(), loadItems(), refreshSummary()]).catch(() => {}) }, 300)
+    }
+    return () => { clearTimeout(timer); es.close() }
+  }, [])
+
   // auto-reset countdown na "done" kroku
   useEffect(() => {
     if (step !== 'done' || countdown === null) return
@@ -433,8 +447,8 @@ export default function App() {
           ? Number(quantity) / n
           : undefined
 
-        const results = await Promise.all(
-          selectedPersons.map(p => api.addTransaction({
+        const { results } = await api.addTransactionsBatch(
+          selectedPersons.map(p => ({
             person_id: p.id,
             item_id: item.id,
             ...(isPerUnit ? { quantity: qtyEach } : {})
@@ -51,6 +51,7 @@ export const api = {
   csrf: initCsrf,
    
   addTransaction: (payload) => postJson("/transactions", payload),// <— dôležité
+  addTransactionsBatch: (lines) => postJson("/transactions/batch", { lines }),
   login: (pin) => request("/auth/admin-login", { method: "POST", data: { pin } }),
   logout: () => request("/auth/admin-logout", { method: "POST" }),
   adminCheck: () => request("/auth/admin-check"),
@@ -84,6 +85,7 @@ addPerson: (payload) => request("/persons/", { method: "POST", data: payload }),
 
   // transactions management
   getTransactions: (limit = 20, offset = 0, personIds = []) => request(`/transactions/list?limit=${limit}&offset=${offset}${personIds.length ? `&person_id=${personIds.join(',')}` : ''}`),
+  getTransactionsPage: (limit = 20, cursor = "", personIds = [], withCount = false) => request(`/transactions/list?limit=${limit}&cursor=${encodeURIComponent(cursor)}${withCount ? '&with_count=1' : ''}${personIds.length ? `&person_id=${personIds.join(',')}` : ''}`),
   updateTransaction: (id, payload) => request(`/transactions/${id}`, { method: "PATCH", data: payload }),
   deleteTransaction: (id) => request(`/transactions/${id}`, { method: "DELETE" }),
   undoTransaction: (personId) => request("/transactions/undo", { method: "POST", data: { person_id: personId } }),
@@ -0,0 +1,13 @@
+// Náhľad avatara z avatar_srcset (backend core.avatars): najmenší WebP variant, ktorý pokryje
+// `px` CSS pixelov pri aktuálnom devicePixelRatio. Bez náhľadov (ešte nevyrobené) pôvodný súbor.
+export function avatarSrc(person, px) {
+  const original = person.avatar?.startsWith('/media/') ? person.avatar : null
+  const srcset = person.avatar_srcset?.webp
+  if (!srcset) return original
+  const want = px * (window.devicePixelRatio || 1)
+  const variants = srcset.split(', ').map(v => {
+    const [url, width] = v.split(' ')
+    return [url, parseInt(width, 10)]
+  })
+  return (variants.find(([, width]) => width >= want) ?? variants[variants.length - 1])[0]
+}
@@ -211,7 +211,8 @@ export default function Transactions() {
   const [selectedIds, setSelectedIds] = useState([])   // multi-select
   const [showFilter, setShowFilter] = useState(false)   // filter collapsed by default
   const [loading, setLoading] = useState(false)
-  const [offset, setOffset] = useState(0)
+  const [nextCursor, setNextCursor] = useState(null)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [totalCount, setTotalCount] = useState(0)
   const [editId, setEditId] = useState(null)
   const [editForm, setEditForm] = useState({ quantity: "", price_at_time: "" })
@@ -226,22 +227,25 @@ export default function Transactions() {
   const showConfirm = (msg, onConfirm) => setConfirmModal({ open: true, msg, onConfirm })
   const closeConfirm = () => setConfirmModal({ open: false, msg: "", onConfirm: null })
 
-  const loadTransactions = async (newOffset = 0, ids = selectedIds) => {
+  // cursor = "" → prvá strana (aj s počtom), inak pokračovanie cez next kurzor
+  const loadTransactions = async (cursor = "", ids = selectedIds) => {
     setLoading(true)
+    setLoadingMore(cursor !== "")
     try {
       const lim = ids.length ? calendarLimit : limit
-      const data = await api.getTransactions(lim, newOffset, ids)
-      if (newOffset === 0) {
+      const data = await api.getTransactionsPage(lim, cursor, ids, cursor === "")
+      if (cursor === "") {
         setTransactions(data.results)
+        setTotalCount(data.count)
       } else {
         setTransactions(prev => [...prev, ...data.results])
       }
-      setTotalCount(data.count)
-      setOffset(newOffset)
+      setNextCursor(data.next)
     } catch (err) {
       console.error("Failed to load transactions:", err)
     } finally {
       setLoading(false)
+      setLoadingMore(false)
     }
   }
 
@@ -256,14 +260,12 @@ export default function Transactions() {
       ? selectedIds.filter(x => x !== id)
       : [...selectedIds, id]
     setSelectedIds(next)
-    setOffset(0)
-    loadTransactions(0, next)
+    loadTransactions("", next)
   }
 
   const clearFilter = () => {
     setSelectedIds([])
-    setOffset(0)
-    loadTransactions(0, [])
+    loadTransactions("", [])
   }
 
   const handleDelete = (tx) => {
@@ -322,8 +324,8 @@ export default function Transactions() {
     }
   }
 
-  const loadMore = () => loadTransactions(offset + limit)
-  const hasMore = !selectedIds.length && transactions.length < totalCount
+  const loadMore = () => loadTransactions(nextCursor)
+  const hasMore = !selectedIds.length && !!nextCursor
   const isFiltered = selectedIds.length > 0
   const calendarGroups = isFiltered ? groupByDay(transactions) : null
 
@@ -464,7 +466,7 @@ export default function Transactions() {
           : `Zobrazených: ${transactions.length} z ${totalCount}`}
       </div>
 
-      {loading && offset === 0 ? (
+      {loading && !loadingMore ? (
         <div className="text-center py-4">
           <div className="spinner-border" role="status">
             <span className="visually-hidden">Načítavam...</span>
@@ -2,6 +2,7 @@ import { useEffect, useState } from "react"
 import { Link } from "react-router-dom"
 import { api } from "../api"
 import { ThemeToggle } from "../ThemeToggle"
+import { avatarSrc } from "../avatar"
 
 export default function Users() {
   const [authed, setAuthed] = useState(false)
@@ -273,7 +274,7 @@ export default function Users() {
                   <div className="mb-3">
                     {person.avatar ? (
                       <img
-                        src={person.avatar}
+                        src={avatarSrc(person, 100) || person.avatar}
                         alt={person.name}
                         loading="lazy"
                         className="rounded-circle avatar-img"